@@ -2,9 +2,54 @@ from .prompts import (
     HOPELESS_ROMANTIC_PROMPT,
     REALIST_STOIC_PROMPT,
     BALANCED_MEDIATOR_PROMPT,
+    COMBINED_PERSONAS_PROMPT,
 )
 
-from .negative_agent import realist_stoic_agent, RealistStoicResponse
-from .positive_agent import hopeless_romantic_agent, HopelessRomanticResponse
-from .balanced_agent import balanced_mediator_agent, BalancedMediatorResponse
-from .main_graph import create_graph, GraphMessage
+import importlib
+
+# Everything else is resolved on first attribute access, so `import cores` stays
+# cheap and side-effect free (no streamlit, no model clients, no langgraph).
+_LAZY_ATTRS = {
+    "realist_stoic_agent": "cores.negative_agent",
+    "RealistStoicResponse": "cores.negative_agent",
+    "hopeless_romantic_agent": "cores.positive_agent",
+    "HopelessRomanticResponse": "cores.positive_agent",
+    "balanced_mediator_agent": "cores.balanced_agent",
+    "BalancedMediatorResponse": "cores.balanced_agent",
+    "combined_personas_agent": "cores.combined_agent",
+    "CombinedPersonasResponse": "cores.combined_agent",
+    "create_graph": "cores.main_graph",
+    "GraphMessage": "cores.main_graph",
+    "run_analysis": "cores.main_graph",
+    "ResponseCache": "cores.cache",
+    "MemoryTier": "cores.cache",
+    "SQLiteTier": "cores.cache",
+    "get_response_cache": "cores.cache",
+    "ResultStore": "cores.result_store",
+    "get_result_store": "cores.result_store",
+    "submit_job": "cores.jobs",
+    "get_job": "cores.jobs",
+    "get_graph": "cores.graph_registry",
+    "Settings": "cores.settings",
+    "configure": "cores.settings",
+    "get_agent": "cores.agent_factory",
+}
+
+__all__ = [
+    "HOPELESS_ROMANTIC_PROMPT",
+    "REALIST_STOIC_PROMPT",
+    "BALANCED_MEDIATOR_PROMPT",
+    "COMBINED_PERSONAS_PROMPT",
+    *_LAZY_ATTRS,
+]
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    if not name.endswith("_agent"):
+        # agents are not pinned here so configure() can rebuild them
+        globals()[name] = value
+    return value
@@ -0,0 +1,137 @@
+import hashlib
+import importlib
+import json
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Type
+
+from pydantic import BaseModel
+
+from cores.prompt_templates import static_prefix
+from cores.settings import Settings, get_settings
+
+if TYPE_CHECKING:
+    from pydantic_ai import Agent
+
+
+@dataclass(frozen=True)
+class AgentSpec:
+    """
+    Everything needed to build an agent, without building it.
+    """
+
+    name: str
+    system_prompt: str
+    result_type: Type[BaseModel]
+
+
+# --- Spec registry (filled in by the agent modules) ---
+_specs: Dict[str, AgentSpec] = {}
+
+# module defining each agent, imported on first lookup
+_AGENT_MODULES = {
+    "hopeless_romantic": "cores.positive_agent",
+    "realist_stoic": "cores.negative_agent",
+    "balanced_mediator": "cores.balanced_agent",
+    "combined_personas": "cores.combined_agent",
+}
+
+
+def register_agent(name: str, system_prompt: str, result_type: Type[BaseModel]) -> AgentSpec:
+    """
+    Registers an agent; its system prompt becomes the byte-stable prefix of every request.
+    """
+    spec = AgentSpec(name=name, system_prompt=static_prefix(system_prompt), result_type=result_type)
+    _specs[name] = spec
+    return spec
+
+
+def get_spec(name: str) -> AgentSpec:
+    if name not in _specs and name in _AGENT_MODULES:
+        importlib.import_module(_AGENT_MODULES[name])
+    try:
+        return _specs[name]
+    except KeyError:
+        raise ValueError(f"Unknown agent: {name!r}") from None
+
+
+def prompt_version() -> str:
+    """
+    Short hash of every known agent's system prompt and result schema; changes
+    whenever a prompt or schema does (used to version stored results).
+    """
+    digest = hashlib.sha256()
+    for name in sorted(_AGENT_MODULES):
+        spec = get_spec(name)
+        digest.update(spec.system_prompt.encode("utf-8"))
+        digest.update(json.dumps(spec.result_type.model_json_schema(), sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+# --- Lazily built models / agents ---
+_agents: Dict[str, "Agent"] = {}
+_model = None
+_lock = threading.Lock()
+
+
+def build_model(settings: Settings):
+    """
+    Builds the model all agents share: OpenAI (with the pooled HTTP client),
+    or the offline load-testing backend when settings.model_backend == "offline".
+    """
+    if settings.model_backend == "offline":
+        from cores.offline_model import build_offline_model
+
+        return build_offline_model()
+    if settings.model_backend != "openai":
+        raise ValueError(f"Unknown model backend: {settings.model_backend!r}")
+
+    from pydantic_ai.models.openai import OpenAIModel
+    from pydantic_ai.providers.openai import OpenAIProvider
+
+    from cores.runtime import get_http_client
+
+    provider = OpenAIProvider(
+        api_key=settings.openai_api_key, http_client=get_http_client()
+    )
+    return OpenAIModel(model_name=settings.model_name, provider=provider)
+
+
+def get_model():
+    global _model
+    with _lock:
+        if _model is None:
+            _model = build_model(get_settings())
+        return _model
+
+
+def get_agent(name: str) -> "Agent":
+    """
+    Returns the agent registered under `name`, constructing it on first use.
+    """
+    agent = _agents.get(name)
+    if agent is not None:
+        return agent
+
+    from pydantic_ai import Agent
+
+    spec = get_spec(name)
+    model = get_model()
+    with _lock:
+        if name not in _agents:
+            _agents[name] = Agent(
+                model=model,
+                system_prompt=spec.system_prompt,
+                result_type=spec.result_type,
+            )
+        return _agents[name]
+
+
+def reset_agents() -> None:
+    """
+    Drops built agents/model so they are rebuilt from the current settings.
+    """
+    global _model
+    with _lock:
+        _agents.clear()
+        _model = None
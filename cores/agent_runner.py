@@ -0,0 +1,143 @@
+import time
+from typing import TYPE_CHECKING, Callable, Optional, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from cores.agent_factory import get_agent, get_spec
+from cores.cache import ResponseCache, get_response_cache, make_cache_key
+from cores.metrics import record_agent_call
+from cores.rate_limit import get_rate_limiter
+from cores.resilience import ResiliencePolicy, call_with_policy, observe_attempt
+from cores.settings import get_settings
+
+if TYPE_CHECKING:
+    from pydantic_ai import Agent
+
+T = TypeVar("T", bound=BaseModel)
+
+
+async def run_agent(
+    agent: "Agent",
+    user_prompt: str,
+    *,
+    system_prompt: str,
+    model_name: str,
+    result_type: Type[T],
+    cache: Optional[ResponseCache] = None,
+    provider: Optional[str] = None,
+    on_partial: Optional[Callable[[T], None]] = None,
+    name: Optional[str] = None,
+    policy: Optional[ResiliencePolicy] = None,
+) -> T:
+    """
+    Runs an agent and returns its validated result (`response.data`).
+    Identical (system prompt, model, schema, input) calls are served from the
+    response cache without a model round trip.
+    Every model request (including retries and hedged duplicates) waits on the
+    provider's rate limiter, if one is set; the provider defaults to the
+    configured model backend (Settings.model_backend).
+
+    With `on_partial`, the model output is streamed and every partially
+    validated result is passed to the callback before the final one is returned.
+
+    Model calls run under the resilience policy (timeouts, retries, graph deadline,
+    hedging - the latter only for non-streamed calls).
+
+    Every call is recorded in the metrics registry / current run trace under `name`.
+    """
+    name = name or result_type.__name__
+    cache = cache if cache is not None else get_response_cache()
+    key = None
+    if cache is not None:
+        key = make_cache_key(system_prompt, model_name, result_type, user_prompt)
+        cached = cache.get(key, result_type)
+        if cached is not None:
+            print(f"Cache hit ({result_type.__name__})")
+            record_agent_call(name, cache_hit=True)
+            return cached
+
+    queue_seconds = 0.0
+    limiter = get_rate_limiter(provider or get_settings().model_backend)
+
+    async def attempt():
+        nonlocal queue_seconds
+        if limiter is not None:
+            queue_seconds += await limiter.acquire()
+        attempt_start = time.perf_counter()
+        result = await _call_model(agent, user_prompt, on_partial)
+        observe_attempt(name, time.perf_counter() - attempt_start)
+        return result
+
+    start = time.perf_counter()
+    try:
+        (data, usage), retries = await call_with_policy(attempt, name, policy, hedge=on_partial is None)
+    except Exception:
+        record_agent_call(
+            name,
+            cache_hit=False,
+            queue_seconds=queue_seconds,
+            model_seconds=max(0.0, time.perf_counter() - start - queue_seconds),
+            status="error",
+        )
+        raise
+    record_agent_call(
+        name,
+        cache_hit=False,
+        queue_seconds=queue_seconds,
+        model_seconds=max(0.0, time.perf_counter() - start - queue_seconds),
+        usage=usage,
+        retries=retries,
+    )
+
+    if cache is not None:
+        cache.set(key, data)
+    return data
+
+
+async def _call_model(agent: "Agent", user_prompt: str, on_partial=None):
+    """
+    One model round trip; returns (validated data, usage).
+    """
+    if on_partial is not None:
+        async with agent.run_stream(user_prompt) as response:
+            async for message, is_last in response.stream_structured(debounce_by=0.05):
+                try:
+                    partial = await response.validate_structured_result(
+                        message, allow_partial=not is_last
+                    )
+                except ValidationError:
+                    # early chunks may not have every required field yet
+                    continue
+                on_partial(partial)
+            data = await response.get_data()
+            return data, response.usage()
+
+    response = await agent.run(user_prompt)
+    return response.data, response.usage()
+
+
+def model_id() -> str:
+    """
+    Model name used in cache / result-store keys; non-OpenAI backends are prefixed
+    so offline answers never share (possibly persistent) entries with real models.
+    """
+    settings = get_settings()
+    if settings.model_backend != "openai":
+        return f"{settings.model_backend}:{settings.model_name}"
+    return settings.model_name
+
+
+async def run_named_agent(name: str, user_prompt: str, **kwargs) -> BaseModel:
+    """
+    run_agent() for a registered agent (see cores.agent_factory), e.g. "realist_stoic".
+    """
+    spec = get_spec(name)
+    return await run_agent(
+        get_agent(name),
+        user_prompt,
+        system_prompt=spec.system_prompt,
+        model_name=model_id(),
+        result_type=spec.result_type,
+        name=name,
+        **kwargs,
+    )
@@ -0,0 +1,341 @@
+"""
+Conversation analytics: the message list as columnar NumPy arrays, and per-sender
+statistics computed on them in a vectorized way (message / word share, length,
+questions, emoji, messages per turn, who starts conversations, reply times).
+
+The summary is given to the persona agents (a "Conversation statistics" section
+of the situation, see cores.processing) so they don't have to infer reply patterns
+and effort asymmetry from the raw text, and shown in the UI.
+
+Benchmark:
+    python -m cores.analytics --messages 100000
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# a gap this long (with timestamps) starts a new conversation
+SESSION_GAP_SECONDS = 6 * 3600
+
+_SENDER_ORDER = {"Me": 0, "SO": 1}
+_EMOJI_RANGES = ((0x1F300, 0x1FAFF), (0x2600, 0x27BF), (0x1F1E6, 0x1F1FF))
+
+
+@dataclass
+class ConversationColumns:
+    """
+    One array per feature, one row per message.
+    """
+
+    senders: List[str]  # sender code -> name
+    sender: np.ndarray  # int16 codes
+    length: np.ndarray  # int32 characters
+    words: np.ndarray  # int32
+    questions: np.ndarray  # int32 "?" count
+    emoji: np.ndarray  # int32
+    timestamp: np.ndarray  # float64 epoch seconds, nan when unknown
+
+    def __len__(self) -> int:
+        return len(self.sender)
+
+
+# --- Timestamps ---
+TIMESTAMP_WIDTH = 24  # characters of an exported timestamp that are looked at
+_DATE_SEPARATORS = np.array([ord("."), ord("/"), ord("-")], dtype=np.uint32)
+_POW10 = 10.0 ** np.arange(TIMESTAMP_WIDTH)
+
+
+def _timestamp_fields(values: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Scans a column of strings as one (n, TIMESTAMP_WIDTH) code point array.
+    Returns the first 6 digit runs of each row as integers, the number of runs,
+    the code point after each of the first two runs (the date separators), and
+    the AM/PM marker (0 none, 1 AM, 2 PM).
+    """
+    n, width = len(values), TIMESTAMP_WIDTH
+    codes = np.array(values, dtype=f"U{width}").view(np.uint32).reshape(n, width)
+    digit = (codes >= ord("0")) & (codes <= ord("9"))
+    run_start = digit.copy()
+    run_start[:, 1:] &= ~digit[:, :-1]
+    field = np.cumsum(run_start, axis=1, dtype=np.int8) - 1
+
+    # each digit adds digit * 10^(places before the end of its run) to its field
+    index = np.flatnonzero(digit).astype(np.int32)
+    starts = run_start.ravel()[index]
+    run_end = index[np.append(starts[1:], True)]
+    place = run_end[np.cumsum(starts, dtype=np.int32) - 1] - index
+    field_of = field.ravel()[index]
+    kept = field_of < 6
+    index, place = index[kept], place[kept]
+    fields = np.bincount(
+        (index // width) * 6 + field_of[kept],
+        weights=(codes.ravel()[index] - ord("0")) * _POW10[place],
+        minlength=n * 6,
+    ).reshape(n, 6).astype(np.int64)
+
+    separators = np.zeros((n, 2), dtype=np.uint32)
+    end_field = field.ravel()[run_end]
+    has_next = (run_end % width < width - 1) & (end_field < 2)
+    separators[run_end[has_next] // width, end_field[has_next]] = codes.ravel()[run_end[has_next] + 1]
+
+    # "AM"/"PM", only looked for in rows with an "m"
+    meridiem = np.zeros(n, dtype=np.int8)
+    letters = codes | 0x20  # ASCII lower case
+    rows = np.flatnonzero((letters[:, 1:] == ord("m")).any(axis=1))
+    if rows.size:
+        marked = letters[rows]
+        after_m = marked[:, :-1][marked[:, 1:] == ord("m")]
+        m_rows = rows[np.nonzero(marked[:, 1:] == ord("m"))[0]]
+        meridiem[m_rows[after_m == ord("a")]] = 1
+        meridiem[m_rows[after_m == ord("p")]] = 2
+    return fields, run_start.sum(axis=1), separators, meridiem
+
+
+def parse_timestamps(values: Sequence[Optional[object]]) -> np.ndarray:
+    """
+    Epoch seconds (nan when missing/unparseable) for a column of exported
+    timestamps: epoch seconds or milliseconds, ISO 8601 (the time zone is
+    ignored), or chat-export dates like "31/12/23, 9:41 PM". Day/month order is
+    decided for the whole column (day first if any first field is above 12).
+    """
+    n = len(values)
+    result = np.full(n, np.nan)
+    if set(map(type, values)) <= {str}:
+        strings, positions = list(values), np.arange(n)
+    else:
+        strings, positions = [], []
+        for i, value in enumerate(values):
+            if isinstance(value, (int, float)):
+                result[i] = float(value)
+            elif isinstance(value, str):
+                strings.append(value)
+                positions.append(i)
+        positions = np.array(positions, dtype=np.int64)
+
+    if strings:
+        fields, count, separators, meridiem = _timestamp_fields(strings)
+        dated = (count >= 5) & np.isin(separators, _DATE_SEPARATORS).all(axis=1)
+        a, b, c, hour, minute, second = fields[dated].T
+        year_first = a > 31
+        day_first = bool(np.any(a[~year_first] > 12))
+        year = np.where(year_first, a, c)
+        year = np.where(year < 100, year + 2000, year)
+        month = np.where(year_first, b, b if day_first else a)
+        day = np.where(year_first, c, a if day_first else b)
+        pm, am = meridiem[dated] == 2, meridiem[dated] == 1
+        hour = np.where(pm & (hour < 12), hour + 12, np.where(am & (hour == 12), 0, hour))
+        valid = (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31) & (hour < 24) & (minute < 60)
+        months = (year - 1970) * 12 + np.clip(month, 1, 12) - 1
+        days = months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) + day - 1
+        seconds = days * 86400 + hour * 3600 + minute * 60 + second
+        result[positions[dated]] = np.where(valid, seconds, np.nan)
+        # anything else: numeric strings (epoch), one at a time
+        for i in positions[~dated & (count > 0)]:
+            try:
+                result[i] = float(values[i])
+            except ValueError:
+                pass
+    # epoch milliseconds
+    result[result > 1e11] /= 1000
+    return result
+
+
+# --- Columns ---
+def to_columns(conversation: List[dict]) -> ConversationColumns:
+    """
+    Builds the feature columns. Text features are computed over the code points
+    of all messages joined into one array, reduced per message with np.add.reduceat.
+    """
+    n = len(conversation)
+    texts = [str(msg.get("message") or "") for msg in conversation]
+    length = np.fromiter(map(len, texts), dtype=np.int32, count=n)
+    timestamp = parse_timestamps([msg.get("timestamp") for msg in conversation])
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int32)
+        return ConversationColumns(["Me", "SO"], empty.astype(np.int16), length, empty, empty, empty, timestamp)
+
+    # "Me" and "SO" first, then any other sender by name
+    names, sender = np.unique(np.array([str(msg.get("sender") or "SO") for msg in conversation]), return_inverse=True)
+    order = sorted(range(len(names)), key=lambda code: (_SENDER_ORDER.get(names[code], 2), names[code]))
+    recode = np.empty(len(names), dtype=np.int16)
+    recode[order] = np.arange(len(names))
+    senders = [str(names[code]) for code in order]
+    sender = recode[sender]
+
+    # one "\n" after each message: every segment is non-empty, and words can't span messages
+    codes = np.frombuffer(("\n".join(texts) + "\n").encode("utf-32-le"), dtype=np.uint32)
+    starts = np.concatenate(([0], np.cumsum(length[:-1] + 1)))
+    space = (codes <= ord(" ")) | (codes == 0xA0)
+    word_start = ~space & np.concatenate(([True], space[:-1]))
+    emoji = np.zeros(len(codes), dtype=bool)
+    for low, high in _EMOJI_RANGES:
+        emoji |= (codes >= low) & (codes <= high)
+    return ConversationColumns(
+        senders=senders,
+        sender=sender,
+        length=length,
+        words=np.add.reduceat(word_start, starts).astype(np.int32),
+        questions=np.add.reduceat(codes == ord("?"), starts).astype(np.int32),
+        emoji=np.add.reduceat(emoji, starts).astype(np.int32),
+        timestamp=timestamp,
+    )
+
+
+# --- Statistics ---
+def _share(values: np.ndarray) -> np.ndarray:
+    total = values.sum()
+    return values / total if total else np.zeros(len(values))
+
+
+def conversation_stats(conversation: List[dict]) -> Optional[dict]:
+    """
+    Per-sender statistics (JSON-serializable), or None for an empty conversation:
+        {"messages": n, "timed": bool, "senders": {name: {...}}}
+    Reply times and session starts need timestamps; without them "conversations
+    started" only counts the first message.
+    """
+    cols = to_columns(conversation)
+    n = len(cols)
+    if n == 0:
+        return None
+    k = len(cols.senders)
+    count = np.bincount(cols.sender, minlength=k)
+    words = np.bincount(cols.sender, weights=cols.words, minlength=k)
+    chars = np.bincount(cols.sender, weights=cols.length, minlength=k)
+    questions = np.bincount(cols.sender, weights=cols.questions, minlength=k)
+    emoji = np.bincount(cols.sender, weights=cols.emoji, minlength=k)
+
+    # turns: runs of consecutive messages by the same sender
+    turn_start = np.concatenate(([True], cols.sender[1:] != cols.sender[:-1]))
+    turns = np.bincount(cols.sender[turn_start], minlength=k)
+
+    timed = bool(np.isfinite(cols.timestamp).sum() >= 2)
+    gaps = np.diff(cols.timestamp)
+    if timed:
+        session_start = np.concatenate(([True], ~(gaps <= SESSION_GAP_SECONDS)))
+    else:
+        session_start = np.zeros(n, dtype=bool)
+        session_start[0] = True
+    started = np.bincount(cols.sender[session_start], minlength=k)
+
+    reply_median = np.full(k, np.nan)
+    if timed:
+        # a reply: sender changed, both times known, within the same conversation
+        is_reply = (cols.sender[1:] != cols.sender[:-1]) & np.isfinite(gaps) & (gaps >= 0)
+        is_reply &= gaps <= SESSION_GAP_SECONDS
+        replier, delay = cols.sender[1:][is_reply], gaps[is_reply]
+        for code in range(k):
+            delays = delay[replier == code]
+            if delays.size:
+                reply_median[code] = float(np.median(delays))
+
+    median_length = [
+        float(np.median(cols.length[cols.sender == code])) if count[code] else 0.0 for code in range(k)
+    ]
+    message_share, word_share = _share(count), _share(words)
+    senders = {}
+    for code, name in enumerate(cols.senders):
+        if not count[code]:
+            continue
+        senders[name] = {
+            "messages": int(count[code]),
+            "message_share": round(float(message_share[code]), 3),
+            "word_share": round(float(word_share[code]), 3),
+            "avg_length": round(float(chars[code] / count[code]), 1),
+            "median_length": median_length[code],
+            "questions_per_message": round(float(questions[code] / count[code]), 3),
+            "emoji_per_message": round(float(emoji[code] / count[code]), 3),
+            "messages_per_turn": round(float(count[code] / turns[code]), 2) if turns[code] else 0.0,
+            "conversations_started": int(started[code]),
+            "median_reply_seconds": None if np.isnan(reply_median[code]) else round(float(reply_median[code])),
+        }
+    return {"messages": n, "timed": timed, "senders": senders}
+
+
+def _duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds // 3600:.0f}h{(seconds % 3600) / 60:02.0f}m"
+
+
+def stats_summary(stats: Optional[dict]) -> List[str]:
+    """
+    Compact lines for the agents' input / the UI, one per statistic, e.g.
+    "Share of words: Me 61%, SO 39%".
+    """
+    if not stats:
+        return []
+    senders = stats["senders"]
+
+    def line(label: str, fmt) -> str:
+        return f"{label}: " + ", ".join(f"{name} {fmt(s)}" for name, s in senders.items())
+
+    lines = [
+        line("Messages", lambda s: f"{s['messages']} ({s['message_share']:.0%})"),
+        line("Share of words", lambda s: f"{s['word_share']:.0%}"),
+        line("Average message length (chars)", lambda s: f"{s['avg_length']:.0f}"),
+        line("Questions per message", lambda s: f"{s['questions_per_message']:.2f}"),
+        line("Emoji per message", lambda s: f"{s['emoji_per_message']:.2f}"),
+        line("Messages per turn (double texting)", lambda s: f"{s['messages_per_turn']:.1f}"),
+    ]
+    if stats["timed"]:
+        lines.append(line("Conversations started", lambda s: str(s["conversations_started"])))
+        lines.append(
+            line(
+                "Median reply time",
+                lambda s: _duration(s["median_reply_seconds"]) if s["median_reply_seconds"] is not None else "n/a",
+            )
+        )
+    else:
+        first = next(name for name, s in senders.items() if s["conversations_started"])
+        lines.append(f"First message by: {first} (no timestamps, so reply times are unknown)")
+    return lines
+
+
+# --- Benchmark ---
+def synthetic_conversation(n: int, seed: int = 0) -> List[dict]:
+    rng = np.random.default_rng(seed)
+    words = "hey ok lol sure maybe tonight? 😂 love you busy call me later what why 🙂 really".split()
+    times = 1_700_000_000 + np.cumsum(rng.exponential(900, n)).astype(np.int64)
+    senders = rng.random(n) < 0.55
+    lengths = rng.integers(1, 25, n)
+    picks = rng.integers(0, len(words), int(lengths.sum()))
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    conversation = []
+    for i in range(n):
+        stamp = time.gmtime(int(times[i]))
+        conversation.append(
+            {
+                "sender": "Me" if senders[i] else "SO",
+                "message": " ".join(words[j] for j in picks[offsets[i] : offsets[i + 1]]),
+                "timestamp": time.strftime("%d/%m/%Y, %H:%M:%S", stamp),
+            }
+        )
+    return conversation
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark conversation analytics.")
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    conversation = synthetic_conversation(args.messages)
+    durations = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        stats = conversation_stats(conversation)
+        durations.append(time.perf_counter() - start)
+    for line in stats_summary(stats):
+        print(f"- {line}")
+    print(f"{args.messages} messages: best {min(durations) * 1000:.0f} ms, worst {max(durations) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,9 @@
 from cores.prompts import BALANCED_MEDIATOR_PROMPT
+from cores.agent_factory import register_agent, get_agent, get_model
 
 from typing import List, Set, Literal, Dict, Any, Optional
 
 from pydantic import BaseModel, Field
-from pydantic_ai import Agent
-from pydantic_ai.models.openai import OpenAIModel
-
-from dotenv import load_dotenv
-
-import streamlit as st
-import os
-
-# from dotenv import load_dotenv
-
-# load_dotenv()
-# Set the OpenAI API key via environment variable
-os.environ["OPENAI_API_KEY"] = st.secrets["openai_api_key"]
 
 
 class BalancedMediatorResponse(BaseModel):
@@ -31,10 +19,20 @@ class BalancedMediatorResponse(BaseModel):
     retrieved_resources: Optional[List[str]]
 
 
-model = OpenAIModel(model_name="gpt-4o-mini")
-
-balanced_mediator_agent = Agent(
-    model=model,
+spec = register_agent(
+    "balanced_mediator",
     system_prompt=BALANCED_MEDIATOR_PROMPT,
     result_type=BalancedMediatorResponse,
 )
+
+
+def __getattr__(attr):
+    """
+    `balanced_mediator_agent` / `model` are built lazily on first access (see cores.agent_factory),
+    so importing this module has no side effects.
+    """
+    if attr == "balanced_mediator_agent":
+        return get_agent("balanced_mediator")
+    if attr == "model":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
@@ -0,0 +1,220 @@
+"""
+Batch analysis over a JSONL corpus.
+
+Each input line is a record:
+    {"id": "...", "background": "...", "context": "...",
+     "conversation": [{"sender": "Me", "message": "..."}, ...]}
+("id" is optional; a content hash is used when missing.)
+
+Each output line is {"id": ..., "result": <serialized GraphMessage>} and is written
+as soon as that record finishes. Re-running with the same output file skips records
+whose id already has a result without an error, so interrupted runs can be resumed
+and failed records are retried (the retry's line is appended after the failed one).
+
+Usage:
+    python -m cores.batch input.jsonl output.jsonl --concurrency 8 --rpm openai=500
+    python -m cores.batch input.jsonl triage.jsonl --topology lexicon   # phrase scan only, no model calls
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+from cores.main_graph import build_graph_input_async, run_graph, serialize_state
+from cores.metrics import default_metrics_port, serve_metrics
+from cores.rate_limit import set_rate_limit
+from cores.runtime import run_sync
+from cores.settings import MODEL_BACKENDS
+
+
+def record_id(record: dict) -> str:
+    """
+    Stable id for a record: explicit "id" field, else a hash of its content.
+    """
+    if record.get("id") is not None:
+        return str(record["id"])
+    content = json.dumps(
+        [record.get("background", ""), record.get("context", ""), record.get("conversation", [])],
+        sort_keys=True,
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+
+def load_done_ids(output_path: str) -> Set[str]:
+    """
+    Ids with a successful result in the output file; failed results don't count,
+    so they are retried (a truncated last line is ignored).
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                if not (entry.get("result") or {}).get("error"):
+                    done.add(entry["id"])
+            except (ValueError, KeyError, AttributeError):
+                continue
+    return done
+
+
+def iter_records(input_path: str) -> Iterator[Tuple[int, dict]]:
+    """
+    Streams records from a JSONL file one line at a time.
+    """
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                print(f"Skipping malformed line {line_no}: {e}")
+                continue
+            if not isinstance(record, dict):
+                print(f"Skipping malformed line {line_no}: not a JSON object")
+                continue
+            yield line_no, record
+
+
+async def run_record(record: dict, topology: str) -> dict:
+    """
+    Serialized final state of one record, or {"error": ...}; never raises, so a
+    malformed record can't stop its worker.
+    """
+    try:
+        graph_input = await build_graph_input_async(
+            record.get("background", ""),
+            record.get("context", ""),
+            record.get("conversation", []),
+            topology=topology,
+        )
+        final_state = await run_graph(graph_input, topology)
+        return serialize_state(final_state)
+    except Exception as e:
+        return {"error": f"Failed to run graph analysis: {e}"}
+
+
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    concurrency: int = 4,
+    topology: str = "parallel",
+    limit: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Runs the graph over every pending record with at most `concurrency` runs in flight.
+    Only a bounded queue of records is held in memory at any time.
+    """
+    done = load_done_ids(output_path)
+    stats = {"done": 0, "skipped": 0, "failed": 0}
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    with open(output_path, "a", encoding="utf-8") as out:
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    queue.task_done()
+                    return
+                rid, record = item
+                result = await run_record(record, topology)
+                out.write(json.dumps({"id": rid, "result": result}) + "\n")
+                out.flush()
+                stats["failed" if result.get("error") else "done"] += 1
+                total = stats["done"] + stats["failed"]
+                print(f"[{total}] {rid}: {'error' if result.get('error') else 'ok'}")
+                queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+
+        submitted = 0
+        for _, record in iter_records(input_path):
+            rid = record_id(record)
+            if rid in done:
+                stats["skipped"] += 1
+                continue
+            done.add(rid)  # duplicate ids inside the input run once
+            await queue.put((rid, record))
+            submitted += 1
+            if limit is not None and submitted >= limit:
+                break
+
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    return stats
+
+
+def parse_rpm(values) -> Dict[str, float]:
+    """
+    Parses ["openai=500", ...] into {"openai": 500.0}. Providers are the model
+    backends (MODEL_BACKENDS); limits must be positive.
+    """
+    limits = {}
+    for value in values or []:
+        provider, _, rpm = value.partition("=")
+        if provider not in MODEL_BACKENDS:
+            raise ValueError(
+                f"--rpm {value!r}: provider must be one of {', '.join(MODEL_BACKENDS)}"
+            )
+        try:
+            limits[provider] = float(rpm)
+        except ValueError:
+            raise ValueError(f"--rpm {value!r}: expected PROVIDER=N") from None
+        if not limits[provider] > 0:
+            raise ValueError(f"--rpm {value!r}: requests per minute must be positive")
+    return limits
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the analysis graph over a JSONL file.")
+    parser.add_argument("input", help="input JSONL (background, context, conversation)")
+    parser.add_argument("output", help="output JSONL, appended to / resumed from")
+    parser.add_argument("--concurrency", type=int, default=4, help="graph runs in flight")
+    parser.add_argument(
+        "--rpm",
+        action="append",
+        metavar="PROVIDER=N",
+        help="requests per minute for a model provider, e.g. openai=500 (repeatable)",
+    )
+    parser.add_argument("--topology", default="parallel")
+    parser.add_argument("--limit", type=int, default=None, help="max records to run")
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=default_metrics_port(),
+        help="serve /metrics on this port while running (default METRICS_PORT, 0 = off)",
+    )
+    args = parser.parse_args(argv)
+    serve_metrics(args.metrics_port)
+
+    try:
+        limits = parse_rpm(args.rpm)
+    except ValueError as e:
+        parser.error(str(e))
+    for provider, rpm in limits.items():
+        set_rate_limit(provider, rpm)
+
+    stats = run_sync(
+        run_batch(
+            args.input,
+            args.output,
+            concurrency=args.concurrency,
+            topology=args.topology,
+            limit=args.limit,
+        )
+    )
+    print(f"Batch complete: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Type, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar("T", bound=BaseModel)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes input text so trivially different submissions (extra spaces,
+    blank lines, trailing whitespace) map to the same cache entry.
+    """
+    return " ".join(text.split())
+
+
+def make_cache_key(
+    system_prompt: str, model_name: str, result_type: Type[BaseModel], text: str
+) -> str:
+    """
+    Content-addressed key: hash of (system prompt, model, result schema, input text).
+    """
+    schema = json.dumps(result_type.model_json_schema(), sort_keys=True)
+    payload = "\x1f".join(
+        [system_prompt, model_name, schema, normalize_text(text)]
+    ).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+# --- Tier 1: in-memory LRU with TTL ---
+class MemoryTier:
+    """
+    Thread-safe LRU dict with a per-entry TTL and a max entry count.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# --- Tier 2: optional on-disk SQLite ---
+class SQLiteTier:
+    """
+    Persistent key/value tier backed by a single SQLite file.
+    Entries older than `ttl` seconds are treated as misses and purged lazily.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = 7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl and created_at + self.ttl < time.time():
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, created_at)"
+                " VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+            self._conn.commit()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of validated agent responses (memory LRU -> optional SQLite).
+    Values are stored as JSON and re-validated against the result_type on hit.
+    """
+
+    def __init__(self, memory: Optional[MemoryTier] = None, disk: Optional[SQLiteTier] = None):
+        self.memory = memory if memory is not None else MemoryTier()
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, result_type: Type[T]) -> Optional[T]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                # promote to the fast tier
+                self.memory.set(key, value)
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return result_type.model_validate_json(value)
+
+    def set(self, key: str, response: BaseModel) -> None:
+        value = response.model_dump_json()
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self.memory),
+        }
+
+
+# --- Process-wide default cache ---
+_default_cache: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Returns the shared response cache, built from environment variables on first use:
+        RESPONSE_CACHE_ENABLED (default "1"), RESPONSE_CACHE_SIZE (default 256),
+        RESPONSE_CACHE_TTL seconds (default 3600), RESPONSE_CACHE_DB (SQLite path, optional).
+    Returns None when caching is disabled.
+    """
+    global _default_cache
+    if os.environ.get("RESPONSE_CACHE_ENABLED", "1") == "0":
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            memory = MemoryTier(
+                max_entries=int(os.environ.get("RESPONSE_CACHE_SIZE", 256)),
+                ttl=float(os.environ.get("RESPONSE_CACHE_TTL", 3600)),
+            )
+            db_path = os.environ.get("RESPONSE_CACHE_DB")
+            disk = SQLiteTier(db_path) if db_path else None
+            _default_cache = ResponseCache(memory=memory, disk=disk)
+        return _default_cache
+
+
+def set_response_cache(cache: Optional[ResponseCache]) -> None:
+    """
+    Replaces the shared cache (e.g. to plug in a custom tier setup).
+    """
+    global _default_cache
+    with _default_lock:
+        _default_cache = cache
@@ -0,0 +1,38 @@
+from cores.prompts import COMBINED_PERSONAS_PROMPT
+from cores.agent_factory import register_agent, get_agent, get_model
+from cores.positive_agent import HopelessRomanticResponse
+from cores.negative_agent import RealistStoicResponse
+
+from pydantic import BaseModel, Field
+
+
+class CombinedPersonasResponse(BaseModel):
+    """
+    Both persona analyses produced by a single structured-output request.
+    """
+
+    hopeless_romantic: HopelessRomanticResponse = Field(
+        description="The Hopeless Romantic's analysis."
+    )
+    realist_stoic: RealistStoicResponse = Field(
+        description="The Practical Stoic's analysis."
+    )
+
+
+spec = register_agent(
+    "combined_personas",
+    system_prompt=COMBINED_PERSONAS_PROMPT,
+    result_type=CombinedPersonasResponse,
+)
+
+
+def __getattr__(attr):
+    """
+    `combined_personas_agent` / `model` are built lazily on first access (see cores.agent_factory),
+    so importing this module has no side effects.
+    """
+    if attr == "combined_personas_agent":
+        return get_agent("combined_personas")
+    if attr == "model":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
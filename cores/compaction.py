@@ -0,0 +1,198 @@
+"""
+Token budgeting for the conversation sent to the agents.
+
+Over budget, older messages are compacted step by step, stopping as soon as
+the conversation fits:
+    1. drop consecutive duplicate messages
+    2. collapse consecutive messages by the same sender into one
+    3. cap very long single messages
+    4. keep the first few and the most recent messages, dropping the middle
+"""
+
+import functools
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+Message = Dict[str, str]
+
+OMITTED_SENDER = "..."
+
+
+# --- Token counting ---
+@functools.lru_cache(maxsize=8)
+def _get_encoding(model_name: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model_name: str = "gpt-4o-mini") -> int:
+    """
+    Token count for `model_name` (exact with tiktoken installed, ~4 chars/token otherwise).
+    """
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def message_tokens(msg: Message, model_name: str) -> int:
+    return count_tokens(f"{msg['sender']}: {msg['message']}\n", model_name)
+
+
+@dataclass
+class CompactionReport:
+    """
+    What compaction did to one conversation.
+    """
+
+    budget: int
+    original_tokens: int
+    final_tokens: int
+    original_messages: int
+    final_messages: int
+    steps: List[str] = field(default_factory=list)
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.final_tokens
+
+    def to_dict(self) -> dict:
+        return {
+            "budget": self.budget,
+            "original_tokens": self.original_tokens,
+            "final_tokens": self.final_tokens,
+            "saved_tokens": self.saved_tokens,
+            "original_messages": self.original_messages,
+            "final_messages": self.final_messages,
+            "steps": self.steps,
+        }
+
+
+# --- Compaction steps ---
+def dedupe_consecutive(conversation: List[Message]) -> List[Message]:
+    output = []
+    for msg in conversation:
+        if output and output[-1]["sender"] == msg["sender"] and output[-1]["message"] == msg["message"]:
+            continue
+        output.append(msg)
+    return output
+
+
+def collapse_sender_runs(conversation: List[Message], separator: str = " / ") -> List[Message]:
+    output = []
+    for msg in conversation:
+        if output and output[-1]["sender"] == msg["sender"]:
+            output[-1] = {
+                "sender": msg["sender"],
+                "message": output[-1]["message"] + separator + msg["message"],
+            }
+        else:
+            output.append(dict(msg))
+    return output
+
+
+def cap_long_messages(conversation: List[Message], max_chars: int) -> List[Message]:
+    output = []
+    for msg in conversation:
+        text = msg["message"]
+        if len(text) > max_chars:
+            half = max_chars // 2
+            text = f"{text[:half]} [...] {text[-half:]}"
+        output.append({"sender": msg["sender"], "message": text})
+    return output
+
+
+def truncate_middle(
+    conversation: List[Message], budget: int, model_name: str, keep_head: int = 4
+) -> List[Message]:
+    """
+    Keeps the first `keep_head` messages plus as many of the latest messages as fit.
+    """
+    head = conversation[:keep_head]
+    used = sum(message_tokens(m, model_name) for m in head)
+
+    tail: List[Message] = []
+    for msg in reversed(conversation[keep_head:]):
+        cost = message_tokens(msg, model_name)
+        if used + cost > budget:
+            break
+        tail.append(msg)
+        used += cost
+    tail.reverse()
+
+    omitted = len(conversation) - len(head) - len(tail)
+    if omitted <= 0:
+        return head + tail
+    marker = {
+        "sender": OMITTED_SENDER,
+        "message": f"[{omitted} messages omitted]",
+    }
+    return head + [marker] + tail
+
+
+def compact_conversation(
+    conversation: List[Message],
+    budget: int,
+    model_name: str = "gpt-4o-mini",
+    keep_head: int = 4,
+    max_message_chars: int = 2000,
+) -> Tuple[List[Message], CompactionReport]:
+    """
+    Compacts `conversation` until its formatted lines fit in `budget` tokens.
+    Returns the (possibly unchanged) messages and a report of the savings.
+    """
+
+    def total(messages):
+        return sum(message_tokens(m, model_name) for m in messages)
+
+    original_tokens = total(conversation)
+    report = CompactionReport(
+        budget=budget,
+        original_tokens=original_tokens,
+        final_tokens=original_tokens,
+        original_messages=len(conversation),
+        final_messages=len(conversation),
+    )
+    if original_tokens <= budget:
+        return conversation, report
+
+    steps: List[Tuple[str, Callable]] = [
+        ("dedupe", dedupe_consecutive),
+        ("collapse_runs", collapse_sender_runs),
+        ("cap_long_messages", lambda c: cap_long_messages(c, max_message_chars)),
+        ("truncate_middle", lambda c: truncate_middle(c, budget, model_name, keep_head)),
+    ]
+    messages = conversation
+    tokens = original_tokens
+    for name, step in steps:
+        messages = step(messages)
+        tokens = total(messages)
+        report.steps.append(name)
+        if tokens <= budget:
+            break
+
+    report.final_tokens = tokens
+    report.final_messages = len(messages)
+    return messages, report
+
+
+def apply_budget(
+    conversation: List[Message],
+    overhead_text: str,
+    budget: Optional[int],
+    model_name: str,
+) -> Tuple[List[Message], Optional[CompactionReport]]:
+    """
+    Fits the conversation into what's left of `budget` after the fixed text
+    (background, context) is counted. `budget=None` disables compaction.
+    """
+    if not budget:
+        return conversation, None
+    available = max(budget - count_tokens(overhead_text, model_name), 0)
+    return compact_conversation(conversation, available, model_name)
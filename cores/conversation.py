@@ -0,0 +1,273 @@
+"""
+Compact conversation container for the UI's session state.
+
+A `Conversation` keeps the messages column-wise: sender names interned once
+(one small integer code per message), all message texts in one contiguous UTF-8
+buffer with an offset array, and (imported) timestamps as one float array.
+Slicing returns a view over the same buffers, and `to_bytes()` is a few buffer
+copies, so large imports held by many concurrent sessions stay small.
+
+Messages are still read as the {'sender', 'message'[, 'timestamp']} dicts the
+rest of the code expects: indexing and iteration build them on demand.
+
+Per-session memory, list of dicts vs Conversation:
+    python -m cores.conversation --messages 50000
+"""
+
+import argparse
+import json
+import math
+import pickle
+import sys
+import tracemalloc
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from cores.analytics import parse_timestamps
+
+_FORMAT_VERSION = 1
+
+
+class Conversation:
+    """
+    Append-only list of messages. conversation[a:b] is a read-only-until-written
+    view sharing the parent's buffers (appending to a view copies it first).
+    """
+
+    __slots__ = ("_senders", "_codes", "_offsets", "_text", "_times", "_start", "_stop")
+
+    def __init__(self) -> None:
+        self._senders: List[str] = []  # code -> interned name
+        self._codes = array("H")  # sender code per message
+        self._offsets = array("q", [0])  # byte offsets into _text, one more than messages
+        self._text = bytearray()  # UTF-8 texts, back to back
+        self._times: Optional[array] = None  # epoch seconds ("d", nan = unknown), None when never set
+        self._start = 0
+        self._stop: Optional[int] = None  # None: the whole (growing) buffer
+
+    # --- Construction ---
+    @classmethod
+    def from_messages(cls, messages: Iterable[dict]) -> "Conversation":
+        """
+        Builds a conversation from {'sender', 'message'[, 'timestamp']} dicts;
+        timestamps (any format cores.analytics understands) are parsed as one column.
+        """
+        conversation = cls()
+        stamps = []
+        for msg in messages:
+            conversation._append(msg.get("sender") or "SO", msg.get("message") or "")
+            stamps.append(msg.get("timestamp"))
+        if any(stamp is not None for stamp in stamps):
+            conversation._times = array("d")
+            conversation._times.frombytes(parse_timestamps(stamps).tobytes())
+        return conversation
+
+    def _append(self, sender: str, message: str) -> None:
+        try:
+            code = self._senders.index(sender)
+        except ValueError:
+            code = len(self._senders)
+            self._senders.append(sys.intern(str(sender)))
+        self._codes.append(code)
+        self._text += message.encode("utf-8")
+        self._offsets.append(len(self._text))
+
+    def append(self, sender: str, message: str, timestamp: Optional[float] = None) -> None:
+        if self._stop is not None:
+            self._detach()
+        self._append(sender, message)
+        if timestamp is not None and self._times is None:
+            self._times = array("d", [math.nan]) * (len(self._codes) - 1)
+        if self._times is not None:
+            self._times.append(math.nan if timestamp is None else float(timestamp))
+
+    def _detach(self) -> None:
+        """
+        Turns a view into an independent conversation holding only its messages.
+        """
+        start, stop = self._start, self._stop
+        base = self._offsets[start]
+        self._codes = self._codes[start:stop]
+        self._text = self._text[base : self._offsets[stop]]
+        self._offsets = array("q", (offset - base for offset in self._offsets[start : stop + 1]))
+        if self._times is not None:
+            self._times = self._times[start:stop]
+        self._senders = list(self._senders)
+        self._start, self._stop = 0, None
+
+    # --- Sequence interface ---
+    def _bounds(self):
+        return self._start, len(self._codes) if self._stop is None else self._stop
+
+    def __len__(self) -> int:
+        start, stop = self._bounds()
+        return stop - start
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def sender(self, index: int) -> str:
+        return self._senders[self._codes[self._start + index]]
+
+    def message(self, index: int) -> str:
+        i = self._start + index
+        return self._text[self._offsets[i] : self._offsets[i + 1]].decode("utf-8")
+
+    def timestamp(self, index: int) -> Optional[float]:
+        if self._times is None:
+            return None
+        value = self._times[self._start + index]
+        return None if math.isnan(value) else value
+
+    def _message_dict(self, index: int) -> Dict[str, Union[str, float]]:
+        msg = {"sender": self.sender(index), "message": self.message(index)}
+        timestamp = self.timestamp(index)
+        if timestamp is not None:
+            msg["timestamp"] = timestamp
+        return msg
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("Conversation slices don't support a step")
+            view = object.__new__(Conversation)
+            view._senders, view._codes, view._offsets = self._senders, self._codes, self._offsets
+            view._text, view._times = self._text, self._times
+            view._start, view._stop = self._start + start, self._start + max(start, stop)
+            return view
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Conversation index out of range")
+        return self._message_dict(index)
+
+    def __iter__(self) -> Iterator[Dict[str, Union[str, float]]]:
+        for index in range(len(self)):
+            yield self._message_dict(index)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Conversation):
+            return NotImplemented
+        return self.to_bytes() == other.to_bytes()
+
+    def __repr__(self) -> str:
+        return f"Conversation({len(self)} messages, senders={self.senders})"
+
+    @property
+    def senders(self) -> List[str]:
+        """
+        Names of the senders in this conversation (or view), in order of first message.
+        """
+        start, stop = self._bounds()
+        return [self._senders[code] for code in dict.fromkeys(self._codes[start:stop])]
+
+    def to_list(self) -> List[Dict[str, Union[str, float]]]:
+        """
+        The messages as plain dicts (e.g. for a JSON job request).
+        """
+        return list(self)
+
+    # --- Serialization ---
+    def to_bytes(self) -> bytes:
+        """
+        Compact binary form: a JSON header, then the code, offset, text and
+        timestamp buffers as they are in memory.
+        """
+        start, stop = self._bounds()
+        base, end = self._offsets[start], self._offsets[stop]
+        offsets = self._offsets[start : stop + 1]
+        if base:
+            offsets = array("q", (offset - base for offset in offsets))
+        # only the senders of this range, so equal messages give equal bytes
+        senders, codes = self.senders, self._codes[start:stop]
+        if senders != self._senders:
+            recode = {self._senders.index(name): code for code, name in enumerate(senders)}
+            codes = array("H", (recode[code] for code in codes))
+        header = json.dumps(
+            {
+                "version": _FORMAT_VERSION,
+                "senders": senders,
+                "messages": stop - start,
+                "text_bytes": end - base,
+                "timestamps": self._times is not None,
+                "byteorder": sys.byteorder,
+            }
+        ).encode("utf-8")
+        parts = [len(header).to_bytes(4, "little"), header, codes.tobytes()]
+        parts += [offsets.tobytes(), bytes(self._text[base:end])]
+        if self._times is not None:
+            parts.append(self._times[start:stop].tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Conversation":
+        header_size = int.from_bytes(data[:4], "little")
+        header = json.loads(data[4 : 4 + header_size])
+        if header.get("version") != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported conversation format {header.get('version')}")
+        n, position = header["messages"], 4 + header_size
+        conversation = cls()
+        conversation._senders = [sys.intern(name) for name in header["senders"]]
+
+        def take(typecode: str, count: int) -> array:
+            nonlocal position
+            values = array(typecode)
+            values.frombytes(data[position : position + count * values.itemsize])
+            position += count * values.itemsize
+            if header["byteorder"] != sys.byteorder:
+                values.byteswap()
+            return values
+
+        conversation._codes = take("H", n)
+        conversation._offsets = take("q", n + 1)
+        conversation._text = bytearray(data[position : position + header["text_bytes"]])
+        position += header["text_bytes"]
+        if header["timestamps"]:
+            conversation._times = take("d", n)
+        return conversation
+
+    def __reduce__(self):
+        # pickling (and Streamlit's cache hashing) goes through the compact form
+        return Conversation.from_bytes, (self.to_bytes(),)
+
+
+# --- Memory report ---
+def _allocated(build) -> tuple:
+    """
+    (object, bytes allocated while building it and still held).
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def main(argv=None):
+    from cores.analytics import synthetic_conversation
+
+    parser = argparse.ArgumentParser(description="Per-session memory of a conversation.")
+    parser.add_argument("--messages", type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    # an imported chat, as utils.chat_import returns it (round-tripped through JSON so
+    # no string is shared with the generator)
+    source = json.dumps(synthetic_conversation(args.messages))
+    as_list, list_bytes = _allocated(lambda: json.loads(source))
+    compact, compact_bytes = _allocated(lambda: Conversation.from_messages(json.loads(source)))
+    view, view_bytes = _allocated(lambda: compact[len(compact) // 2 :])
+    serialized = compact.to_bytes()
+
+    print(f"{args.messages} messages, {len(compact.senders)} senders")
+    print(f"{'list of dicts':>24}: {list_bytes / 2**20:8.2f} MiB")
+    print(f"{'Conversation':>24}: {compact_bytes / 2**20:8.2f} MiB ({list_bytes / compact_bytes:.1f}x smaller)")
+    print(f"{'half-conversation view':>24}: {view_bytes:8d} bytes")
+    print(f"{'to_bytes()':>24}: {len(serialized) / 2**20:8.2f} MiB (pickle of the list: "
+          f"{len(pickle.dumps(as_list)) / 2**20:.2f} MiB)")
+    assert Conversation.from_bytes(serialized) == compact
+
+
+if __name__ == "__main__":
+    main()
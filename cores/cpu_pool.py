@@ -0,0 +1,167 @@
+"""
+Process pool for the CPU-bound steps around a graph run (see cores.processing),
+so the event loop only does I/O and the work isn't serialized by the GIL.
+
+Environment:
+    CPU_POOL_WORKERS        worker processes: a number, "auto" (one per core) or
+                            0 (default: run in a thread of the event loop's default executor)
+    CPU_POOL_START_METHOD   multiprocessing start method (default "spawn": the app
+                            process has running threads, which fork doesn't copy safely)
+
+Throughput benchmark:
+    python -m cores.cpu_pool --workers 0,1,2,4 --items 400 --messages 300
+"""
+
+import argparse
+import asyncio
+import contextlib
+import functools
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from cores.metrics import REGISTRY
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def pool_size() -> int:
+    value = os.environ.get("CPU_POOL_WORKERS", "0").strip().lower()
+    if value == "auto":
+        return os.cpu_count() or 1
+    return int(value or 0)
+
+
+def make_pool(workers: int) -> ProcessPoolExecutor:
+    context = multiprocessing.get_context(os.environ.get("CPU_POOL_START_METHOD", "spawn"))
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Returns the shared process pool (created on first use), or None when disabled
+    or when this is a daemonic process (which may not start children).
+    """
+    global _pool
+    if _pool is not None:
+        return _pool
+    workers = pool_size()
+    if workers <= 0:
+        return None
+    if multiprocessing.current_process().daemon:
+        # daemonic processes can't have children: run in threads instead
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = make_pool(workers)
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def run_cpu(fn: Callable[..., Any], *args: Any, executor: Optional[Executor] = None) -> Any:
+    """
+    Runs fn(*args) off the event loop: in the process pool when enabled (and
+    allowed in this process), otherwise in the default thread executor. `fn` and its arguments must be
+    picklable (module-level functions over plain data).
+    """
+    executor = executor or get_process_pool()
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(executor, functools.partial(fn, *args))
+    REGISTRY.observe(
+        "cpu_task_seconds",
+        time.perf_counter() - start,
+        {"task": getattr(fn, "__name__", "task"), "mode": "process" if executor else "thread"},
+        help="CPU-bound pre/post-processing time, including pool queueing",
+    )
+    return result
+
+
+# --- Throughput benchmark ---
+def _synthetic_conversation(i: int, messages: int) -> list:
+    words = "honestly idk what this means but ok lol we should talk about friday maybe".split()
+    return [
+        {
+            "sender": "Me" if (i + n) % 3 else "SO",
+            "message": " ".join(words[(n + k) % len(words)] for k in range(8 + (i + n) % 25)),
+        }
+        for n in range(messages)
+    ]
+
+
+def _process_item(i: int, messages: int, token_budget: int, model_name: str) -> int:
+    """
+    One request's worth of CPU work: parse + compact + format input, format output.
+    """
+    from cores.processing import prepare_input, render_state_markdown
+
+    conversation = _synthetic_conversation(i, messages)
+    with contextlib.redirect_stdout(io.StringIO()):  # compaction logs every item
+        state = prepare_input(f"Benchmark case {i}", "context", conversation, token_budget, model_name)
+    persona = {
+        "overall_summary": state["background_info"][:200],
+        "red_flags": state["background_info"].split("\n")[:20],
+        "identified_tactics": [],
+        "unanswered_questions": ["?"],
+    }
+    rendered = render_state_markdown({"negative_response": [persona]})
+    return len(state["background_info"]) + len(rendered["negative_response"])
+
+
+async def _bench_level(
+    executor: Optional[Executor], items: int, messages: int, budget: int, model_name: str
+) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_cpu(_process_item, i, messages, budget, model_name, executor=executor)
+            for i in range(items)
+        )
+    )
+    return items / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark CPU-bound processing throughput vs pool size."
+    )
+    parser.add_argument(
+        "--workers", default="0,1,2,4", help="comma-separated pool sizes (0 = threads only)"
+    )
+    parser.add_argument("--items", type=int, default=200, help="requests processed per level")
+    parser.add_argument("--messages", type=int, default=300, help="messages per conversation")
+    parser.add_argument("--budget", type=int, default=2000, help="token budget (forces compaction)")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    args = parser.parse_args(argv)
+
+    print(f"cores available: {os.cpu_count()}")
+    print(f"{'workers':>8} {'items/s':>10} {'speedup':>8}")
+    baseline = None
+    for workers in (int(w) for w in args.workers.split(",")):
+        executor = make_pool(workers) if workers > 0 else None
+        try:
+            if executor is not None:
+                # warm-up: process start-up and imports aren't part of steady-state throughput
+                asyncio.run(_bench_level(executor, workers, args.messages, args.budget, args.model))
+            rate = asyncio.run(_bench_level(executor, args.items, args.messages, args.budget, args.model))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>10.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
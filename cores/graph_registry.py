@@ -0,0 +1,64 @@
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+# --- Process-wide registry of compiled graphs ---
+# Compiled LangGraph apps are immutable and safe to invoke concurrently,
+# so one instance per (topology, config) is shared by every Streamlit session / CLI run.
+_graphs: Dict[Tuple, Any] = {}
+_lock = threading.Lock()
+
+
+def _registry_key(topology: str, config: dict) -> Tuple:
+    return (topology, tuple(sorted(config.items())))
+
+
+def get_graph(topology: str = "parallel", **config):
+    """
+    Returns the compiled graph for `topology` (+ extra create_graph kwargs),
+    compiling it only on first request.
+    """
+    key = _registry_key(topology, config)
+    graph = _graphs.get(key)
+    if graph is not None:
+        return graph
+
+    with _lock:
+        # double-checked: another thread may have compiled it while we waited
+        graph = _graphs.get(key)
+        if graph is None:
+            from cores.main_graph import create_graph
+
+            graph = create_graph(topology, **config)
+            _graphs[key] = graph
+        return graph
+
+
+def clear_graphs() -> None:
+    """
+    Drops all compiled graphs (e.g. after changing node code in a dev reload).
+    """
+    with _lock:
+        _graphs.clear()
+
+
+if __name__ == "__main__":
+    # Micro-benchmark: full compilation vs. cached registry lookup
+    from cores.main_graph import create_graph
+
+    n = 20
+    start = time.perf_counter()
+    for _ in range(n):
+        create_graph()
+    compile_ms = (time.perf_counter() - start) / n * 1000
+
+    get_graph()  # warm
+    n_lookup = 100_000
+    start = time.perf_counter()
+    for _ in range(n_lookup):
+        get_graph()
+    lookup_ms = (time.perf_counter() - start) / n_lookup * 1000
+
+    print(f"create_graph(): {compile_ms:.3f} ms / call")
+    print(f"get_graph():    {lookup_ms:.5f} ms / call (cached)")
+    print(f"speed-up:       {compile_ms / lookup_ms:,.0f}x")
@@ -0,0 +1,87 @@
+"""
+Import-time regression check: `import cores` must stay cheap, and neither it nor
+the agent modules may load the model / graph / UI stacks at import (they are
+imported on first use, see cores.agent_factory and cores.__init__).
+
+Each module is imported in a fresh interpreter under `python -X importtime`;
+the exit status is 1 when `import cores` takes longer than --max-ms (best of
+--runs) or when any checked module pulls in one of the heavy packages.
+
+Usage:
+    python -m cores.importtime
+    python -m cores.importtime --max-ms 50 --runs 5
+"""
+
+import argparse
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# imported on first use only
+HEAVY_PACKAGES = ("pydantic_ai", "langgraph", "langchain_core", "openai", "streamlit", "httpx")
+# modules whose import must not load them
+CHECKED_MODULES = (
+    "cores",
+    "cores.settings",
+    "cores.agent_factory",
+    "cores.negative_agent",
+    "cores.positive_agent",
+    "cores.balanced_agent",
+    "cores.combined_agent",
+)
+
+
+def import_profile(module: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Imports `module` in a fresh interpreter; returns (its cumulative import time
+    in ms, {imported module: cumulative ms}).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imported = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            imported[name.strip()] = int(cumulative) / 1000
+        except ValueError:  # the header line
+            continue
+    return imported.get(module, 0.0), imported
+
+
+def heavy_imports(imported: Dict[str, float]) -> List[str]:
+    return sorted(name for name in imported if name.split(".")[0] in HEAVY_PACKAGES)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that importing cores stays cheap.")
+    parser.add_argument("--max-ms", type=float, default=100.0, help="budget for `import cores`")
+    parser.add_argument("--runs", type=int, default=3, help="imports timed (best one counts)")
+    args = parser.parse_args(argv)
+
+    failures = []
+    for module in CHECKED_MODULES:
+        runs = [import_profile(module) for _ in range(args.runs if module == "cores" else 1)]
+        ms = min(elapsed for elapsed, _ in runs)
+        heavy = heavy_imports(runs[0][1])
+        print(f"{module:>24}: {ms:8.1f} ms  {len(runs[0][1]):4d} modules"
+              + (f"  HEAVY: {', '.join(sorted({name.split('.')[0] for name in heavy}))}" if heavy else ""))
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy[:5])}{' ...' if len(heavy) > 5 else ''}")
+        if module == "cores" and ms > args.max_ms:
+            failures.append(f"import cores took {ms:.1f} ms (budget {args.max_ms:.0f} ms)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
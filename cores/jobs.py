@@ -0,0 +1,575 @@
+"""
+Job queue and async worker pool: the UI submits an analysis and gets a job id
+back; workers run the graph and record progress and the result on the job.
+
+Backends:
+    - SQLiteJobQueue (default): a file shared by every process on the host, so
+      dedicated worker processes can be added with `python -m cores.jobs worker`.
+    - MemoryJobQueue: in-process only (workers must run in the same process).
+
+Environment:
+    JOB_QUEUE               "sqlite" (default) | "memory"
+    JOB_QUEUE_PATH          SQLite file (default .cache/jobs.db in the repository root)
+    JOB_WORKERS             concurrent jobs per worker pool (default 4)
+    JOB_INPROCESS_WORKERS   "1" (default): the app process runs a worker pool too;
+                            set "0" when dedicated worker processes are running
+    JOB_LEASE               seconds without a heartbeat before a running job is
+                            considered abandoned and re-queued (default 60)
+    JOB_MAX_ATTEMPTS        runs per job before it is marked failed (default 3)
+
+Usage:
+    python -m cores.jobs worker --concurrency 8 --processes 2 --metrics-port 9108
+    python -m cores.jobs submit request.json --topology combined
+    python -m cores.jobs status <job id>
+"""
+
+import abc
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from cores.settings import cache_path
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+# minimum seconds between progress writes for streamed mediator output
+PARTIAL_FLUSH_INTERVAL = 0.5
+
+
+@dataclass
+class Job:
+    """
+    One analysis request and everything known about its execution.
+    `request` holds background, context, conversation and topology;
+    `progress` holds completed_nodes, the partial state and the streamed mediator output.
+    """
+
+    id: str
+    request: dict
+    status: str = QUEUED
+    progress: dict = field(default_factory=dict)
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    worker: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    heartbeat_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    @property
+    def lease(self) -> Tuple[Optional[str], int]:
+        """
+        Identifies one claim of the job: (worker, attempt). A re-claim after the
+        lease expired increments the attempt, so the earlier worker's lease is void.
+        """
+        return self.worker, self.attempts
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+# --- Backends ---
+class JobQueue(abc.ABC):
+    """
+    Interface of a job queue backend (all methods are synchronous and thread-safe).
+    """
+
+    @abc.abstractmethod
+    def submit(self, request: dict) -> Job: ...
+
+    @abc.abstractmethod
+    def get(self, job_id: str) -> Optional[Job]: ...
+
+    @abc.abstractmethod
+    def claim(self, worker: str) -> Optional[Job]:
+        """
+        Marks the oldest queued (or abandoned) job as running for `worker` and returns it.
+        """
+
+    # heartbeat / complete / fail only apply while `lease` (Job.lease of the claimed
+    # job) is still the job's current claim; they return False (and write nothing)
+    # once another worker has re-claimed the job.
+    @abc.abstractmethod
+    def heartbeat(self, job_id: str, lease: Tuple[str, int], progress: Optional[dict] = None) -> bool: ...
+
+    @abc.abstractmethod
+    def complete(self, job_id: str, lease: Tuple[str, int], result: dict) -> bool: ...
+
+    @abc.abstractmethod
+    def fail(self, job_id: str, lease: Tuple[str, int], error: str) -> bool: ...
+
+
+class MemoryJobQueue(JobQueue):
+    def __init__(self, lease: float = 60, max_attempts: int = 3):
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, request: dict) -> Job:
+        job = Job(id=uuid.uuid4().hex, request=request)
+        with self._lock:
+            self._jobs[job.id] = job
+        return Job(**job.to_dict())
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            # a copy, so callers never see a job change under them
+            return Job(**job.to_dict()) if job else None
+
+    def claim(self, worker: str) -> Optional[Job]:
+        now = time.time()
+        with self._lock:
+            for job in sorted(self._jobs.values(), key=lambda j: j.created_at):
+                abandoned = job.status == RUNNING and (job.heartbeat_at or 0) + self.lease < now
+                if job.status != QUEUED and not abandoned:
+                    continue
+                if job.attempts >= self.max_attempts:
+                    job.status, job.error, job.finished_at = FAILED, "Too many attempts", now
+                    continue
+                job.status, job.worker, job.attempts = RUNNING, worker, job.attempts + 1
+                job.started_at = job.heartbeat_at = now
+                return Job(**job.to_dict())
+        return None
+
+    def _held(self, job_id: str, lease: Tuple[str, int]) -> Optional[Job]:
+        job = self._jobs[job_id]
+        return job if job.status == RUNNING and job.lease == tuple(lease) else None
+
+    def heartbeat(self, job_id: str, lease: Tuple[str, int], progress: Optional[dict] = None) -> bool:
+        with self._lock:
+            job = self._held(job_id, lease)
+            if job is None:
+                return False
+            job.heartbeat_at = time.time()
+            if progress is not None:
+                job.progress = progress
+            return True
+
+    def complete(self, job_id: str, lease: Tuple[str, int], result: dict) -> bool:
+        with self._lock:
+            job = self._held(job_id, lease)
+            if job is None:
+                return False
+            job.status, job.result, job.finished_at = DONE, result, time.time()
+            return True
+
+    def fail(self, job_id: str, lease: Tuple[str, int], error: str) -> bool:
+        with self._lock:
+            job = self._held(job_id, lease)
+            if job is None:
+                return False
+            job.status, job.error, job.finished_at = FAILED, error, time.time()
+            return True
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Jobs in one SQLite file; claims take a write lock (BEGIN IMMEDIATE), so any
+    number of worker processes on the host can share the queue.
+    """
+
+    _COLUMNS = (
+        "id, request, status, progress, result, error, attempts, worker,"
+        " created_at, started_at, finished_at, heartbeat_at"
+    )
+
+    def __init__(self, path: str, lease: float = 60, max_attempts: int = 3):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # autocommit mode: transactions are opened explicitly where needed
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, request TEXT NOT NULL, status TEXT NOT NULL,"
+            " progress TEXT NOT NULL, result TEXT, error TEXT, attempts INTEGER NOT NULL,"
+            " worker TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL,"
+            " heartbeat_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def _row_to_job(self, row) -> Job:
+        (job_id, request, status, progress, result, error, attempts, worker,
+         created_at, started_at, finished_at, heartbeat_at) = row
+        return Job(
+            id=job_id,
+            request=json.loads(request),
+            status=status,
+            progress=json.loads(progress),
+            result=json.loads(result) if result is not None else None,
+            error=error,
+            attempts=attempts,
+            worker=worker,
+            created_at=created_at,
+            started_at=started_at,
+            finished_at=finished_at,
+            heartbeat_at=heartbeat_at,
+        )
+
+    def submit(self, request: dict) -> Job:
+        job = Job(id=uuid.uuid4().hex, request=request)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, request, status, progress, attempts, created_at)"
+                " VALUES (?, ?, ?, ?, 0, ?)",
+                (job.id, json.dumps(request), job.status, json.dumps(job.progress), job.created_at),
+            )
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {self._COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def claim(self, worker: str) -> Optional[Job]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = 'Too many attempts', finished_at = ?"
+                    " WHERE status IN (?, ?) AND attempts >= ? AND (status = ? OR heartbeat_at < ?)",
+                    (FAILED, now, QUEUED, RUNNING, self.max_attempts, QUEUED, now - self.lease),
+                )
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? OR (status = ? AND heartbeat_at < ?)"
+                    " ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now - self.lease),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1,"
+                    " started_at = ?, heartbeat_at = ? WHERE id = ?",
+                    (RUNNING, worker, now, now, row[0]),
+                )
+                job_row = self._conn.execute(
+                    f"SELECT {self._COLUMNS} FROM jobs WHERE id = ?", (row[0],)
+                ).fetchone()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._row_to_job(job_row)
+
+    # the claim that may write: still running, for the same worker and attempt
+    _HELD = "id = ? AND status = ? AND worker = ? AND attempts = ?"
+
+    def _update_held(self, assignments: str, values: tuple, job_id: str, lease: Tuple[str, int]) -> bool:
+        worker, attempt = lease
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE {self._HELD}",
+                (*values, job_id, RUNNING, worker, attempt),
+            )
+        return cursor.rowcount > 0
+
+    def heartbeat(self, job_id: str, lease: Tuple[str, int], progress: Optional[dict] = None) -> bool:
+        if progress is None:
+            return self._update_held("heartbeat_at = ?", (time.time(),), job_id, lease)
+        return self._update_held(
+            "heartbeat_at = ?, progress = ?", (time.time(), json.dumps(progress)), job_id, lease
+        )
+
+    def complete(self, job_id: str, lease: Tuple[str, int], result: dict) -> bool:
+        return self._update_held(
+            "status = ?, result = ?, finished_at = ?", (DONE, json.dumps(result), time.time()), job_id, lease
+        )
+
+    def fail(self, job_id: str, lease: Tuple[str, int], error: str) -> bool:
+        return self._update_held(
+            "status = ?, error = ?, finished_at = ?", (FAILED, error, time.time()), job_id, lease
+        )
+
+
+# --- Worker pool ---
+class WorkerPool:
+    """
+    `concurrency` async workers claiming jobs from `queue` and running the graph
+    (through the shared result store and single-flight layer, see cores.main_graph).
+    """
+
+    def __init__(self, queue: JobQueue, concurrency: int = 4, poll_interval: float = 0.5):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        stop = stop or asyncio.Event()
+        print(f"Job worker pool {self.name} started ({self.concurrency} workers)")
+        await asyncio.gather(*(self._worker(i, stop) for i in range(self.concurrency)))
+
+    async def _worker(self, index: int, stop: asyncio.Event) -> None:
+        worker = f"{self.name}/{index}"
+        while not stop.is_set():
+            try:
+                job = await asyncio.to_thread(self.queue.claim, worker)
+            except sqlite3.OperationalError as e:  # e.g. database locked for too long
+                print(f"Job claim failed ({worker}): {e}")
+                job = None
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            await self.run_job(job)
+
+    async def _heartbeat(self, job: Job) -> None:
+        interval = max(getattr(self.queue, "lease", 60) / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.queue.heartbeat, job.id, job.lease)
+
+    def _previous_result(self, request: dict) -> Optional[dict]:
+        """
+        Result of the job an update request builds on; None (full analysis) when
+        the request isn't an update or that job has no usable result.
+        """
+        if not request.get("previous_job"):
+            return None
+        previous = self.queue.get(request["previous_job"])
+        if previous is None or previous.status != DONE or not previous.result:
+            return None
+        if previous.result.get("error") or not all(
+            previous.result.get(key) for key in ("positive_response", "negative_response")
+        ):
+            return None
+        return previous.result
+
+    async def run_job(self, job: Job) -> None:
+        # imported here: the queue itself doesn't need langgraph / the agents
+        from cores.cpu_pool import run_cpu
+        from cores.main_graph import build_graph_input_async, serialize_state, stream_analysis
+        from cores.processing import render_state_markdown
+
+        request = job.request
+        progress = {"completed_nodes": [], "state": {}, "balanced_partial": None}
+        last_flush = 0.0
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        print(f"Job {job.id} started (attempt {job.attempts})")
+        try:
+            conversation = request.get("conversation", [])
+            previous = await asyncio.to_thread(self._previous_result, request)
+            if previous is not None:
+                # incremental update: only the messages added since the previous job
+                conversation = conversation[request["new_from"]:]
+            graph_input = await build_graph_input_async(
+                request.get("background", ""),
+                request.get("context", ""),
+                conversation,
+                previous=previous,
+                topology=request.get("topology", "parallel"),
+            )
+            events = stream_analysis(graph_input, request.get("topology", "parallel"), trace=True)
+            async for kind, payload in events:
+                if kind == "node":
+                    for node_name, update in payload.items():
+                        progress["completed_nodes"].append(node_name)
+                        for key, value in serialize_state(update or {}).items():
+                            if isinstance(value, list):
+                                progress["state"][key] = progress["state"].get(key, []) + value
+                            else:
+                                progress["state"][key] = value
+                    await asyncio.to_thread(self.queue.heartbeat, job.id, job.lease, progress)
+                elif kind == "partial":
+                    progress["balanced_partial"] = payload.model_dump()
+                    if time.monotonic() - last_flush >= PARTIAL_FLUSH_INTERVAL:
+                        last_flush = time.monotonic()
+                        await asyncio.to_thread(self.queue.heartbeat, job.id, job.lease, progress)
+                elif kind == "final":
+                    result = serialize_state(payload)
+                    # tab markdown formatted off the loop, so the UI only displays it
+                    result["rendered"] = await run_cpu(render_state_markdown, result)
+                    if await asyncio.to_thread(self.queue.complete, job.id, job.lease, result):
+                        print(f"Job {job.id} done")
+                    else:
+                        print(f"Job {job.id} finished after its lease was lost; result dropped")
+        except Exception as e:
+            print(f"Job {job.id} failed: {e}")
+            if not await asyncio.to_thread(
+                self.queue.fail, job.id, job.lease, f"Failed to run graph analysis: {e}"
+            ):
+                print(f"Job {job.id}: lease was lost; failure not recorded")
+        finally:
+            heartbeat.cancel()
+
+
+# --- Process-wide defaults ---
+_default_queue: Optional[JobQueue] = None
+_inprocess_pool: Optional[WorkerPool] = None
+_default_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Returns the shared job queue, built from environment variables on first use.
+    """
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            backend = os.environ.get("JOB_QUEUE", "sqlite").lower()
+            lease = float(os.environ.get("JOB_LEASE", 60))
+            max_attempts = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+            if backend == "memory":
+                _default_queue = MemoryJobQueue(lease=lease, max_attempts=max_attempts)
+            elif backend == "sqlite":
+                path = os.environ.get("JOB_QUEUE_PATH") or cache_path("jobs.db")
+                _default_queue = SQLiteJobQueue(path, lease=lease, max_attempts=max_attempts)
+            else:
+                raise ValueError(f"Unknown job queue backend: {backend!r}")
+        return _default_queue
+
+
+def set_job_queue(queue: JobQueue) -> None:
+    global _default_queue
+    with _default_lock:
+        _default_queue = queue
+
+
+def ensure_workers() -> None:
+    """
+    Starts this process's worker pool on the runtime loop (once), unless
+    JOB_INPROCESS_WORKERS=0 (dedicated worker processes serve the queue).
+    """
+    global _inprocess_pool
+    if os.environ.get("JOB_INPROCESS_WORKERS", "1") == "0" or _inprocess_pool is not None:
+        return
+    from cores.runtime import submit
+
+    queue = get_job_queue()
+    with _default_lock:
+        if _inprocess_pool is None:
+            _inprocess_pool = WorkerPool(queue, int(os.environ.get("JOB_WORKERS", 4)))
+            submit(_inprocess_pool.run())
+
+
+def submit_job(
+    background: str,
+    conversation_ctx: str = "",
+    conversation: Optional[List[Dict[str, str]]] = None,
+    topology: str = "parallel",
+    previous_job: Optional[str] = None,
+    new_from: int = 0,
+) -> str:
+    """
+    Queues an analysis and returns its job id.
+    With `previous_job`, the analysis is an incremental update of that job's
+    result for the messages from index `new_from` on (a full analysis if the
+    previous result can't be used).
+    """
+    request = {
+        "background": background,
+        "context": conversation_ctx,
+        "conversation": conversation or [],
+        "topology": topology,
+    }
+    if previous_job:
+        request.update(previous_job=previous_job, new_from=new_from)
+    job = get_job_queue().submit(request)
+    return job.id
+
+
+def get_job(job_id: str) -> Optional[Job]:
+    return get_job_queue().get(job_id)
+
+
+# --- CLI ---
+def _worker_process(concurrency: int, metrics_port: int = 0) -> None:
+    from cores.metrics import serve_metrics
+    from cores.runtime import run_sync
+
+    serve_metrics(metrics_port)
+    run_sync(WorkerPool(get_job_queue(), concurrency).run())
+
+
+def main(argv=None):
+    from cores.metrics import default_metrics_port
+
+    parser = argparse.ArgumentParser(description="Analysis job queue.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    worker = commands.add_parser("worker", help="run a worker pool against the queue")
+    worker.add_argument("--concurrency", type=int, default=int(os.environ.get("JOB_WORKERS", 4)))
+    worker.add_argument("--processes", type=int, default=1, help="worker processes to start")
+    worker.add_argument(
+        "--metrics-port",
+        type=int,
+        default=default_metrics_port(),
+        help="serve /metrics on this port, the next ones for further processes (default METRICS_PORT, 0 = off)",
+    )
+
+    submit = commands.add_parser("submit", help="queue a request (JSON: background, context, conversation)")
+    submit.add_argument("request", help="path to a JSON file")
+    submit.add_argument("--topology", default="parallel")
+
+    status = commands.add_parser("status", help="print a job as JSON")
+    status.add_argument("job_id")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        if args.processes <= 1:
+            _worker_process(args.concurrency, args.metrics_port)
+            return
+        import multiprocessing
+
+        # not daemonic: a worker's own CPU pool (cores.cpu_pool) starts child processes
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(
+                target=_worker_process,
+                # each process has its own registry, so its own port
+                args=(args.concurrency, args.metrics_port + i if args.metrics_port else 0),
+            )
+            for i in range(args.processes)
+        ]
+        try:
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            for process in processes:
+                if process.pid is not None:
+                    process.join()
+    elif args.command == "submit":
+        with open(args.request, "r", encoding="utf-8") as f:
+            request = json.load(f)
+        print(
+            submit_job(
+                request.get("background", ""),
+                request.get("context", ""),
+                request.get("conversation", []),
+                args.topology,
+            )
+        )
+    elif args.command == "status":
+        job = get_job(args.job_id)
+        print(json.dumps(job.to_dict() if job else None, indent=2))
+
+
+if __name__ == "__main__":
+    main()
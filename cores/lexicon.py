@@ -0,0 +1,298 @@
+"""
+Local red-flag pattern scan: a multi-pattern (Aho-Corasick) matcher over curated
+phrase lexicons, run over the {'sender', 'message'} conversation before any model
+call. Hits are shown in the UI right away, passed to the persona agents as compact
+hints, and are the whole result of the "lexicon" (fast only) graph topology.
+
+Matches are phrase-level and context-free, so they are signals to look at, not
+conclusions: "you're overreacting" can be fair in context.
+
+Scan a conversation JSON file (e.g. the output of utils.chat_import):
+    python -m cores.lexicon conversation.json
+"""
+
+import argparse
+import json
+import time
+from collections import Counter, defaultdict, deque
+from typing import Dict, List, Optional, Tuple
+
+# category -> (label, phrases). Phrases are matched case-insensitively on word boundaries.
+LEXICONS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "gaslighting": (
+        "Gaslighting",
+        (
+            "that never happened",
+            "i never said that",
+            "you're overreacting",
+            "you are overreacting",
+            "you're too sensitive",
+            "you are too sensitive",
+            "you're imagining things",
+            "you're remembering it wrong",
+            "you're crazy",
+            "you're being crazy",
+            "stop being dramatic",
+            "it was just a joke",
+            "you always make things up",
+            "nobody else has a problem with it",
+        ),
+    ),
+    "guilt_tripping": (
+        "Guilt-tripping",
+        (
+            "after everything i've done for you",
+            "after all i've done",
+            "i guess i'm not a priority",
+            "i'm just not a priority",
+            "do what you want",
+            "fine, whatever",
+            "i'll just be alone",
+            "you know how stressed i am",
+            "if you really loved me",
+            "if you cared about me",
+            "you made me feel",
+            "i sacrificed",
+        ),
+    ),
+    "love_bombing": (
+        "Love bombing",
+        (
+            "soulmate",
+            "never felt this way",
+            "you're perfect",
+            "you are perfect",
+            "meant to be",
+            "the one for me",
+            "love of my life",
+            "move in together",
+            "i can't live without you",
+            "no one has ever made me feel",
+            "we should get married",
+        ),
+    ),
+    "breadcrumbing": (
+        "Breadcrumbing",
+        (
+            "u up",
+            "you up",
+            "we should hang out sometime",
+            "we should hang out soon",
+            "thinking about you",
+            "miss you",
+            "hey stranger",
+            "long time no talk",
+            "let's catch up soon",
+            "been thinking about you",
+        ),
+    ),
+    "vagueness": (
+        "Vagueness / non-commitment",
+        (
+            "maybe",
+            "we'll see",
+            "let's see how it goes",
+            "let's just see how it goes",
+            "i'll let you know",
+            "not sure yet",
+            "it's complicated",
+            "things are complicated",
+            "don't want to put a label on it",
+            "don't like labels",
+            "go with the flow",
+            "no pressure",
+            "i'm pretty busy",
+            "work is crazy",
+        ),
+    ),
+    "stonewalling": (
+        "Stonewalling / dismissiveness",
+        (
+            "i don't want to talk about it",
+            "not this again",
+            "whatever",
+            "i'm done talking",
+            "can we not",
+            "drop it",
+            "ok fine",
+            "you're making a big deal",
+            "it's not a big deal",
+        ),
+    ),
+    "blame_shifting": (
+        "Blame shifting",
+        (
+            "look what you made me do",
+            "you made me",
+            "it's your fault",
+            "this is your fault",
+            "if you hadn't",
+            "you started it",
+            "you always do this",
+            "you never",
+        ),
+    ),
+    "future_faking": (
+        "Future faking",
+        (
+            "one day we'll",
+            "someday we'll",
+            "when things calm down",
+            "once things settle down",
+            "next month for sure",
+            "i'll explain when i see you",
+            "i promise things will change",
+            "i'll make it up to you",
+        ),
+    ),
+}
+
+_APOSTROPHES = str.maketrans({"\u2019": "'", "\u2018": "'", "`": "'"})
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.translate(_APOSTROPHES).lower().split())
+
+
+# --- Aho-Corasick automaton ---
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over a set of phrases; finds every occurrence of every
+    phrase in one pass over the text. Matches must start and end on word boundaries.
+    """
+
+    def __init__(self, phrases: List[Tuple[str, str]]):
+        """
+        phrases: (phrase, category) pairs.
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (phrase length, category, phrase) matched when a state is reached
+        self._out: List[List[Tuple[int, str, str]]] = [[]]
+        for phrase, category in phrases:
+            phrase = normalize(phrase)
+            state = 0
+            for char in phrase:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._out[state].append((len(phrase), category, phrase))
+
+        # failure links, breadth first; outputs of the fallback state are inherited
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                if state:
+                    fallback = self._fail[state]
+                    while fallback and char not in self._goto[fallback]:
+                        fallback = self._fail[fallback]
+                    self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> List[Tuple[int, int, str, str]]:
+        """
+        (start, end, category, phrase) of each match in normalize(text).
+        """
+        text = normalize(text)
+        matches = []
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, category, phrase in out[state]:
+                start, end = i + 1 - length, i + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (
+                    end == len(text) or not text[end].isalnum()
+                ):
+                    matches.append((start, end, category, phrase))
+        return matches
+
+
+_matcher: Optional[PhraseMatcher] = None
+
+
+def get_matcher() -> PhraseMatcher:
+    global _matcher
+    if _matcher is None:
+        _matcher = PhraseMatcher(
+            [(phrase, category) for category, (_, phrases) in LEXICONS.items() for phrase in phrases]
+        )
+    return _matcher
+
+
+# --- Conversation scan ---
+def scan_conversation(conversation: List[dict]) -> List[dict]:
+    """
+    Lexicon hits in a conversation, in message order:
+    {"category", "phrase", "sender", "index", "excerpt"}. A phrase counts once per message.
+    """
+    matcher = get_matcher()
+    hits = []
+    for index, msg in enumerate(conversation):
+        seen = set()
+        for _, _, category, phrase in matcher.find(msg.get("message", "")):
+            if phrase in seen:
+                continue
+            seen.add(phrase)
+            excerpt = msg["message"] if len(msg["message"]) <= 120 else msg["message"][:119] + "…"
+            hits.append(
+                {
+                    "category": category,
+                    "phrase": phrase,
+                    "sender": msg.get("sender", "SO"),
+                    "index": index,
+                    "excerpt": excerpt,
+                }
+            )
+    return hits
+
+
+def summarize_hits(hits: List[dict]) -> Dict[str, Dict[str, int]]:
+    """
+    {category: {sender: hit count}}, categories by total count (descending).
+    """
+    summary: Dict[str, Counter] = defaultdict(Counter)
+    for hit in hits:
+        summary[hit["category"]][hit["sender"]] += 1
+    ordered = sorted(summary.items(), key=lambda item: -sum(item[1].values()))
+    return {category: dict(counts) for category, counts in ordered}
+
+
+def format_hints(hits: List[dict], max_phrases: int = 3) -> List[str]:
+    """
+    One compact line per category, for the persona agents' input, e.g.
+    'Vagueness / non-commitment (SO x3): "maybe", "we'll see"'.
+    """
+    lines = []
+    for category, counts in summarize_hits(hits).items():
+        phrases = Counter(hit["phrase"] for hit in hits if hit["category"] == category)
+        senders = ", ".join(f"{sender} x{count}" for sender, count in sorted(counts.items()))
+        quoted = ", ".join(f'"{phrase}"' for phrase, _ in phrases.most_common(max_phrases))
+        lines.append(f"{LEXICONS[category][0]} ({senders}): {quoted}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan a conversation for red-flag phrases.")
+    parser.add_argument("path", help="JSON list of {'sender', 'message'}")
+    args = parser.parse_args(argv)
+
+    with open(args.path, "r", encoding="utf-8") as f:
+        conversation = json.load(f)
+    start = time.perf_counter()
+    hits = scan_conversation(conversation)
+    elapsed = time.perf_counter() - start
+    for line in format_hints(hits):
+        print(f"- {line}")
+    print(f"{len(hits)} hits in {len(conversation)} messages ({elapsed * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
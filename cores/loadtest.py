@@ -0,0 +1,249 @@
+"""
+Load-test harness for the full graph.
+
+Runs `--requests` analyses at each concurrency level and reports latency
+percentiles, throughput, tokens (including prompt tokens served from the
+provider's prompt cache) and estimated cost per run. Inputs come from a
+fixed fixture set, so every topology is measured on the same requests; pass
+several topologies to compare them (e.g. the three-call graph vs "combined").
+Uses the offline backend by default, so no OpenAI calls are made:
+
+    python -m cores.loadtest --concurrency 1,4,16,64 --requests 200
+    python -m cores.loadtest --topology parallel,combined --backend openai --requests 20
+    OFFLINE_LATENCY_MEAN=1.5 OFFLINE_FAILURE_RATE=0.02 python -m cores.loadtest
+
+With --followup N, each run is a follow-up to an earlier analysis of a `--history`
+message conversation with N new messages, measured both as a full re-analysis
+("/full") and as an incremental update from the previous findings ("/incr"):
+
+    python -m cores.loadtest --followup 3 --history 40 --concurrency 4
+
+With the offline backend token counts are pydantic_ai's estimates, so they are
+only meaningful relative to each other.
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from cores.main_graph import TOPOLOGIES, build_graph_input, run_graph, serialize_state
+from cores.metrics import REGISTRY
+from cores.runtime import run_sync
+from cores.settings import configure, get_settings
+
+# USD per 1M (prompt, completion) tokens
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+# cached prompt tokens are billed at this fraction of the prompt price
+CACHED_PROMPT_DISCOUNT = 0.5
+
+FIXTURES = [
+    (
+        "We've been seeing each other for a few months.",
+        "Planning the weekend",
+        [
+            {"sender": "Me", "message": "Are we still on for Friday?"},
+            {"sender": "SO", "message": "maybe, work is crazy rn. I'll let you know"},
+            {"sender": "Me", "message": "ok, no worries"},
+        ],
+    ),
+    (
+        "Met on an app six weeks ago, three dates so far. They text mostly late at night.",
+        "After our last date",
+        [
+            {"sender": "Me", "message": "I had a really good time tonight"},
+            {"sender": "SO", "message": "haha same. u up?"},
+            {"sender": "Me", "message": "I was thinking we could get dinner next week"},
+            {"sender": "SO", "message": "we'll see, I'm pretty busy"},
+        ],
+    ),
+    (
+        "Long-distance for a year, they visit once a month but cancelled the last two visits.",
+        "Talking about the next visit",
+        [
+            {"sender": "SO", "message": "I miss you so much"},
+            {"sender": "Me", "message": "Then come see me? It's been two months"},
+            {"sender": "SO", "message": "I know, I know. Things are complicated right now"},
+            {"sender": "Me", "message": "What does complicated mean?"},
+            {"sender": "SO", "message": "I'll explain when I see you"},
+        ],
+    ),
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not values:
+        return float("nan")
+    rank = max(1, int(round(pct / 100 * len(values))))
+    return values[min(rank, len(values)) - 1]
+
+
+def make_input(i: int, topology: str = "parallel"):
+    background, context, conversation = FIXTURES[i % len(FIXTURES)]
+    return build_graph_input(f"{background} (case {i})", context, conversation, topology=topology)
+
+
+FOLLOWUP_MESSAGES = [
+    {"sender": "Me", "message": "Hey, are we still talking about this weekend?"},
+    {"sender": "SO", "message": "yeah sorry, just saw this. been a long day"},
+    {"sender": "Me", "message": "It's fine. I just want to know where we stand"},
+    {"sender": "SO", "message": "we're good, I promise. let's talk tomorrow"},
+]
+
+
+def make_followup(i: int, history: int, new_messages: int):
+    """
+    (background, context, earlier conversation, new messages) of follow-up case i.
+    """
+    background, context, conversation = FIXTURES[i % len(FIXTURES)]
+    earlier = [conversation[n % len(conversation)] for n in range(history)]
+    new = [FOLLOWUP_MESSAGES[n % len(FOLLOWUP_MESSAGES)] for n in range(new_messages)]
+    return f"{background} (case {i})", context, earlier, new
+
+
+async def make_followup_input(i: int, history: int, new_messages: int, topology: str, incremental: bool):
+    background, context, earlier, new = make_followup(i, history, new_messages)
+    if not incremental:
+        return build_graph_input(background, context, earlier + new, topology=topology)
+    previous = await run_graph(
+        build_graph_input(background, context, earlier, topology=topology), topology, coalesce=False
+    )
+    return build_graph_input(background, context, new, previous=serialize_state(previous), topology=topology)
+
+
+def run_cost(
+    prompt_tokens: float,
+    completion_tokens: float,
+    pricing: Optional[Tuple[float, float]],
+    cached_tokens: float = 0.0,
+) -> float:
+    if pricing is None:
+        return float("nan")
+    billed_prompt = prompt_tokens - cached_tokens * (1 - CACHED_PROMPT_DISCOUNT)
+    return (billed_prompt * pricing[0] + completion_tokens * pricing[1]) / 1_000_000
+
+
+async def run_level(
+    concurrency: int,
+    requests: int,
+    topology: str,
+    followup: int = 0,
+    history: int = 40,
+    incremental: bool = False,
+) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    label = topology
+    inputs = None
+    if followup:
+        label = f"{topology}/{'incr' if incremental else 'full'}"
+        # the earlier analyses incremental runs build on are not part of the measurement
+        inputs = await asyncio.gather(
+            *(make_followup_input(i, history, followup, topology, incremental) for i in range(requests))
+        )
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                graph_input = inputs[i] if inputs else make_input(i, topology)
+                state = await run_graph(graph_input, topology)
+                if state.get("error"):
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    prompt_before = REGISTRY.total("agent_prompt_tokens_total")
+    completion_before = REGISTRY.total("agent_completion_tokens_total")
+    cached_before = REGISTRY.total("agent_cached_prompt_tokens_total")
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "topology": label,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "throughput": requests / elapsed,
+        "prompt_tokens": (REGISTRY.total("agent_prompt_tokens_total") - prompt_before) / requests,
+        "completion_tokens": (REGISTRY.total("agent_completion_tokens_total") - completion_before) / requests,
+        "cached_tokens": (REGISTRY.total("agent_cached_prompt_tokens_total") - cached_before) / requests,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the analysis graph.")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=50, help="graph runs per level")
+    parser.add_argument(
+        "--topology", default="parallel", help=f"comma-separated, any of {','.join(TOPOLOGIES)}"
+    )
+    parser.add_argument(
+        "--backend", default="offline", choices=["offline", "openai"], help="model backend"
+    )
+    parser.add_argument(
+        "--pricing",
+        default=None,
+        metavar="IN,OUT",
+        help="USD per 1M prompt,completion tokens (default: looked up from the model name)",
+    )
+    parser.add_argument(
+        "--followup", type=int, default=0, help="measure follow-up runs with this many new messages"
+    )
+    parser.add_argument("--history", type=int, default=40, help="earlier messages of a follow-up run")
+    args = parser.parse_args(argv)
+
+    # no response cache: measure the graph, not the cache
+    os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+    settings = dataclasses.replace(get_settings(), model_backend=args.backend)
+    configure(settings)
+
+    if args.pricing:
+        prompt_price, completion_price = (float(p) for p in args.pricing.split(","))
+        pricing = (prompt_price, completion_price)
+    else:
+        pricing = MODEL_PRICING.get(settings.model_name)
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    topologies = [topology.strip() for topology in args.topology.split(",")]
+    modes = [False, True] if args.followup else [False]
+    print(
+        f"{'topology':>15} {'conc':>5} {'reqs':>5} {'errs':>5} {'p50 s':>8} {'p95 s':>8} "
+        f"{'p99 s':>8} {'runs/s':>8} {'in tok':>8} {'out tok':>8} {'cached':>8} {'$/1k runs':>10}"
+    )
+    for topology in topologies:
+        for incremental in modes:
+            for level in levels:
+                row = run_sync(
+                    run_level(level, args.requests, topology, args.followup, args.history, incremental)
+                )
+                cost = run_cost(
+                    row["prompt_tokens"], row["completion_tokens"], pricing, row["cached_tokens"]
+                ) * 1000
+                print(
+                    f"{row['topology']:>15} {row['concurrency']:>5} {row['requests']:>5} {row['errors']:>5} "
+                    f"{row['p50']:>8.3f} {row['p95']:>8.3f} {row['p99']:>8.3f} {row['throughput']:>8.2f} "
+                    f"{row['prompt_tokens']:>8.0f} {row['completion_tokens']:>8.0f} {row['cached_tokens']:>8.0f} {cost:>10.4f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,58 @@
-from cores.negative_agent import realist_stoic_agent, RealistStoicResponse
-from cores.positive_agent import hopeless_romantic_agent, HopelessRomanticResponse
-from cores.balanced_agent import balanced_mediator_agent, BalancedMediatorResponse
+from cores.negative_agent import RealistStoicResponse
+from cores.positive_agent import HopelessRomanticResponse
+from cores.balanced_agent import BalancedMediatorResponse
+from cores.combined_agent import CombinedPersonasResponse
+from cores.agent_factory import prompt_version
+from cores.agent_runner import model_id, run_named_agent
+from cores.cpu_pool import run_cpu
+from cores.processing import (
+    AGENT_CALLS_PER_RUN,
+    format_background,
+    is_fresh,
+    stale_channels,
+    format_conversation,
+    prepare_input,
+)
+from cores.lexicon import format_hints, scan_conversation
+from cores.prompt_templates import (
+    HINTS_TEMPLATE,
+    MEDIATOR_TEMPLATE,
+    PERSONA_UPDATE_TEMPLATE,
+    UPDATE_INSTRUCTIONS,
+    digest_findings,
+)
+from cores.metrics import REGISTRY, instrument_node, start_trace
+from cores.resilience import get_policy, set_deadline
+from cores.result_store import get_result_store, result_key
+from cores.retrieval import attach_resources
+from cores.semantic_cache import get_semantic_cache
+from cores.singleflight import SingleFlight
+from cores.settings import get_settings
 
 from langgraph.graph import StateGraph, START, END
+from langgraph.types import StreamWriter
+from langchain_core.runnables import RunnableConfig
 from pydantic import BaseModel, Field
 
-from typing import TypedDict, List, Dict, Any, Optional
+from typing import TypedDict, List, Dict, Any, Optional, Annotated, AsyncIterator, Tuple
+import operator
 import asyncio
+import time
+
+from cores.graph_registry import get_graph
+from cores.runtime import run_sync
+
+
+def merge_errors(left: Optional[str], right: Optional[str]) -> Optional[str]:
+    """
+    Reducer for the error channel: persona nodes run in parallel and may both fail
+    in the same step, so errors are joined instead of overwritten.
+    """
+    if not left:
+        return right
+    if not right or right == left:
+        return left
+    return f"{left}; {right}"
 
 
 # --- Main GraphMessage to be passed around ---
@@ -18,40 +64,190 @@ class GraphMessage(TypedDict):
     background_info: str = Field(
         description="Background information about the relationship"
     )
-    negative_response: List[RealistStoicResponse]
-    positive_response: List[HopelessRomanticResponse]
-    balanced_response: List[BalancedMediatorResponse]
-    error: Optional[str]
+    # persona nodes run concurrently -> append-reducers merge their branches
+    negative_response: Annotated[List[RealistStoicResponse], operator.add]
+    positive_response: Annotated[List[HopelessRomanticResponse], operator.add]
+    balanced_response: Annotated[List[BalancedMediatorResponse], operator.add]
+    error: Annotated[Optional[str], merge_errors]
+    token_report: Optional[dict]
+    trace: Optional[dict]
+    # "graph" (ran), "store" (persistent result store), "semantic" (near-duplicate
+    # earlier input, see cores.semantic_cache) or "coalesced" (shared an identical in-flight run)
+    result_source: Optional[str]
+    # incremental mode: fingerprint of the previous findings the response lists start
+    # from (background_info then holds only the new messages); None for a full analysis
+    update_of: Optional[str]
+    # response items per channel carried over from the previous findings, and (final
+    # state) the channels whose agent failed, so they still show only those
+    carried_over: Dict[str, int]
+    stale_channels: List[str]
+    # fingerprint of the background + conversation context (processing.situation_fingerprint)
+    situation: Optional[str]
+    # the (compacted) messages included in background_info, and the local
+    # lexicon scan over them (lexicon_node)
+    conversation: List[Dict[str, str]]
+    lexicon_hits: Optional[List[dict]]
+    # per-sender statistics of the conversation (cores.analytics), summarized in background_info
+    conversation_stats: Optional[dict]
+
+
+# --- Input / output helpers ---
+def build_graph_input(
+    background: str,
+    conversation_ctx: str = "",
+    conversation: Optional[List[Dict[str, str]]] = None,
+    token_budget: Optional[int] = None,
+    previous: Optional[dict] = None,
+    topology: str = "parallel",
+) -> GraphMessage:
+    """
+    Prepares the initial state for a graph invocation.
+    The conversation is compacted to fit the token budget (settings.token_budget
+    unless given); the savings (per run of `topology`) are reported under "token_report".
+    With `previous` (a serialized final state), builds an incremental update from
+    the new messages in `conversation` (see cores.processing.prepare_input).
+    """
+    settings = get_settings()
+    budget = token_budget if token_budget is not None else settings.token_budget
+    state = prepare_input(
+        background,
+        conversation_ctx,
+        conversation or [],
+        budget,
+        settings.model_name,
+        previous,
+        AGENT_CALLS_PER_RUN[topology],
+    )
+    return GraphMessage(**deserialize_state(state))
+
+
+async def build_graph_input_async(
+    background: str,
+    conversation_ctx: str = "",
+    conversation: Optional[List[Dict[str, str]]] = None,
+    token_budget: Optional[int] = None,
+    previous: Optional[dict] = None,
+    topology: str = "parallel",
+) -> GraphMessage:
+    """
+    build_graph_input() off the event loop (in the CPU process pool when enabled).
+    """
+    settings = get_settings()
+    budget = token_budget if token_budget is not None else settings.token_budget
+    state = await run_cpu(
+        prepare_input,
+        background,
+        conversation_ctx,
+        conversation or [],
+        budget,
+        settings.model_name,
+        previous,
+        AGENT_CALLS_PER_RUN[topology],
+    )
+    return GraphMessage(**deserialize_state(state))
+
+
+def serialize_state(state: dict) -> dict:
+    """
+    Converts a (final) GraphMessage into plain JSON-serializable data.
+    """
+    output = {}
+    for key, value in state.items():
+        if isinstance(value, list):
+            value = [
+                item.model_dump() if isinstance(item, BaseModel) else item
+                for item in value
+            ]
+        elif isinstance(value, BaseModel):
+            value = value.model_dump()
+        output[key] = value
+    return output
+
+
+RESPONSE_MODELS = {
+    "positive_response": HopelessRomanticResponse,
+    "negative_response": RealistStoicResponse,
+    "balanced_response": BalancedMediatorResponse,
+}
+
+
+def deserialize_state(data: dict) -> dict:
+    """
+    Inverse of serialize_state(): rebuilds the response models of a stored state.
+    """
+    state = dict(data)
+    for key, model in RESPONSE_MODELS.items():
+        state[key] = [model.model_validate(item) for item in data.get(key) or []]
+    return state
+
+
+def persona_input(message: GraphMessage, previous: Optional[BaseModel]) -> str:
+    """
+    Input of a persona agent: the situation, or in incremental mode the new
+    messages plus a digest of the persona's previous findings to update;
+    followed by the lexicon scan hints, if any phrase matched.
+    """
+    if not message.get("update_of") or previous is None:
+        text = message["background_info"]
+    else:
+        text = PERSONA_UPDATE_TEMPLATE.render(
+            task=UPDATE_INSTRUCTIONS,
+            previous=digest_findings(previous),
+            situation=message["background_info"],
+        )
+    hints = format_hints(message.get("lexicon_hits") or [])
+    if hints:
+        text = f"{text}\n\n{HINTS_TEMPLATE.render(hints=hints)}"
+    return text
+
+
+def _latest(message: GraphMessage, key: str) -> Optional[BaseModel]:
+    return message[key][-1] if message.get(key) else None
+
+
+def _fresh(message: GraphMessage, key: str) -> Optional[BaseModel]:
+    # the latest response only if this run produced it (not a carried-over finding)
+    return message[key][-1] if is_fresh(message, key) else None
+
+
+# --- Node 0: Lexicon scan ---
+@instrument_node("lexicon_node")
+async def lexicon_node(message: GraphMessage) -> dict:
+    """
+    Lexicon Node: local multi-pattern scan of the conversation for red-flag
+    phrases (no model call); the hits are hints for the persona nodes.
+    """
+    hits = scan_conversation(message.get("conversation") or [])
+    print(f"--- Lexicon scan: {len(hits)} hit(s) ---")
+    return {"lexicon_hits": hits}
 
 
 # --- Node 1.1:  Positive ---
+@instrument_node("positive_node")
 async def positive_node(message: GraphMessage) -> dict:
     """
     Positive Node: Hopeless Romantic Agent
     """
 
-    # Extract contextual info
-    background = message["background_info"]
+    # Extract contextual info (with the previous findings in incremental mode)
+    background = persona_input(message, _latest(message, "positive_response"))
 
     # agent
     try:
         print(f"--- Hopeless Romantic ---")
-        response = await hopeless_romantic_agent.run(background)
-        response = response.data
-
-        positive_response = message["positive_response"]
-        positive_response.append(
-            HopelessRomanticResponse(
-                positive_interpretations=response.positive_interpretations,
-                downplayed_negatives=response.downplayed_negatives,
-                key_breadcrumbs=response.key_breadcrumbs,
-                overall_summary=response.overall_summary,
-            )
+        response = await run_named_agent("hopeless_romantic", background)
+
+        positive_response = HopelessRomanticResponse(
+            positive_interpretations=response.positive_interpretations,
+            downplayed_negatives=response.downplayed_negatives,
+            key_breadcrumbs=response.key_breadcrumbs,
+            overall_summary=response.overall_summary,
         )
         print(f"Completed")
 
+        # only the new item: the reducer appends it to the state list
         return {
-            "positive_response": positive_response,
+            "positive_response": [positive_response],
         }
 
     except Exception as e:
@@ -60,33 +256,31 @@ async def positive_node(message: GraphMessage) -> dict:
 
 
 # --- Node 1.2:  Negative ---
+@instrument_node("negative_node")
 async def negative_node(message: GraphMessage) -> dict:
     """
     Negative Node: Realist Stoic Agent
     """
 
-    # Extract contextual info
-    background = message["background_info"]
+    # Extract contextual info (with the previous findings in incremental mode)
+    background = persona_input(message, _latest(message, "negative_response"))
 
     # agent
     try:
         print(f"--- Realist Stoic ---")
-        response = await realist_stoic_agent.run(background)
-        response = response.data
-
-        negative_response = message["negative_response"]
-        negative_response.append(
-            RealistStoicResponse(
-                red_flags=response.red_flags,
-                identified_tactics=response.identified_tactics,
-                unanswered_questions=response.unanswered_questions,
-                overall_summary=response.overall_summary,
-            )
+        response = await run_named_agent("realist_stoic", background)
+
+        negative_response = RealistStoicResponse(
+            red_flags=response.red_flags,
+            identified_tactics=response.identified_tactics,
+            unanswered_questions=response.unanswered_questions,
+            overall_summary=response.overall_summary,
         )
         print(f"Completed")
 
+        # only the new item: the reducer appends it to the state list
         return {
-            "negative_response": negative_response,
+            "negative_response": [negative_response],
         }
 
     except Exception as e:
@@ -94,61 +288,94 @@ async def negative_node(message: GraphMessage) -> dict:
         return {"error": f"Error in Realist Stoic Agent: {e}"}
 
 
+# --- Node 1.3: Both personas in one call (topology="combined") ---
+@instrument_node("personas_node")
+async def personas_node(message: GraphMessage) -> dict:
+    """
+    Combined Personas Node: one structured-output request returns both the
+    Hopeless Romantic and the Realist Stoic analyses (replaces nodes 1.1 + 1.2)
+    """
+
+    # Extract contextual info (with both previous findings in incremental mode)
+    previous = None
+    if message.get("positive_response") and message.get("negative_response"):
+        previous = CombinedPersonasResponse(
+            hopeless_romantic=message["positive_response"][-1],
+            realist_stoic=message["negative_response"][-1],
+        )
+    background = persona_input(message, previous)
+
+    # agent
+    try:
+        print(f"--- Combined Personas ---")
+        response = await run_named_agent("combined_personas", background)
+        print(f"Completed")
+
+        return {
+            "positive_response": [response.hopeless_romantic],
+            "negative_response": [response.realist_stoic],
+        }
+
+    except Exception as e:
+        print(f"Error in Combined Personas Agent: {e}")
+        return {"error": f"Error in Combined Personas Agent: {e}"}
+
+
 # --- Node 2: Balanced ---
-async def balanced_node(message: GraphMessage) -> dict:
+@instrument_node("balanced_node")
+async def balanced_node(
+    message: GraphMessage, config: RunnableConfig, writer: StreamWriter
+) -> dict:
     """
     Balanced Node: Balanced Mediator Agent
+    With config["configurable"]["stream_tokens"], partial results are emitted on the
+    "custom" stream as {"balanced_partial": BalancedMediatorResponse}.
     """
     # 1. Extract info from state message
     background = message["background_info"]
-    if (not message["positive_response"]) or (not message["negative_response"]):
+    # in incremental mode a persona that failed still has last run's findings: those
+    # are not mediated as if they were current (the failure is in `error`)
+    stoic = _fresh(message, "negative_response")
+    romantic = _fresh(message, "positive_response")
+    if stoic is None and romantic is None:
         return {"error": "No positive or negative response available."}
 
-    # Get the latest responses
-    positive_response: HopelessRomanticResponse = message["positive_response"][-1]
-    negative_response: RealistStoicResponse = message["negative_response"][-1]
-
     # 2. format input
-    stoic_input_str = f"""
-        Overall Summary: {negative_response.overall_summary}
-        Red Flags Identified: {negative_response.red_flags if hasattr(negative_response, 'red_flags') else 'N/A'}
-        Identified Tactics: {negative_response.identified_tactics if hasattr(negative_response, 'identified_tactics') else 'N/A'}
-        Unanswered Questions: {negative_response.unanswered_questions if hasattr(negative_response, 'unanswered_questions') else 'N/A'}
-        """
-
-    romantic_input_str = f"""
-        Overall Summary: {positive_response.overall_summary}
-        Positive Interpretations: {positive_response.positive_interpretations if hasattr(positive_response, 'positive_interpretations') else 'N/A'}
-        Downplayed Negatives: {positive_response.downplayed_negatives if hasattr(positive_response, 'downplayed_negatives') else 'N/A'}
-        Key Breadcrumbs: {positive_response.key_breadcrumbs if hasattr(positive_response, 'key_breadcrumbs') else 'N/A'}
-        """
-
-    combined_input = f"""
-        Background: {background}
-        Stoic Input: {stoic_input_str}
-        Romantic Input: {romantic_input_str}
-        """
+    # A persona that failed (after retries) doesn't sink the run: the mediator
+    # still synthesizes from the perspective that is available (rendered as N/A).
+    combined_input = MEDIATOR_TEMPLATE.render(situation=background, stoic=stoic, romantic=romantic)
 
     # 3. agent invocation
+    on_partial = None
+    if config.get("configurable", {}).get("stream_tokens"):
+        on_partial = lambda partial: writer({"balanced_partial": partial})
+
     try:
         print(f"--- Balanced Mediator ---")
-        response = await balanced_mediator_agent.run(combined_input)
-        response = response.data
-
-        balanced_response = message["balanced_response"]
-        balanced_response.append(
-            BalancedMediatorResponse(
-                romantic_view_summary=response.romantic_view_summary,
-                stoic_view_summary=response.stoic_view_summary,
-                points_of_contention=response.points_of_contention,
-                suggested_next_steps=response.suggested_next_steps,
-                retrieved_resources=response.retrieved_resources,
-            )
+        response = await run_named_agent(
+            "balanced_mediator", combined_input, on_partial=on_partial
+        )
+
+        # 4. resources from the local index, keyed on the Stoic's red flags / tactics
+        # and the points of contention (no model call; the model's own list is only
+        # kept when retrieval is unavailable)
+        findings = list(response.points_of_contention)
+        if stoic is not None:
+            findings = stoic.red_flags + stoic.identified_tactics + findings
+        resources = await asyncio.to_thread(attach_resources, findings)
+
+        balanced_response = BalancedMediatorResponse(
+            romantic_view_summary=response.romantic_view_summary,
+            stoic_view_summary=response.stoic_view_summary,
+            points_of_contention=response.points_of_contention,
+            suggested_next_steps=response.suggested_next_steps,
+            retrieved_resources=resources if resources is not None else response.retrieved_resources,
         )
         print(f"Completed")
 
+        # only the new item: the reducer appends it to the state list
         return {
-            "balanced_response": balanced_response,
+            "balanced_response": [balanced_response],
         }
 
     except Exception as e:
@@ -156,21 +383,52 @@ async def balanced_node(message: GraphMessage) -> dict:
         return {"error": f"Error in Balanced Mediator Agent: {e}"}
 
 
-def create_graph():
+TOPOLOGIES = ("parallel", "sequential", "combined", "lexicon")
+
+
+def create_graph(topology: str = "parallel"):
     """
     Creates the main graph for the LangGraph
+
+    topology:
+        - "parallel": persona nodes fan out after the scan and join at balanced_node (default)
+        - "sequential": positive -> negative -> balanced, one call at a time
+        - "combined": personas_node (both personas, one call) -> balanced, two calls per run
+        - "lexicon": only the local lexicon scan, no model calls ("fast only", for bulk triage)
+    Every topology starts with lexicon_node.
     """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown graph topology: {topology!r}")
+
     # --- Main Graph ---
     builder = StateGraph(GraphMessage)
+    builder.add_node(lexicon_node, "lexicon_node")
+    builder.add_edge(START, "lexicon_node")
+    if topology == "lexicon":
+        builder.add_edge("lexicon_node", END)
+        return builder.compile()
 
     # adding nodes
-    builder.add_node(positive_node, "positive_node")
-    builder.add_node(negative_node, "negative_node")
+    if topology == "combined":
+        builder.add_node(personas_node, "personas_node")
+    else:
+        builder.add_node(positive_node, "positive_node")
+        builder.add_node(negative_node, "negative_node")
     builder.add_node(balanced_node, "balanced_node")
     # adding edges
-    builder.add_edge(START, "positive_node")
-    builder.add_edge("positive_node", "negative_node")
-    builder.add_edge("negative_node", "balanced_node")
+    if topology == "combined":
+        builder.add_edge("lexicon_node", "personas_node")
+        builder.add_edge("personas_node", "balanced_node")
+    elif topology == "parallel":
+        # persona nodes don't read each other's output -> fan out after the scan,
+        # join at balanced_node once both branches have finished
+        builder.add_edge("lexicon_node", "positive_node")
+        builder.add_edge("lexicon_node", "negative_node")
+        builder.add_edge(["positive_node", "negative_node"], "balanced_node")
+    else:
+        builder.add_edge("lexicon_node", "positive_node")
+        builder.add_edge("positive_node", "negative_node")
+        builder.add_edge("negative_node", "balanced_node")
     builder.add_edge("balanced_node", END)
     # compilation
     graph = builder.compile()
@@ -182,7 +440,7 @@ async def run_graph_async(intial_state):
     print("STARTING GRAPH")
     final_state_output = None
 
-    app = create_graph()
+    app = get_graph()
 
     async for event in app.astream_events(intial_state):
         event_type = event["event"]
@@ -197,6 +455,221 @@ async def run_graph_async(intial_state):
     return final_state_output
 
 
+def _finish_run(final_state: dict, trace, topology: str, attach_trace: bool) -> dict:
+    total = trace.offset()
+    status = "error" if final_state.get("error") else "ok"
+    final_state["stale_channels"] = stale_channels(final_state)
+    REGISTRY.observe("graph_run_seconds", total, {"topology": topology}, help="Graph run wall time")
+    REGISTRY.inc("graph_runs_total", 1, {"topology": topology, "status": status}, help="Graph runs")
+    if attach_trace:
+        final_state["trace"] = trace.to_dict()
+    return final_state
+
+
+async def run_graph(
+    graph_input: GraphMessage,
+    topology: str = "parallel",
+    trace: bool = False,
+    coalesce: bool = True,
+) -> dict:
+    """
+    Runs the shared compiled graph to completion under the graph deadline,
+    recording run-level metrics.
+    With trace=True the per-node / per-agent timeline is attached as final_state["trace"].
+    With coalesce=True, concurrent runs of an identical input share one execution.
+    """
+    if coalesce:
+        key = analysis_key(graph_input, topology)
+        return await _coalesced(key, lambda: run_graph(graph_input, topology, trace, coalesce=False))
+
+    run_trace = start_trace()
+    set_deadline(get_policy().graph_deadline)
+    final_state = await get_graph(topology).ainvoke(graph_input)
+    final_state["result_source"] = "graph"
+    return _finish_run(final_state, run_trace, topology, trace)
+
+
+async def stream_graph(
+    graph_input: GraphMessage,
+    topology: str = "parallel",
+    stream_tokens: bool = True,
+    trace: bool = False,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Runs the graph and yields progress as it happens:
+        ("node", {node_name: state_update})  - a node finished
+        ("partial", BalancedMediatorResponse) - streamed mediator output (stream_tokens)
+        ("final", final_state)                - the run is complete
+    """
+    graph = get_graph(topology)
+    run_trace = start_trace()
+    set_deadline(get_policy().graph_deadline)
+    final_state = None
+    config = {"configurable": {"stream_tokens": stream_tokens}}
+
+    async for mode, chunk in graph.astream(
+        graph_input, config=config, stream_mode=["updates", "custom", "values"]
+    ):
+        if mode == "updates":
+            yield "node", chunk
+        elif mode == "custom" and "balanced_partial" in chunk:
+            yield "partial", chunk["balanced_partial"]
+        elif mode == "values":
+            final_state = chunk
+
+    final_state["result_source"] = "graph"
+    yield "final", _finish_run(final_state, run_trace, topology, trace)
+
+
+
+# --- Shared results: persistent store + coalescing of identical runs ---
+GRAPH_FLIGHTS = SingleFlight("graph_run")
+
+
+def analysis_key(graph_input: GraphMessage, topology: str) -> str:
+    text = graph_input["background_info"]
+    if graph_input.get("update_of"):
+        # same new messages on top of different findings -> different result
+        text = f"{text}\n[update_of:{graph_input['update_of']}]"
+    return result_key(text, topology, model_id(), prompt_version())
+
+
+async def _load_result(key: str, graph_input: GraphMessage) -> Optional[dict]:
+    store = get_result_store()
+    if store is None:
+        return None
+    data = await asyncio.to_thread(store.get, key)
+    REGISTRY.inc(
+        "result_store_hits_total" if data is not None else "result_store_misses_total",
+        1,
+        help="Result store lookups",
+    )
+    if data is None:
+        return None
+    state = deserialize_state(data)
+    # per-request fields are not stored
+    state.update(token_report=graph_input.get("token_report"), trace=None, result_source="store")
+    return state
+
+
+def semantic_scope(state: dict, topology: str) -> Optional[str]:
+    # near-duplicates only match results of the same graph, model and prompts, for
+    # the same background / context: only the conversation may differ
+    if not state.get("situation"):
+        return None
+    return "\x1f".join([topology, model_id(), prompt_version(), state["situation"]])
+
+
+async def _semantic_lookup(graph_input: GraphMessage, topology: str) -> Optional[dict]:
+    cache = get_semantic_cache()
+    scope = semantic_scope(graph_input, topology)
+    # an update's input is only the new messages: similar text says nothing about the findings
+    if cache is None or scope is None or graph_input.get("update_of"):
+        return None
+    start = time.perf_counter()
+    found = await asyncio.to_thread(cache.lookup, graph_input["background_info"], scope)
+    REGISTRY.observe(
+        "semantic_cache_lookup_seconds", time.perf_counter() - start, help="Semantic cache lookup time"
+    )
+    REGISTRY.inc(
+        "semantic_cache_hits_total" if found is not None else "semantic_cache_misses_total",
+        1,
+        help="Semantic cache lookups",
+    )
+    if found is None:
+        return None
+    data, similarity = found
+    state = deserialize_state(data)
+    # the matched result is for another input: this request's own messages and scan
+    conversation = graph_input.get("conversation") or []
+    state.update(
+        token_report=graph_input.get("token_report"),
+        trace=None,
+        result_source="semantic",
+        similarity=round(similarity, 4),
+        background_info=graph_input["background_info"],
+        conversation=conversation,
+        lexicon_hits=scan_conversation(conversation),
+        conversation_stats=graph_input.get("conversation_stats"),
+    )
+    return state
+
+
+async def _save_result(key: str, final_state: dict, topology: str) -> None:
+    # only complete results are shared; failed / partial runs are retried next time
+    if final_state.get("error"):
+        return
+    data = serialize_state(final_state)
+    for field in ("token_report", "trace", "result_source", "similarity"):
+        data.pop(field, None)
+    store = get_result_store()
+    if store is not None:
+        await asyncio.to_thread(store.set, key, data)
+    cache = get_semantic_cache()
+    scope = semantic_scope(final_state, topology)
+    if cache is not None and scope is not None and not final_state.get("update_of"):
+        await asyncio.to_thread(cache.add, final_state["background_info"], scope, data)
+
+
+async def _coalesced(key: str, run) -> dict:
+    final_state, shared = await GRAPH_FLIGHTS.do(key, run)
+    if shared:
+        # waiters get their own top-level dict
+        final_state = {**final_state, "result_source": "coalesced"}
+    return final_state
+
+
+async def run_analysis(
+    graph_input: GraphMessage, topology: str = "parallel", trace: bool = False
+) -> dict:
+    """
+    run_graph() behind the shared result store: a stored result for the same input
+    (or, from the semantic cache, for a near-duplicate input) is returned without
+    running the graph, and identical requests arriving while a run is in flight
+    wait for that run.
+    """
+    key = analysis_key(graph_input, topology)
+    stored = await _load_result(key, graph_input) or await _semantic_lookup(graph_input, topology)
+    if stored is not None:
+        return stored
+
+    async def run():
+        final_state = await run_graph(graph_input, topology, trace, coalesce=False)
+        # saved before the flight lands, so no request falls between the two
+        await _save_result(key, final_state, topology)
+        return final_state
+
+    return await _coalesced(key, run)
+
+
+async def stream_analysis(
+    graph_input: GraphMessage,
+    topology: str = "parallel",
+    stream_tokens: bool = True,
+    trace: bool = False,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    stream_graph() behind the shared result store (see run_analysis); stored and
+    coalesced results are yielded as a single ("final", state) event.
+    """
+    key = analysis_key(graph_input, topology)
+    stored = await _load_result(key, graph_input) or await _semantic_lookup(graph_input, topology)
+    if stored is not None:
+        yield "final", stored
+        return
+    if GRAPH_FLIGHTS.in_flight(key):
+        final_state = await GRAPH_FLIGHTS.wait(key)
+        yield "final", {**final_state, "result_source": "coalesced"}
+        return
+
+    async with GRAPH_FLIGHTS.leading(key) as flight:
+        async for kind, payload in stream_graph(graph_input, topology, stream_tokens, trace):
+            if kind == "final":
+                await _save_result(key, payload, topology)
+                flight.set_result(payload)
+            yield kind, payload
+
+
 if __name__ == "__main__":
     # Example usage
     initial_state = {
@@ -207,5 +680,5 @@ if __name__ == "__main__":
         "error": None,
     }
 
-    final_state = asyncio.run(run_graph_async(initial_state))
+    final_state = run_sync(run_graph_async(initial_state))
     print(final_state)
@@ -0,0 +1,368 @@
+"""
+In-process metrics registry and per-run traces.
+
+Metrics are exported as Prometheus text (`to_prometheus()`) or JSON (`to_json()`);
+`start_metrics_server(port)` serves both over HTTP (/metrics, /metrics.json).
+The long-running CLIs start it with --metrics-port N (or METRICS_PORT=N):
+    python -m cores.batch input.jsonl output.jsonl --metrics-port 9108
+
+Environment:
+    METRICS_PORT    default --metrics-port of the CLIs (default 0 = no server)
+    METRICS_HOST    interface the server binds to (default 127.0.0.1)
+
+A RunTrace collects one span per node and per agent call of a single graph run;
+it is carried in a context variable so nodes/agent calls running in child
+tasks record into the trace of the run that spawned them.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf"))
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    items = list(key) + sorted((extra or {}).items())
+    if not items:
+        return ""
+    body = ",".join(f'{name}="{value}"' for name, value in items)
+    return "{" + body + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.values: List[float] = []  # bounded reservoir for quantiles
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.values.append(value)
+        if len(self.values) > 2048:
+            del self.values[:1024]
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.values:
+            return None
+        ordered = sorted(self.values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and histograms keyed by (name, labels).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None, help: str = "") -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0.0) + value
+            if help:
+                self._help.setdefault(name, help)
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None, help: str = "") -> None:
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = _label_key(labels)
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+            if help:
+                self._help.setdefault(name, help)
+
+    def get_counter(self, name: str, labels: Optional[Dict[str, str]] = None) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0.0)
+
+    def total(self, name: str) -> float:
+        """
+        Sum of a counter across all label sets.
+        """
+        with self._lock:
+            return sum(self._counters.get(name, {}).values())
+
+    def count(self, name: str, labels: Optional[Dict[str, str]] = None) -> int:
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_label_key(labels))
+            return histogram.count if histogram else 0
+
+    def quantile(self, name: str, q: float, labels: Optional[Dict[str, str]] = None) -> Optional[float]:
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_label_key(labels))
+            return histogram.quantile(q) if histogram else None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    # --- Exporters ---
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in series.items():
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{name}_bucket{_format_labels(key, {'le': le})} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "count": hist.count,
+                        "sum": hist.sum,
+                        "p50": hist.quantile(0.5),
+                        "p95": hist.quantile(0.95),
+                        "p99": hist.quantile(0.99),
+                    }
+                    for key, hist in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+
+REGISTRY = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return REGISTRY
+
+
+# --- Per-run traces ---
+class RunTrace:
+    """
+    Timeline of one graph run: a span per node and per agent call.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[dict] = []
+        self._lock = threading.Lock()
+
+    def offset(self) -> float:
+        return time.perf_counter() - self.started
+
+    def add(self, span: dict) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {"total_seconds": round(self.offset(), 4), "spans": list(self.spans)}
+
+
+_current_trace: contextvars.ContextVar[Optional[RunTrace]] = contextvars.ContextVar(
+    "current_trace", default=None
+)
+
+
+def start_trace() -> RunTrace:
+    """
+    Starts a trace for the current run (visible to all tasks spawned afterwards).
+    """
+    trace = RunTrace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[RunTrace]:
+    return _current_trace.get()
+
+
+def instrument_node(name: str):
+    """
+    Decorator for graph nodes: records wall time and queue time (delay between
+    the start of the run and the node starting) as metrics and trace spans.
+    The wrapped signature is preserved, so LangGraph still injects config/writer.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            trace = current_trace()
+            queue_time = trace.offset() if trace else 0.0
+            start = time.perf_counter()
+            status = "ok"
+            try:
+                result = await func(*args, **kwargs)
+                if isinstance(result, dict) and result.get("error"):
+                    status = "error"
+                return result
+            except BaseException:
+                status = "exception"
+                raise
+            finally:
+                wall = time.perf_counter() - start
+                labels = {"node": name}
+                REGISTRY.observe("graph_node_seconds", wall, labels, help="Node wall time")
+                REGISTRY.observe("graph_node_queue_seconds", queue_time, labels, help="Run start to node start")
+                REGISTRY.inc("graph_node_runs_total", 1, {"node": name, "status": status}, help="Node executions")
+                if trace:
+                    trace.add(
+                        {
+                            "kind": "node",
+                            "name": name,
+                            "start": round(queue_time, 4),
+                            "wall_seconds": round(wall, 4),
+                            "status": status,
+                        }
+                    )
+
+        return wrapper
+
+    return decorator
+
+
+def record_agent_call(
+    agent: str,
+    *,
+    cache_hit: bool,
+    queue_seconds: float = 0.0,
+    model_seconds: float = 0.0,
+    usage=None,
+    status: str = "ok",
+    retries: int = 0,
+) -> None:
+    """
+    Records one agent invocation; `retries` counts policy-level retries.
+    `usage` is pydantic_ai's Usage (may be None on cache hits); prompt tokens the
+    provider served from its prompt cache are reported in usage.details["cached_tokens"].
+    """
+    labels = {"agent": agent}
+    REGISTRY.inc("agent_calls_total", 1, {"agent": agent, "status": status}, help="Agent invocations")
+    REGISTRY.inc(
+        "agent_cache_hits_total" if cache_hit else "agent_cache_misses_total",
+        1,
+        labels,
+        help="Response cache lookups",
+    )
+    prompt_tokens = getattr(usage, "request_tokens", None) or 0
+    completion_tokens = getattr(usage, "response_tokens", None) or 0
+    cached_tokens = (getattr(usage, "details", None) or {}).get("cached_tokens", 0)
+    # model-level retries (extra requests inside one pydantic_ai run) + policy retries
+    retries += max((getattr(usage, "requests", 1) or 1) - 1, 0)
+    if not cache_hit:
+        REGISTRY.observe("agent_model_seconds", model_seconds, labels, help="Model round-trip time")
+        REGISTRY.observe("agent_queue_seconds", queue_seconds, labels, help="Rate limiter wait")
+        REGISTRY.inc("agent_prompt_tokens_total", prompt_tokens, labels, help="Prompt tokens")
+        REGISTRY.inc("agent_completion_tokens_total", completion_tokens, labels, help="Completion tokens")
+        REGISTRY.inc(
+            "agent_cached_prompt_tokens_total",
+            cached_tokens,
+            labels,
+            help="Prompt tokens served from the provider's prompt cache",
+        )
+        REGISTRY.inc("agent_retries_total", retries, labels, help="Extra model requests per call")
+
+    trace = current_trace()
+    if trace:
+        trace.add(
+            {
+                "kind": "agent",
+                "name": agent,
+                "start": round(trace.offset() - model_seconds - queue_seconds, 4),
+                "queue_seconds": round(queue_seconds, 4),
+                "model_seconds": round(model_seconds, 4),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cached_tokens": cached_tokens,
+                "retries": retries,
+                "cache_hit": cache_hit,
+                "status": status,
+            }
+        )
+
+
+# --- Optional HTTP exporter ---
+def start_metrics_server(port: int = 9108, host: str = "127.0.0.1"):
+    """
+    Serves /metrics (Prometheus text) and /metrics.json from a daemon thread.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, ctype = REGISTRY.to_prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, ctype = REGISTRY.to_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+def default_metrics_port() -> int:
+    return int(os.environ.get("METRICS_PORT", 0) or 0)
+
+
+def serve_metrics(port: int):
+    """
+    start_metrics_server() for a CLI's --metrics-port (0 = disabled), on METRICS_HOST.
+    """
+    if not port:
+        return None
+    host = os.environ.get("METRICS_HOST", "127.0.0.1")
+    server = start_metrics_server(port, host)
+    print(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
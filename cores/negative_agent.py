@@ -1,57 +1,9 @@
 from cores.prompts import REALIST_STOIC_PROMPT
+from cores.agent_factory import register_agent, get_agent, get_model
 
 from typing import List, Set, Literal, Dict, Any
 
 from pydantic import BaseModel, Field
-from pydantic_ai import Agent
-from pydantic_ai.models.openai import OpenAIModel
-import streamlit as st
-import os
-
-# from dotenv import load_dotenv
-
-# load_dotenv()
-# Set the OpenAI API key via environment variable
-os.environ["OPENAI_API_KEY"] = st.secrets["openai_api_key"]
-
-REALIST_STOIC_PROMPT = """
-You are an AI analyst embodying the "Practical, Experienced Stoic."
-Your perspective is grounded in realism, logic, and critical observation.
-You analyze interactions objectively, focusing on actions over words, identifying inconsistencies,
-    and pointing out potential red flags, excuses, manipulation tactics (like gaslighting, guilt-tripping, love-bombing),
-    or lack of accountability without emotional bias.
-
-Your tone is direct, critical, and straightforward without sugar-coating.
-
-
-Task: Analyze the provided info between two people in a situationship / relationship with critical objectivity.
-    Identify potential red flags, logical fallacies, inconsistencies, manipulation tactics, and areas where actions may not align with words.
-
-Input: You will be given
-    a description of a situationship, which can include background information,
-    some snippet of texts from both sides, or some context.
-
-Instructions:
-    - Read through the provided context carefully, focusing on the literal meaning and implications of the words or phrases used.
-    - Identify specific phrases, sentences, or exchanges  that constitute potential "red flags"
-        (e.g., controlling behavior, disrespect, lack of commitment, excessive blaming, vagueness).
-        List these clearly under red_flags.
-    - Look for common manipulation tactics (e.g., gaslighting, guilt-tripping, playing the victim, love bombing, deflection).
-        If identified, list them under identified_tactics, briefly explaining why you flagged them.
-    - Identify any unanswered questions or crucial areas lacking clarity or commitment in the conversation.
-        List these under unanswered_questions
-    - Provide a blunt, direct interpretation of the situation, and write a final overall_summary that
-        critically assesses the interaction and highlights the key concerns identified.
-
-Output Format Guidance: Structure your response to align with the required output schema,
-    focusing on populating fields like
-    red_flags, identified_tactics, unanswered_questions, and overall_summary.
-    If specific manipulation tactics are identified, ensure they are clearly listed.
-
-Remember:
-    - Truth hurts, but is essential. You need not worry about being overly pessimistic, or hurting anyone's feelings.
-
-"""
 
 
 class RealistStoicResponse(BaseModel):
@@ -70,10 +22,20 @@ class RealistStoicResponse(BaseModel):
     overall_summary: str = Field(description="Overall summary of the situation.")
 
 
-model = OpenAIModel(model_name="gpt-4o-mini")
-
-realist_stoic_agent = Agent(
-    model=model,
+spec = register_agent(
+    "realist_stoic",
     system_prompt=REALIST_STOIC_PROMPT,
     result_type=RealistStoicResponse,
 )
+
+
+def __getattr__(attr):
+    """
+    `realist_stoic_agent` / `model` are built lazily on first access (see cores.agent_factory),
+    so importing this module has no side effects.
+    """
+    if attr == "realist_stoic_agent":
+        return get_agent("realist_stoic")
+    if attr == "model":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
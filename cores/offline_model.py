@@ -0,0 +1,173 @@
+"""
+Deterministic offline model backend, for load testing the graph without OpenAI.
+
+Selected with MODEL_BACKEND=offline (or Settings(model_backend="offline")).
+Answers are generated from each agent's result schema, so every call yields a
+schema-valid RealistStoicResponse / HopelessRomanticResponse / BalancedMediatorResponse.
+Content depends only on the input; latency and failures come from a seeded RNG.
+
+Environment:
+    OFFLINE_LATENCY        "fixed" | "uniform" | "lognormal" (default "lognormal")
+    OFFLINE_LATENCY_MEAN   mean latency per call, seconds (default 0.8)
+    OFFLINE_LATENCY_SIGMA  spread: lognormal sigma / uniform half-width ratio (default 0.4)
+    OFFLINE_FAILURE_RATE   probability a call raises OfflineModelError (default 0)
+    OFFLINE_SEED           RNG seed (default 0)
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+
+class OfflineModelError(RuntimeError):
+    """
+    Simulated provider failure.
+    """
+
+
+@dataclass
+class OfflineBackendConfig:
+    latency: str = "lognormal"
+    latency_mean: float = 0.8
+    latency_sigma: float = 0.4
+    failure_rate: float = 0.0
+    seed: int = 0
+
+    @classmethod
+    def from_env(cls) -> "OfflineBackendConfig":
+        return cls(
+            latency=os.environ.get("OFFLINE_LATENCY", "lognormal"),
+            latency_mean=float(os.environ.get("OFFLINE_LATENCY_MEAN", 0.8)),
+            latency_sigma=float(os.environ.get("OFFLINE_LATENCY_SIGMA", 0.4)),
+            failure_rate=float(os.environ.get("OFFLINE_FAILURE_RATE", 0.0)),
+            seed=int(os.environ.get("OFFLINE_SEED", 0)),
+        )
+
+
+class LatencySampler:
+    """
+    Thread-safe, seeded source of per-call latency and failure decisions.
+    """
+
+    def __init__(self, config: OfflineBackendConfig):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        c = self.config
+        with self._lock:
+            if c.latency == "fixed":
+                return c.latency_mean
+            if c.latency == "uniform":
+                width = c.latency_mean * c.latency_sigma
+                return max(0.0, self._rng.uniform(c.latency_mean - width, c.latency_mean + width))
+            if c.latency == "lognormal":
+                # parametrised so the distribution's mean equals latency_mean
+                mu = math.log(c.latency_mean) - c.latency_sigma**2 / 2
+                return self._rng.lognormvariate(mu, c.latency_sigma)
+        raise ValueError(f"Unknown latency distribution: {c.latency!r}")
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.config.failure_rate
+
+
+# --- Schema-driven fake answers ---
+def _resolve(schema: dict, root: dict) -> dict:
+    ref = schema.get("$ref")
+    if ref:
+        name = ref.rsplit("/", 1)[-1]
+        return root.get("$defs", {}).get(name, {})
+    return schema
+
+
+def fake_from_schema(schema: dict, label: str, digest: str, root: Optional[dict] = None) -> Any:
+    """
+    Builds a value that validates against a (pydantic-generated) JSON schema.
+    """
+    root = root if root is not None else schema
+    schema = _resolve(schema, root)
+
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"]
+            return fake_from_schema(options[0], label, digest, root) if options else None
+
+    kind = schema.get("type")
+    if kind == "object" or "properties" in schema:
+        return {
+            name: fake_from_schema(prop, name, digest, root)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        count = 1 + int(digest[len(label) % len(digest)], 16) % 3
+        return [
+            fake_from_schema(schema.get("items", {}), f"{label} {i + 1}", digest, root)
+            for i in range(count)
+        ]
+    if kind == "integer":
+        return int(digest[:4], 16) % 10
+    if kind == "number":
+        return int(digest[:4], 16) % 100 / 10
+    if kind == "boolean":
+        return int(digest[0], 16) % 2 == 0
+    return f"[offline] {label.replace('_', ' ')} ({digest[:8]})"
+
+
+def _prompt_digest(messages) -> str:
+    parts = []
+    for message in messages:
+        for part in getattr(message, "parts", []):
+            content = getattr(part, "content", None)
+            if isinstance(content, str):
+                parts.append(content)
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def _fake_result(messages, info) -> Tuple[str, Dict[str, Any]]:
+    tool = info.result_tools[0]
+    digest = _prompt_digest(messages)
+    return tool.name, fake_from_schema(tool.parameters_json_schema, tool.name, digest)
+
+
+def build_offline_model(config: Optional[OfflineBackendConfig] = None):
+    """
+    Returns a pydantic_ai FunctionModel implementing the offline backend
+    (supports both agent.run and agent.run_stream).
+    """
+    from pydantic_ai.messages import ModelResponse, ToolCallPart
+    from pydantic_ai.models.function import DeltaToolCall, FunctionModel
+
+    config = config or OfflineBackendConfig.from_env()
+    sampler = LatencySampler(config)
+
+    async def respond(messages, info):
+        await asyncio.sleep(sampler.sample())
+        if sampler.should_fail():
+            raise OfflineModelError("offline backend: simulated provider failure")
+        tool_name, args = _fake_result(messages, info)
+        return ModelResponse(parts=[ToolCallPart(tool_name=tool_name, args=args)])
+
+    async def respond_stream(messages, info) -> AsyncIterator:
+        latency = sampler.sample()
+        if sampler.should_fail():
+            await asyncio.sleep(latency)
+            raise OfflineModelError("offline backend: simulated provider failure")
+        tool_name, args = _fake_result(messages, info)
+        payload = json.dumps(args)
+        chunks: List[str] = [payload[i : i + 24] for i in range(0, len(payload), 24)]
+        # time-to-first-token ~ 1/3 of the latency, the rest spread over the chunks
+        await asyncio.sleep(latency / 3)
+        yield {0: DeltaToolCall(name=tool_name)}
+        for chunk in chunks:
+            await asyncio.sleep(latency * 2 / 3 / len(chunks))
+            yield {0: DeltaToolCall(json_args=chunk)}
+
+    return FunctionModel(respond, stream_function=respond_stream, model_name="offline")
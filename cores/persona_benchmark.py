@@ -0,0 +1,67 @@
+"""
+Wall-clock benchmark: parallel vs sequential persona nodes.
+
+The agents run on the offline backend (cores.offline_model) with a fixed latency
+of exactly `--delay` seconds per call, so no request is sent and the only cost
+left is the graph topology (the response cache is turned off). The "sequential"
+topology (positive -> negative -> balanced) makes three calls in a row, the
+"parallel" one two; the command fails unless fanning the personas out saves
+at least 80% of one call per run:
+
+    python -m cores.persona_benchmark --delay 0.5 --runs 5
+"""
+
+import argparse
+import dataclasses
+import os
+import statistics
+import time
+
+from cores.main_graph import build_graph_input, create_graph
+from cores.runtime import run_sync
+from cores.settings import configure, get_settings
+
+
+async def wall_clock(graph, runs: int) -> float:
+    """
+    Median wall-clock seconds of one analysis, run one at a time after an untimed
+    warm-up run (the agents are built on first use).
+    """
+    durations = []
+    for i in range(runs + 1):
+        start = time.perf_counter()
+        state = await graph.ainvoke(build_graph_input(f"Benchmark conversation {i}."))
+        if i:
+            durations.append(time.perf_counter() - start)
+        if state.get("error"):
+            raise RuntimeError(f"Run {i} failed: {state['error']}")
+    return statistics.median(durations)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel vs sequential personas wall-clock benchmark.")
+    parser.add_argument("--delay", type=float, default=0.5, help="fixed delay per agent call, seconds")
+    parser.add_argument("--runs", type=int, default=5, help="analyses per topology")
+    args = parser.parse_args(argv)
+
+    # fixed per-call delay, read when the offline model is built
+    os.environ.update(OFFLINE_LATENCY="fixed", OFFLINE_LATENCY_MEAN=str(args.delay), OFFLINE_FAILURE_RATE="0")
+    # no response cache: both topologies see the same inputs
+    os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+    configure(dataclasses.replace(get_settings(), model_backend="offline"))
+    sequential = run_sync(wall_clock(create_graph("sequential"), args.runs))
+    parallel = run_sync(wall_clock(create_graph("parallel"), args.runs))
+    saving = sequential - parallel
+
+    print(f"{'fixed delay per call':>22}: {args.delay:8.3f} s")
+    print(f"{'sequential (median)':>22}: {sequential:8.3f} s")
+    print(f"{'parallel (median)':>22}: {parallel:8.3f} s")
+    print(f"{'saving per run':>22}: {saving:8.3f} s ({saving / sequential:.0%})")
+    if saving < 0.8 * args.delay:
+        raise SystemExit(
+            f"Parallel personas saved {saving:.3f}s per run, expected at least {0.8 * args.delay:.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,9 @@
 from cores.prompts import HOPELESS_ROMANTIC_PROMPT
+from cores.agent_factory import register_agent, get_agent, get_model
 
 from typing import List, Set, Literal, Dict, Any
 
 from pydantic import BaseModel, Field
-from pydantic_ai import Agent
-from pydantic_ai.models.openai import OpenAIModel
-
-from dotenv import load_dotenv
-
-import streamlit as st
-import os
-
-# from dotenv import load_dotenv
-
-# load_dotenv()
-# Set the OpenAI API key via environment variable
-os.environ["OPENAI_API_KEY"] = st.secrets["openai_api_key"]
 
 
 class HopelessRomanticResponse(BaseModel):
@@ -36,10 +24,20 @@ class HopelessRomanticResponse(BaseModel):
     )
 
 
-model = OpenAIModel(model_name="gpt-4o-mini")
-
-hopeless_romantic_agent = Agent(
-    model=model,
+spec = register_agent(
+    "hopeless_romantic",
     system_prompt=HOPELESS_ROMANTIC_PROMPT,
     result_type=HopelessRomanticResponse,
 )
+
+
+def __getattr__(attr):
+    """
+    `hopeless_romantic_agent` / `model` are built lazily on first access (see cores.agent_factory),
+    so importing this module has no side effects.
+    """
+    if attr == "hopeless_romantic_agent":
+        return get_agent("hopeless_romantic")
+    if attr == "model":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
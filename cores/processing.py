@@ -0,0 +1,276 @@
+"""
+CPU-bound pre/post-processing around a graph run: conversation parsing, token
+counting / compaction, and formatting of the persona and mediator outputs.
+
+Everything here is a plain module-level function over plain data (dicts, lists,
+strings), so it can run in a worker process (see cores.cpu_pool).
+"""
+
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+from cores.analytics import conversation_stats, stats_summary
+from cores.compaction import apply_budget
+from cores.lexicon import LEXICONS, summarize_hits
+from cores.prompt_templates import SITUATION_TEMPLATE, UPDATE_SITUATION_TEMPLATE
+
+Message = Dict[str, str]
+
+# every agent call embeds the background text once; model calls per graph run by
+# topology (cores.main_graph.TOPOLOGIES)
+AGENT_CALLS_PER_RUN = {"parallel": 3, "sequential": 3, "combined": 2, "lexicon": 0}
+
+
+# --- Parsing / input preparation ---
+def parse_conversation(conversation: List[dict]) -> List[Message]:
+    """
+    Normalizes raw message dicts: trims whitespace, drops empty messages,
+    defaults a missing sender to "SO".
+    """
+    messages = []
+    for msg in conversation:
+        text = str(msg.get("message") or "").strip()
+        if not text:
+            continue
+        sender = str(msg.get("sender") or "SO").strip() or "SO"
+        messages.append({"sender": sender, "message": text})
+    return messages
+
+
+def format_conversation(conversation: List[Message]) -> str:
+    """
+    Formats a list of {'sender', 'message'} dicts as "<sender>: <message>" lines.
+    """
+    return "\n".join(f"{msg['sender']}: {msg['message']}" for msg in conversation)
+
+
+def format_background(
+    background: str,
+    conversation_ctx: str,
+    conversation: List[Message],
+    update: bool = False,
+    stats: Optional[dict] = None,
+) -> str:
+    """
+    Builds the text the persona agents analyze: background + conversation
+    statistics (cores.analytics) + conversation snippet (see cores.prompt_templates
+    for the layout). With update=True the conversation is labelled as the messages
+    added since the previous analysis.
+    """
+    template = UPDATE_SITUATION_TEMPLATE if update else SITUATION_TEMPLATE
+    return template.render(
+        background=background,
+        context=conversation_ctx,
+        statistics=stats_summary(stats) or "",
+        conversation=format_conversation(conversation),
+    )
+
+
+# --- Incremental updates ---
+PERSONA_CHANNELS = ("positive_response", "negative_response")
+RESPONSE_CHANNELS = (*PERSONA_CHANNELS, "balanced_response")
+
+
+def previous_findings(previous: dict) -> Dict[str, list]:
+    """
+    The latest response of each channel of a previous (serialized) final state,
+    as the one-item lists an update run starts from.
+    """
+    missing = [key for key in PERSONA_CHANNELS if not previous.get(key)]
+    if missing:
+        raise ValueError(f"Previous analysis has no {' / '.join(missing)} to update")
+    return {key: [previous[key][-1]] for key in RESPONSE_CHANNELS if previous.get(key)}
+
+
+def is_fresh(state: dict, key: str) -> bool:
+    """
+    Whether response channel `key` holds a response produced by this run: in
+    incremental mode the channels start with the previous findings
+    (state["carried_over"] items), which stay last when the agent fails.
+    """
+    return len(state.get(key) or []) > (state.get("carried_over") or {}).get(key, 0)
+
+
+def stale_channels(state: dict) -> List[str]:
+    """
+    Channels whose latest response is only carried over from the previous analysis.
+    """
+    return [key for key in RESPONSE_CHANNELS if state.get(key) and not is_fresh(state, key)]
+
+
+def findings_fingerprint(findings: Dict[str, list]) -> str:
+    """
+    Identifies the findings an update starts from (part of the update's result key).
+    """
+    encoded = json.dumps(findings, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def situation_fingerprint(background: str, conversation_ctx: str) -> str:
+    """
+    Identifies the relationship background + conversation context of a request
+    (whitespace-insensitive): near-duplicate results are only reused for the same one.
+    """
+    text = "\x1f".join(" ".join(part.split()) for part in (background, conversation_ctx))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def prepare_input(
+    background: str,
+    conversation_ctx: str,
+    conversation: List[dict],
+    token_budget: Optional[int],
+    model_name: str,
+    previous: Optional[dict] = None,
+    agent_calls: int = AGENT_CALLS_PER_RUN["parallel"],
+) -> dict:
+    """
+    Parses and compacts the conversation to fit `token_budget` and returns the
+    initial graph state (a GraphMessage as a plain dict). `agent_calls` (the model
+    calls of the topology that will run) scales the reported per-run token saving.
+
+    With `previous` (the serialized final state of an earlier analysis), the state
+    is an incremental update: `conversation` holds only the new messages, and the
+    response channels start from the previous findings, which the persona nodes
+    revise instead of analyzing from scratch.
+    """
+    findings = previous_findings(previous) if previous is not None else {}
+    update = previous is not None
+    # statistics cover every message (and the imported timestamps), not just what survives compaction
+    stats = conversation_stats([msg for msg in conversation if str(msg.get("message") or "").strip()])
+    conversation, report = apply_budget(
+        parse_conversation(conversation),
+        format_background(background, conversation_ctx, [], update, stats),
+        token_budget,
+        model_name,
+    )
+
+    token_report = None
+    if report is not None:
+        token_report = report.to_dict()
+        token_report["saved_tokens_per_run"] = report.saved_tokens * agent_calls
+        if report.saved_tokens:
+            print(
+                f"Compaction: {report.original_tokens} -> {report.final_tokens} tokens "
+                f"({token_report['saved_tokens_per_run']} saved per run, steps: {report.steps})"
+            )
+
+    return {
+        "background_info": format_background(background, conversation_ctx, conversation, update, stats),
+        "positive_response": findings.get("positive_response", []),
+        "negative_response": findings.get("negative_response", []),
+        "balanced_response": findings.get("balanced_response", []),
+        "error": None,
+        "token_report": token_report,
+        "trace": None,
+        "result_source": None,
+        "update_of": findings_fingerprint(findings) if update else None,
+        "carried_over": {key: len(items) for key, items in findings.items()},
+        "stale_channels": [],
+        "situation": situation_fingerprint(background, conversation_ctx),
+        "conversation": conversation,
+        "lexicon_hits": None,
+        "conversation_stats": stats,
+    }
+
+
+# --- Result formatting (markdown shown in the result tabs) ---
+def markdown_list(items: Optional[List[str]]) -> str:
+    if not items:
+        return "_None noted._"
+    return "\n".join(f"- {item}" for item in items)
+
+
+def romantic_markdown(res: dict) -> str:
+    return "\n\n".join(
+        [
+            f"**Overall Summary:** {res['overall_summary']}",
+            "**Positive Interpretations Highlighted:**",
+            markdown_list(res.get("positive_interpretations")),
+            "**Key 'Breadcrumbs' Focused On:**",
+            markdown_list(res.get("key_breadcrumbs")),
+            "**Rationalized/Downplayed Negatives:**",
+            markdown_list(res.get("downplayed_negatives")),
+        ]
+    )
+
+
+def stoic_markdown(res: dict) -> str:
+    return "\n\n".join(
+        [
+            f"**Overall Summary:** {res['overall_summary']}",
+            "**Potential Red Flags Identified:**",
+            markdown_list(res.get("red_flags")),
+            "**Potential Manipulation Tactics Identified:**",
+            markdown_list(res.get("identified_tactics")),
+            "**Unanswered Questions / Lack of Clarity:**",
+            markdown_list(res.get("unanswered_questions")),
+        ]
+    )
+
+
+def balanced_markdown(res: dict) -> str:
+    parts = [
+        f"**Summary of Romantic View:** {res['romantic_view_summary']}",
+        f"**Summary of Stoic View:** {res['stoic_view_summary']}",
+        "**Key Points of Contention / Disagreement:**",
+        markdown_list(res.get("points_of_contention")),
+        f"**Suggested Next Steps / Reflection Points:** {res['suggested_next_steps']}",
+    ]
+    if res.get("retrieved_resources"):
+        parts += ["**Related Resources Found:**", markdown_list(res["retrieved_resources"])]
+    return "\n\n".join(parts)
+
+
+def lexicon_markdown(hits: Optional[List[dict]]) -> str:
+    """
+    Lexicon scan hits (cores.lexicon) grouped by category, with example messages.
+    """
+    if not hits:
+        return "_No red-flag phrases matched._"
+    parts = []
+    for category, counts in summarize_hits(hits).items():
+        senders = ", ".join(f"{sender}: {count}" for sender, count in sorted(counts.items()))
+        parts.append(f"**{LEXICONS[category][0]}** ({senders})")
+        # one example per message, with every phrase of the category it matched
+        examples: Dict[int, dict] = {}
+        for hit in hits:
+            if hit["category"] == category:
+                example = examples.setdefault(hit["index"], {**hit, "phrases": []})
+                example["phrases"].append(hit["phrase"])
+        parts.append(
+            markdown_list(
+                [
+                    f"{hit['sender']}: \"{hit['excerpt']}\" — _{', '.join(hit['phrases'])}_"
+                    for hit in list(examples.values())[:3]
+                ]
+            )
+        )
+    return "\n\n".join(parts)
+
+
+RESULT_FORMATTERS = {
+    "positive_response": romantic_markdown,
+    "negative_response": stoic_markdown,
+    "balanced_response": balanced_markdown,
+}
+
+
+STALE_NOTE = "> ⚠️ **Not updated:** this analysis failed in the update run; shown below is the previous one."
+
+
+def render_state_markdown(state: dict) -> Dict[str, str]:
+    """
+    Markdown for the latest response of each channel of a serialized state
+    (and for the lexicon scan hits, when the scan ran).
+    """
+    stale = state.get("stale_channels") or []
+    rendered = {
+        key: (STALE_NOTE + "\n\n" if key in stale else "") + formatter(state[key][-1])
+        for key, formatter in RESULT_FORMATTERS.items()
+        if state.get(key)
+    }
+    if state.get("lexicon_hits") is not None:
+        rendered["lexicon_hits"] = lexicon_markdown(state["lexicon_hits"])
+    return rendered
@@ -0,0 +1,181 @@
+"""
+Prompt assembly with a byte-stable static prefix.
+
+OpenAI caches the longest previously seen prompt prefix (for prompts of 1024+ tokens),
+so every request an agent makes should start with exactly the same bytes: system
+prompt and result schema first, per-request input after. This module keeps the two apart:
+
+- `static_prefix()` normalizes a system prompt once, when the agent is registered;
+  system prompts never contain per-request data.
+- `PromptTemplate` renders the per-request user message from named sections in a
+  fixed order (most stable first) with canonical formatting - no incidental
+  indentation from the calling code, lists as bullet lines - so identical inputs
+  always produce identical bytes.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Tuple
+
+from pydantic import BaseModel
+
+UNAVAILABLE = "N/A (this analysis is unavailable for this run)"
+
+_PLACEHOLDER = re.compile(r"\{[A-Za-z_][A-Za-z0-9_]*\}")
+
+
+def normalize_block(text: str) -> str:
+    """
+    Canonical form of a block of text: \\n line endings, no trailing spaces,
+    no leading/trailing blank lines.
+    """
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def static_prefix(system_prompt: str) -> str:
+    """
+    Normalizes a system prompt for use as the static prefix of every request.
+    Rejects unrendered "{placeholders}": per-request data belongs in the user message.
+    """
+    leftover = _PLACEHOLDER.findall(system_prompt)
+    if leftover:
+        raise ValueError(f"System prompt contains template placeholders: {leftover}")
+    return normalize_block(system_prompt)
+
+
+def _field_label(name: str) -> str:
+    return name.replace("_", " ").capitalize()
+
+
+def format_value(value: Any) -> str:
+    """
+    Canonical text for a section value (str, list, pydantic model or None).
+    """
+    if value is None:
+        return UNAVAILABLE
+    if isinstance(value, str) and not value.strip():
+        return "(not provided)"
+    if isinstance(value, BaseModel):
+        # fields in declaration order, so the layout never depends on the data
+        return "\n".join(
+            f"{_field_label(name)}:\n{format_value(getattr(value, name))}"
+            for name in type(value).model_fields
+        )
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return "- (none)"
+        return "\n".join(f"- {normalize_block(str(item))}" for item in value)
+    return normalize_block(str(value))
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    User-message layout: `sections` are (key, heading) pairs rendered in order,
+    as markdown headings of the given `level`.
+    """
+
+    name: str
+    sections: Tuple[Tuple[str, str], ...]
+    level: int = 2
+
+    def render(self, **values: Any) -> str:
+        expected = {key for key, _ in self.sections}
+        unknown = set(values) - expected
+        if unknown:
+            raise ValueError(f"{self.name}: unknown prompt sections {sorted(unknown)}")
+        marker = "#" * self.level
+        return "\n\n".join(
+            f"{marker} {heading}\n{format_value(values.get(key))}" for key, heading in self.sections
+        )
+
+
+# --- Templates ---
+# input of the persona agents (nested under "Situation" in the mediator's input)
+SITUATION_TEMPLATE = PromptTemplate(
+    "situation",
+    (
+        ("background", "Relationship background"),
+        ("context", "Context of conversation"),
+        ("statistics", "Conversation statistics (computed locally)"),
+        ("conversation", "Conversation"),
+    ),
+    level=3,
+)
+
+# input of the mediator: the situation (shared by every call of a run) comes first,
+# then the persona analyses, which differ from run to run
+MEDIATOR_TEMPLATE = PromptTemplate(
+    "mediator",
+    (
+        ("situation", "Situation"),
+        ("stoic", "Practical Stoic analysis"),
+        ("romantic", "Hopeless Romantic analysis"),
+    ),
+)
+
+# local lexicon scan hits appended to a persona agent's input (cores.lexicon)
+HINTS_TEMPLATE = PromptTemplate(
+    "lexicon_hints",
+    (("hints", "Phrase-level pattern matches (local scan; hints only, may be false positives)"),),
+)
+
+
+# --- Incremental updates (only the messages added since the previous analysis) ---
+UPDATE_SITUATION_TEMPLATE = PromptTemplate(
+    "update_situation",
+    (
+        ("background", "Relationship background"),
+        ("context", "Context of conversation"),
+        ("statistics", "Statistics of the new messages (computed locally)"),
+        ("conversation", "New messages since the previous analysis"),
+    ),
+    level=3,
+)
+
+UPDATE_INSTRUCTIONS = (
+    "You analyzed the earlier part of this conversation before; a digest of your previous "
+    "analysis follows. Update it for the new messages: keep findings that still hold, revise "
+    "or drop the ones the new messages contradict, and add what is new. Return the complete "
+    "updated analysis, not only the changes."
+)
+
+# input of a persona agent in incremental mode: fixed instructions first, then the
+# persona's own previous findings, then the new messages
+PERSONA_UPDATE_TEMPLATE = PromptTemplate(
+    "persona_update",
+    (
+        ("task", "Task"),
+        ("previous", "Your previous analysis"),
+        ("situation", "What's new"),
+    ),
+)
+
+# digest limits: previous findings are re-sent on every update, so they are capped
+DIGEST_MAX_ITEMS = 8
+DIGEST_MAX_CHARS = 280
+
+
+def _clip(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else text[: max_chars - 1].rstrip() + "…"
+
+
+def digest_findings(
+    response: BaseModel, max_items: int = DIGEST_MAX_ITEMS, max_chars: int = DIGEST_MAX_CHARS
+) -> BaseModel:
+    """
+    Compact copy of a previous response for re-sending: lists capped at `max_items`,
+    texts clipped to `max_chars`.
+    Nested responses (e.g. the combined personas) are digested field by field.
+    """
+    update = {}
+    for name in type(response).model_fields:
+        value = getattr(response, name)
+        if isinstance(value, BaseModel):
+            update[name] = digest_findings(value, max_items, max_chars)
+        elif isinstance(value, str):
+            update[name] = _clip(value, max_chars)
+        elif isinstance(value, list):
+            update[name] = [_clip(str(item), max_chars) for item in value[:max_items]]
+    return response.model_copy(update=update)
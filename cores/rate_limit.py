@@ -0,0 +1,64 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+
+class RateLimiter:
+    """
+    Async token bucket: at most `rate` acquisitions per `period` seconds,
+    with bursts up to `burst` (defaults to `rate`, and at least one acquisition).
+    """
+
+    def __init__(self, rate: float, period: float = 60.0, burst: Optional[float] = None):
+        if rate <= 0 or period <= 0:
+            raise ValueError(f"Rate limit must be positive, got {rate} per {period}s")
+        self.rate = rate
+        self.period = period
+        # below one token a single acquire() could never be satisfied
+        self.capacity = max(burst or rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate / self.period
+        )
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Waits until `tokens` are available; returns the time spent waiting (seconds).
+        """
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                delay = (tokens - self._tokens) * self.period / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self._tokens -= tokens
+        return waited
+
+
+# --- Per-provider registry ---
+_limiters: Dict[str, RateLimiter] = {}
+_lock = threading.Lock()
+
+
+def set_rate_limit(provider: str, requests_per_minute: Optional[float]) -> None:
+    """
+    Sets (or removes, with None) the request rate limit for a model provider.
+    """
+    with _lock:
+        if requests_per_minute:
+            _limiters[provider] = RateLimiter(requests_per_minute, period=60.0)
+        else:
+            _limiters.pop(provider, None)
+
+
+def get_rate_limiter(provider: str) -> Optional[RateLimiter]:
+    return _limiters.get(provider)
@@ -0,0 +1,220 @@
+"""
+Resilience policy for agent calls: per-call timeouts, retries with exponential
+backoff + jitter, an overall graph deadline, and optional hedged requests.
+
+Environment (read by ResiliencePolicy.from_env):
+    AGENT_CALL_TIMEOUT   seconds per model call (default 60, 0 = none)
+    AGENT_MAX_RETRIES    retries on retryable errors (default 2)
+    AGENT_BACKOFF_BASE   first backoff delay, seconds (default 0.5)
+    AGENT_BACKOFF_MAX    backoff cap, seconds (default 8)
+    AGENT_HEDGE_AFTER    "p95" (or any "pNN") to hedge after that latency quantile of
+                         the agent, or a number of seconds; unset = no hedging
+    GRAPH_DEADLINE       seconds for a whole graph run (default 180, 0 = none)
+"""
+
+import asyncio
+import contextvars
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, Tuple, TypeVar
+
+import httpx
+
+from cores.metrics import REGISTRY
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 409, 429}
+RETRYABLE_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "RateLimitError",
+    "InternalServerError",
+    "OfflineModelError",
+}
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    The graph deadline ran out before (or while) making a call.
+    """
+
+
+@dataclass
+class ResiliencePolicy:
+    call_timeout: Optional[float] = 60.0
+    max_retries: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    hedge_after: Optional[float] = None  # fixed delay (seconds)
+    hedge_quantile: Optional[float] = None  # or: the agent's observed latency quantile
+    hedge_min_samples: int = 20
+    graph_deadline: Optional[float] = 180.0
+
+    @classmethod
+    def from_env(cls) -> "ResiliencePolicy":
+        hedge = os.environ.get("AGENT_HEDGE_AFTER", "").strip().lower()
+        hedge_after = hedge_quantile = None
+        if hedge.startswith("p"):
+            hedge_quantile = float(hedge[1:]) / 100
+        elif hedge:
+            hedge_after = float(hedge)
+        return cls(
+            call_timeout=float(os.environ.get("AGENT_CALL_TIMEOUT", 60)) or None,
+            max_retries=int(os.environ.get("AGENT_MAX_RETRIES", 2)),
+            backoff_base=float(os.environ.get("AGENT_BACKOFF_BASE", 0.5)),
+            backoff_max=float(os.environ.get("AGENT_BACKOFF_MAX", 8)),
+            hedge_after=hedge_after,
+            hedge_quantile=hedge_quantile,
+            graph_deadline=float(os.environ.get("GRAPH_DEADLINE", 180)) or None,
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Exponential backoff with full jitter for retry number `attempt` (1-based).
+        """
+        cap = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return random.uniform(0, cap)
+
+
+_policy: Optional[ResiliencePolicy] = None
+
+
+def get_policy() -> ResiliencePolicy:
+    global _policy
+    if _policy is None:
+        _policy = ResiliencePolicy.from_env()
+    return _policy
+
+
+def set_policy(policy: ResiliencePolicy) -> None:
+    global _policy
+    _policy = policy
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    Timeouts, connection problems, 429s and 5xx responses are worth retrying;
+    validation errors and other 4xx are not.
+    """
+    if isinstance(exc, DeadlineExceeded):
+        return False
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS or status >= 500
+    return type(exc).__name__ in RETRYABLE_NAMES
+
+
+# --- Graph deadline (absolute, monotonic) ---
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "graph_deadline", default=None
+)
+
+
+def set_deadline(seconds: Optional[float]) -> None:
+    """
+    Sets the deadline of the current run (inherited by the tasks it spawns);
+    None / 0 means no deadline.
+    """
+    _deadline.set(time.monotonic() + seconds if seconds else None)
+
+
+def remaining_time() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _call_budget(policy: ResiliencePolicy) -> Optional[float]:
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded("graph deadline exceeded")
+    budgets = [b for b in (policy.call_timeout, remaining) if b is not None]
+    return min(budgets) if budgets else None
+
+
+def observe_attempt(name: str, seconds: float) -> None:
+    """
+    Records the latency of one successful model request (no retries, backoff
+    or rate limiter wait): the distribution quantile hedging is based on.
+    """
+    REGISTRY.observe("agent_attempt_seconds", seconds, {"agent": name}, help="Single model request time")
+
+
+def _hedge_delay(policy: ResiliencePolicy, name: str) -> Optional[float]:
+    if policy.hedge_after is not None:
+        return policy.hedge_after
+    if policy.hedge_quantile is not None:
+        labels = {"agent": name}
+        if REGISTRY.count("agent_attempt_seconds", labels) >= policy.hedge_min_samples:
+            return REGISTRY.quantile("agent_attempt_seconds", policy.hedge_quantile, labels)
+    return None
+
+
+async def _hedged(call: Callable[[], Awaitable[T]], delay: float, name: str) -> T:
+    """
+    Starts `call`; if it hasn't finished after `delay`, starts a duplicate and
+    returns whichever succeeds first. Every request still running when this
+    returns, raises or is cancelled is cancelled.
+    """
+    pending = {asyncio.ensure_future(call())}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return done.pop().result()
+
+        REGISTRY.inc("agent_hedged_requests_total", 1, {"agent": name}, help="Hedged duplicate requests")
+        pending.add(asyncio.ensure_future(call()))
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def call_with_policy(
+    call: Callable[[], Awaitable[T]],
+    name: str,
+    policy: Optional[ResiliencePolicy] = None,
+    hedge: bool = True,
+) -> Tuple[T, int]:
+    """
+    Runs `call` under the policy; returns (result, number of retries used).
+    `call` is one attempt: it is called again for every retry and hedged
+    duplicate, so per-request work (e.g. waiting on the rate limiter) belongs inside it.
+    """
+    policy = policy or get_policy()
+    attempt = 0
+    while True:
+        budget = _call_budget(policy)
+        delay = _hedge_delay(policy, name) if hedge else None
+        try:
+            if delay is not None and (budget is None or delay < budget):
+                coro = _hedged(call, delay, name)
+            else:
+                coro = call()
+            result = await asyncio.wait_for(coro, timeout=budget)
+            return result, attempt
+        except Exception as e:
+            attempt += 1
+            if attempt > policy.max_retries or not is_retryable(e):
+                raise
+            wait = policy.backoff(attempt)
+            remaining = remaining_time()
+            if remaining is not None and wait >= remaining:
+                raise
+            REGISTRY.inc("agent_retry_attempts_total", 1, {"agent": name}, help="Policy retries")
+            print(f"Retrying {name} in {wait:.2f}s after error: {e!r}")
+            await asyncio.sleep(wait)
+
@@ -0,0 +1,246 @@
+"""
+Persistent store of finalized graph results, shared across Streamlit sessions,
+server replicas (pointing at the same file/volume) and restarts.
+
+Results are keyed by a hash of the normalized graph input, the topology, the
+model and the prompt version (see `result_key`). Identical requests that arrive
+while a run for the same key is in flight are coalesced by cores.singleflight.
+
+Environment (read by get_result_store):
+    RESULT_STORE        "sqlite" (default) | "file" | "lmdb" | "none"
+    RESULT_STORE_PATH   SQLite file / directory / LMDB environment path
+                        (default .cache/results.db, .cache/results, .cache/results.lmdb
+                        in the repository root)
+    RESULT_STORE_TTL    seconds a stored result stays valid (default 7 days, 0 = forever)
+"""
+
+import abc
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from cores.cache import normalize_text
+from cores.settings import cache_path
+
+DEFAULT_PATHS = {
+    "sqlite": cache_path("results.db"),
+    "file": cache_path("results"),
+    "lmdb": cache_path("results.lmdb"),
+}
+
+
+def result_key(background_info: str, topology: str, model_name: str, prompt_version: str) -> str:
+    """
+    Content-addressed key of one analysis request.
+    """
+    payload = "\x1f".join(
+        [normalize_text(background_info), topology, model_name, prompt_version]
+    ).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _expired(created_at: float, ttl: Optional[float]) -> bool:
+    return bool(ttl) and created_at + ttl < time.time()
+
+
+# --- Backends ---
+class ResultStore(abc.ABC):
+    """
+    Interface of a result store: JSON-serializable dicts keyed by result_key().
+    """
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[dict]: ...
+
+    @abc.abstractmethod
+    def set(self, key: str, result: dict) -> None: ...
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abc.abstractmethod
+    def clear(self) -> None: ...
+
+
+class SQLiteResultStore(ResultStore):
+    """
+    Default backend: one SQLite file (WAL mode, so several processes can share it).
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = 7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS graph_results ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM graph_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if _expired(created_at, self.ttl):
+                self._conn.execute("DELETE FROM graph_results WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+        return json.loads(value)
+
+    def set(self, key: str, result: dict) -> None:
+        value = json.dumps(result)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO graph_results (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM graph_results WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM graph_results")
+            self._conn.commit()
+
+
+class FileResultStore(ResultStore):
+    """
+    One JSON file per result under `directory` (sharded by key prefix);
+    writes are atomic (temp file + rename), so readers never see partial files.
+    """
+
+    def __init__(self, directory: str, ttl: Optional[float] = 7 * 24 * 3600):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if _expired(entry["created_at"], self.ttl):
+            self.delete(key)
+            return None
+        return entry["result"]
+
+    def set(self, key: str, result: dict) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created_at": time.time(), "result": result}, f)
+        os.replace(tmp_path, path)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        for shard in os.listdir(self.directory):
+            shard_path = os.path.join(self.directory, shard)
+            if os.path.isdir(shard_path):
+                for name in os.listdir(shard_path):
+                    if name.endswith(".json"):
+                        os.remove(os.path.join(shard_path, name))
+
+
+class LMDBResultStore(ResultStore):
+    """
+    LMDB environment (requires the optional `lmdb` package).
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = 7 * 24 * 3600, map_size: int = 1 << 30):
+        try:
+            import lmdb
+        except ImportError as e:
+            raise ImportError("RESULT_STORE=lmdb requires the `lmdb` package (pip install lmdb)") from e
+        self.ttl = ttl
+        self._env = lmdb.open(path, map_size=map_size, subdir=True)
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._env.begin() as txn:
+            value = txn.get(key.encode("ascii"))
+        if value is None:
+            return None
+        entry = json.loads(value)
+        if _expired(entry["created_at"], self.ttl):
+            self.delete(key)
+            return None
+        return entry["result"]
+
+    def set(self, key: str, result: dict) -> None:
+        value = json.dumps({"created_at": time.time(), "result": result}).encode("utf-8")
+        with self._env.begin(write=True) as txn:
+            txn.put(key.encode("ascii"), value)
+
+    def delete(self, key: str) -> None:
+        with self._env.begin(write=True) as txn:
+            txn.delete(key.encode("ascii"))
+
+    def clear(self) -> None:
+        with self._env.begin(write=True) as txn:
+            txn.drop(self._env.open_db(), delete=False)
+
+
+_BACKENDS = {
+    "sqlite": SQLiteResultStore,
+    "file": FileResultStore,
+    "lmdb": LMDBResultStore,
+}
+
+
+# --- Process-wide default store ---
+_default_store: Optional[ResultStore] = None
+_default_lock = threading.Lock()
+
+
+def get_result_store() -> Optional[ResultStore]:
+    """
+    Returns the shared result store, built from environment variables on first use
+    (see module docstring). Returns None when RESULT_STORE=none.
+    """
+    global _default_store
+    backend = os.environ.get("RESULT_STORE", "sqlite").lower()
+    if backend in ("none", "0", ""):
+        return None
+    with _default_lock:
+        if _default_store is None:
+            if backend not in _BACKENDS:
+                raise ValueError(f"Unknown result store backend: {backend!r}")
+            path = os.environ.get("RESULT_STORE_PATH") or DEFAULT_PATHS[backend]
+            ttl = float(os.environ.get("RESULT_STORE_TTL", 7 * 24 * 3600)) or None
+            _default_store = _BACKENDS[backend](path, ttl=ttl)
+        return _default_store
+
+
+def set_result_store(store: Optional[ResultStore]) -> None:
+    """
+    Replaces the shared store (e.g. to plug in a custom backend).
+    """
+    global _default_store
+    with _default_lock:
+        _default_store = store
+
@@ -0,0 +1,379 @@
+"""
+Local BM25 retrieval over an on-disk corpus of articles (resources/articles of
+the repository by default), used to attach real resources to the mediator's response instead of
+leaving `retrieved_resources` to the model.
+
+The inverted index is built offline into a directory of NumPy arrays (term
+offsets, posting doc ids, precomputed BM25 weights) plus a JSON file with the
+vocabulary and document titles/summaries; at startup the arrays are memory
+mapped, and a query is a handful of vectorized adds over the postings.
+The index records the corpus it was built from (file names, sizes, modification
+times) and is rebuilt on first use when the corpus has changed since; rebuilds
+and loads hold a lock file next to the index, so processes sharing it (job
+workers, the CPU pool, the UI) take turns instead of swapping directories under
+each other.
+
+Environment (read by get_retriever):
+    RETRIEVAL               "1" (default) | "0"
+    RETRIEVAL_INDEX         index directory (default .cache/bm25 in the repository root)
+    RETRIEVAL_CORPUS        corpus the index is built from when it doesn't exist yet or is
+                            out of date: a directory of .md / .txt articles ("# Title" first
+                            line) or a .jsonl file with title / text (/ url) fields
+                            (default resources/articles in the repository root)
+    RETRIEVAL_MIN_SCORE     minimum BM25 score of an attached resource (default 3.0)
+    RETRIEVAL_MAX_RESOURCES resources attached per analysis (default 3)
+
+CLI:
+    python -m cores.retrieval build --corpus resources/articles --out .cache/bm25
+    python -m cores.retrieval query "vague answers about the future, cancels plans"
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from cores.settings import REPO_ROOT, cache_path
+
+INDEX_VERSION = 1
+# relative to the repository, not the working directory the app was started from
+DEFAULT_INDEX = cache_path("bm25")
+DEFAULT_CORPUS = os.path.join(REPO_ROOT, "resources", "articles")
+
+STOPWORDS = frozenset(
+    """
+    a about after again all also am an and any are as at be because been before being both but by can
+    could did do does doing don't down during each even few for from further had has have having he her
+    here hers him his how i if in into is it its it's just me more most my no nor not now of off on once
+    only or other our out over own same she should so some such than that the their them then there these
+    they this those through to too under until up very was we were what when where which while who whom
+    why will with would you your yours
+    """.split()
+)
+_WORD = re.compile(r"[a-z]+")
+_SUFFIXES = ("ingly", "edly", "ing", "ies", "ed", "es", "ly", "s")
+
+
+def stem(word: str) -> str:
+    """
+    Light suffix stripping ("gaslighting" -> "gaslight", "cancelled" -> "cancel").
+    """
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)] + ("y" if suffix == "ies" else "")
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "aeiouls":
+                word = word[:-1]
+            break
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(word) for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+# --- Corpus ---
+def _summary(text: str, max_chars: int = 220) -> str:
+    paragraph = text.strip().split("\n\n", 1)[0].replace("\n", " ")
+    sentences = re.split(r"(?<=[.!?])\s+", paragraph)
+    summary = ""
+    for sentence in sentences:
+        if summary and len(summary) + len(sentence) + 1 > max_chars:
+            break
+        summary = f"{summary} {sentence}".strip()
+    if len(summary) > max_chars:
+        summary = summary[: max_chars - 1].rsplit(" ", 1)[0].rstrip(",;:") + "…"
+    return summary
+
+
+def load_corpus(path: str) -> Iterator[dict]:
+    """
+    Yields {"title", "text", "source"} documents from a directory of .md/.txt
+    articles or a .jsonl file.
+    """
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if not name.endswith((".md", ".txt")):
+                continue
+            with open(os.path.join(path, name), "r", encoding="utf-8") as f:
+                content = f.read()
+            first, _, body = content.partition("\n")
+            if first.startswith("#"):
+                title = first.lstrip("#").strip()
+            else:
+                title, body = os.path.splitext(name)[0].replace("-", " ").capitalize(), content
+            yield {"title": title, "text": body.strip(), "source": os.path.join(path, name)}
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield {
+                    "title": record["title"],
+                    "text": record["text"],
+                    "source": record.get("url") or record.get("source") or path,
+                }
+
+
+def _corpus_files(path: str) -> List[str]:
+    if os.path.isdir(path):
+        return [
+            os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith((".md", ".txt"))
+        ]
+    return [path]
+
+
+def corpus_signature(path: str) -> List[list]:
+    """
+    [name, size, mtime_ns] of every corpus file: changes when an article is
+    added, removed or edited.
+    """
+    signature = []
+    for file in _corpus_files(path):
+        info = os.stat(file)
+        signature.append([os.path.basename(file), info.st_size, info.st_mtime_ns])
+    return signature
+
+
+def index_is_current(directory: str, corpus: str) -> bool:
+    """
+    Whether the index in `directory` exists and was built from `corpus` as it is now.
+    """
+    try:
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return meta.get("version") == INDEX_VERSION and meta.get("corpus") == corpus_signature(corpus)
+
+
+@contextlib.contextmanager
+def index_lock(out: str):
+    """
+    Exclusive lock (across processes) on the index directory `out`; not reentrant.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(f"{out}.lock", "a") as f:
+        try:
+            import fcntl
+        except ImportError:  # Windows: no advisory locks, rebuilds are not serialized
+            yield
+            return
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# --- Index build (offline) ---
+def build_index(corpus: str, out: str, k1: float = 1.2, b: float = 0.75) -> dict:
+    """
+    Builds the index of `corpus` into directory `out` (written to a temporary
+    directory, then swapped in under index_lock).
+    Titles are counted twice. Returns the index metadata.
+    """
+    with index_lock(out):
+        return _build_index(corpus, out, k1, b)
+
+
+def _build_index(corpus: str, out: str, k1: float, b: float) -> dict:
+    signature = corpus_signature(corpus)
+    documents, doc_terms = [], []
+    for doc in load_corpus(corpus):
+        terms = Counter(tokenize(doc["title"]) * 2 + tokenize(doc["text"]))
+        doc_terms.append(terms)
+        documents.append({"title": doc["title"], "summary": _summary(doc["text"]), "source": doc["source"]})
+    if not documents:
+        raise ValueError(f"No documents found in {corpus}")
+
+    n_docs = len(documents)
+    doc_len = np.array([sum(terms.values()) for terms in doc_terms], dtype=np.float32)
+    avgdl = float(doc_len.mean())
+    postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+    for doc_id, terms in enumerate(doc_terms):
+        for term, tf in terms.items():
+            postings[term].append((doc_id, tf))
+
+    vocab = sorted(postings)
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    doc_ids, weights = [], []
+    for term_id, term in enumerate(vocab):
+        entries = postings[term]
+        idf = math.log(1 + (n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+        for doc_id, tf in entries:
+            norm = k1 * (1 - b + b * doc_len[doc_id] / avgdl)
+            doc_ids.append(doc_id)
+            weights.append(idf * tf * (k1 + 1) / (tf + norm))
+        offsets[term_id + 1] = len(doc_ids)
+
+    tmp = f"{out}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp, "doc_ids.npy"), np.array(doc_ids, dtype=np.int32))
+    np.save(os.path.join(tmp, "weights.npy"), np.array(weights, dtype=np.float32))
+    meta = {
+        "version": INDEX_VERSION,
+        "k1": k1,
+        "b": b,
+        "avgdl": avgdl,
+        "terms": {term: term_id for term_id, term in enumerate(vocab)},
+        "documents": documents,
+        "corpus": signature,
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    if os.path.exists(out):
+        shutil.rmtree(out)
+    os.replace(tmp, out)
+    return meta
+
+
+# --- Query ---
+class BM25Index:
+    """
+    Read-only, memory-mapped index built by build_index().
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Index at {directory} has version {meta.get('version')}, expected {INDEX_VERSION}")
+        self.terms: Dict[str, int] = meta["terms"]
+        self.documents: List[dict] = meta["documents"]
+        self.offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r")
+        self.doc_ids = np.load(os.path.join(directory, "doc_ids.npy"), mmap_mode="r")
+        self.weights = np.load(os.path.join(directory, "weights.npy"), mmap_mode="r")
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[int, float]]:
+        """
+        Top-k (doc_id, score), best first; documents sharing no term are not returned.
+        """
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term, count in Counter(tokenize(query)).items():
+            term_id = self.terms.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            # a term's postings hold each document once, so fancy-index += is safe
+            scores[self.doc_ids[start:end]] += count * self.weights[start:end]
+        k = min(k, len(scores))
+        top = np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in top if scores[doc_id] > 0]
+
+
+def find_resources(
+    index: BM25Index, findings: List[str], limit: int = 3, min_score: float = 3.0
+) -> List[str]:
+    """
+    Resources for a list of findings (red flags, tactics, points of contention):
+    each finding is a query, each document keeps its best score and the finding
+    it matched, and the top `limit` documents are formatted for display.
+    """
+    best: Dict[int, Tuple[float, str]] = {}
+    for finding in findings:
+        for doc_id, score in index.search(finding, k=2):
+            if score >= min_score and score > best.get(doc_id, (0.0, ""))[0]:
+                best[doc_id] = (score, finding)
+    ranked = sorted(best.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+    resources = []
+    for doc_id, (_, finding) in ranked:
+        doc = index.documents[doc_id]
+        matched = finding if len(finding) <= 80 else finding[:79].rstrip() + "…"
+        resources.append(f"{doc['title']}: {doc['summary']} (related to: \"{matched}\")")
+    return resources
+
+
+# --- Process-wide default index ---
+_default_index: Optional[BM25Index] = None
+_default_loaded = False
+_default_lock = threading.Lock()
+
+
+def get_retriever() -> Optional[BM25Index]:
+    """
+    Returns the shared index, memory-mapped on first use (built from
+    RETRIEVAL_CORPUS first if it doesn't exist yet or the corpus changed since).
+    None when disabled or when there is neither an index nor a corpus.
+    """
+    global _default_index, _default_loaded
+    if os.environ.get("RETRIEVAL", "1") == "0":
+        return None
+    with _default_lock:
+        if not _default_loaded:
+            _default_loaded = True
+            path = os.environ.get("RETRIEVAL_INDEX", DEFAULT_INDEX)
+            corpus = os.environ.get("RETRIEVAL_CORPUS", DEFAULT_CORPUS)
+            try:
+                # another process may be rebuilding the same index
+                with index_lock(path):
+                    if os.path.exists(corpus) and not index_is_current(path, corpus):
+                        print(f"Building retrieval index {path} from {corpus}")
+                        _build_index(corpus, path, 1.2, 0.75)
+                    if os.path.exists(os.path.join(path, "meta.json")):
+                        _default_index = BM25Index(path)
+            except (OSError, ValueError) as e:
+                print(f"Retrieval disabled: {e}")
+        return _default_index
+
+
+def attach_resources(findings: List[str]) -> Optional[List[str]]:
+    """
+    Resources for the findings from the shared index, or None when retrieval is unavailable.
+    """
+    index = get_retriever()
+    if index is None:
+        return None
+    return find_resources(
+        index,
+        [finding for finding in findings if finding],
+        limit=int(os.environ.get("RETRIEVAL_MAX_RESOURCES", 3)),
+        min_score=float(os.environ.get("RETRIEVAL_MIN_SCORE", 3.0)),
+    )
+
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BM25 retrieval index.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build the index from a corpus")
+    build.add_argument("--corpus", default=DEFAULT_CORPUS)
+    build.add_argument("--out", default=DEFAULT_INDEX)
+    build.add_argument("--k1", type=float, default=1.2)
+    build.add_argument("--b", type=float, default=0.75)
+    query = commands.add_parser("query", help="search the index")
+    query.add_argument("text")
+    query.add_argument("--index", default=DEFAULT_INDEX)
+    query.add_argument("-k", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        meta = build_index(args.corpus, args.out, args.k1, args.b)
+        print(
+            f"Indexed {len(meta['documents'])} documents, {len(meta['terms'])} terms "
+            f"into {args.out} in {time.perf_counter() - start:.2f}s"
+        )
+    else:
+        index = BM25Index(args.index)
+        start = time.perf_counter()
+        results = index.search(args.text, args.k)
+        elapsed = time.perf_counter() - start
+        for doc_id, score in results:
+            print(f"{score:7.2f}  {index.documents[doc_id]['title']}")
+        print(f"({elapsed * 1000:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import threading
+from typing import Any, Coroutine, Optional
+
+import httpx
+
+# --- Long-lived background event loop ---
+# Graph runs are submitted here instead of asyncio.run(), so the loop (and the
+# HTTP connection pool bound to it) survives across Streamlit reruns and sessions.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the app-wide event loop, starting its daemon thread on first use.
+    """
+    global _loop, _loop_thread
+    if _loop is not None and _loop.is_running():
+        return _loop
+
+    with _loop_lock:
+        if _loop is None or not _loop.is_running():
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+            thread = threading.Thread(target=_run, name="cores-event-loop", daemon=True)
+            thread.start()
+            started.wait()
+            _loop, _loop_thread = loop, thread
+        return _loop
+
+
+def submit(coro: Coroutine) -> "asyncio.Future":
+    """
+    Schedules a coroutine on the background loop; returns a concurrent.futures.Future.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+
+def run_sync(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """
+    Runs a coroutine on the background loop and blocks the calling thread for its result.
+    Drop-in replacement for asyncio.run() from sync code (Streamlit script thread, CLI).
+    """
+    return submit(coro).result(timeout=timeout)
+
+
+# --- Shared pooled HTTP client ---
+_http_client: Optional[httpx.AsyncClient] = None
+_http_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the keep-alive HTTP client shared by all OpenAIModel instances.
+
+    Configured from the environment:
+        OPENAI_HTTP_MAX_CONNECTIONS (default 100)
+        OPENAI_HTTP_MAX_KEEPALIVE (default 20)
+        OPENAI_HTTP_KEEPALIVE_EXPIRY seconds (default 60)
+        OPENAI_HTTP_TIMEOUT seconds (default 120)
+        OPENAI_HTTP2 ("1" to enable, requires the h2 package)
+    """
+    global _http_client
+    if _http_client is not None:
+        return _http_client
+
+    with _http_lock:
+        if _http_client is None:
+            limits = httpx.Limits(
+                max_connections=int(os.environ.get("OPENAI_HTTP_MAX_CONNECTIONS", 100)),
+                max_keepalive_connections=int(
+                    os.environ.get("OPENAI_HTTP_MAX_KEEPALIVE", 20)
+                ),
+                keepalive_expiry=float(
+                    os.environ.get("OPENAI_HTTP_KEEPALIVE_EXPIRY", 60)
+                ),
+            )
+            timeout = httpx.Timeout(
+                float(os.environ.get("OPENAI_HTTP_TIMEOUT", 120)), connect=10
+            )
+            _http_client = httpx.AsyncClient(
+                limits=limits,
+                timeout=timeout,
+                http2=os.environ.get("OPENAI_HTTP2") == "1",
+            )
+        return _http_client
+
+
+def shutdown() -> None:
+    """
+    Closes the shared HTTP client and stops the background loop.
+    """
+    global _loop, _loop_thread, _http_client
+    with _loop_lock:
+        loop = _loop
+        if loop is not None and loop.is_running():
+            if _http_client is not None:
+                asyncio.run_coroutine_threadsafe(_http_client.aclose(), loop).result(5)
+            loop.call_soon_threadsafe(loop.stop)
+            if _loop_thread is not None:
+                _loop_thread.join(timeout=5)
+        _loop, _loop_thread, _http_client = None, None, None
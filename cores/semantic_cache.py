@@ -0,0 +1,478 @@
+"""
+Semantic cache of finalized analyses: reuses the result of an earlier request
+whose input is a near-duplicate (a paraphrase, reordered details, small edits)
+of the new one, which the exact-key result store (cores.result_store) misses.
+
+Inputs are embedded on the CPU with a sentence-transformers model (optional
+package), vectors are kept in a memory-mapped NumPy matrix and searched by
+cosine similarity. Results (and their metadata) are kept in a SQLite file next
+to the matrix, so the cache survives restarts; when full, the least recently
+used entry is replaced. Only entries with the same scope match: topology, model,
+prompt version and the exact relationship background / context (see
+cores.main_graph.semantic_scope), so only the conversation may differ.
+
+Several processes may share one directory: rows are allocated inside a SQLite
+write transaction, each entry records a checksum of its vector, and a process
+reloads the row -> entry mapping whenever another one has changed it.
+
+The cache is opt-in: a reused result is an answer to a different conversation.
+The feature-hashing embedder only measures word overlap (a negation or a swapped
+name barely moves it), so it is refused unless explicitly allowed.
+
+Environment (read by get_semantic_cache):
+    SEMANTIC_CACHE               "0" (default) | "1"
+    SEMANTIC_CACHE_PATH          directory for the matrix + SQLite file (default .cache/semantic
+                                 in the repository root)
+    SEMANTIC_CACHE_THRESHOLD     minimum cosine similarity to reuse a result (default 0.97)
+    SEMANTIC_CACHE_CAPACITY      maximum entries (default 10000)
+    SEMANTIC_CACHE_TTL           seconds an entry stays valid (default 7 days, 0 = forever)
+    SEMANTIC_CACHE_EMBEDDER      "sentence-transformers:<model name>" (default
+                                 all-MiniLM-L6-v2) or "hashing"
+    SEMANTIC_CACHE_ALLOW_HASHING "1" to enable the cache with the hashing embedder
+                                 (benchmarks / tests; default "0")
+
+Lookup latency benchmark:
+    python -m cores.semantic_cache --entries 100000 --queries 500
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from cores.settings import cache_path
+
+TOP_K = 3
+
+
+# --- Embedders ---
+_HEADING = re.compile(r"^#+ .*$", re.MULTILINE)
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+
+def embedding_text(background_info: str) -> str:
+    """
+    The part of a graph input that is embedded: template headings dropped
+    (they are the same for every request), lowercased, whitespace collapsed.
+    """
+    return " ".join(_HEADING.sub(" ", background_info).lower().split())
+
+
+class HashingEmbedder:
+    """
+    Feature-hashing bag of words + word bigrams (sublinear tf, signed buckets),
+    L2-normalized. No model download; good at rewordings that keep most words.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, text: str) -> np.ndarray:
+        words = _TOKEN.findall(text)
+        features = Counter(words)
+        features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not features:
+            return vector
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode("utf-8")) for feature in features), dtype=np.uint32, count=len(features)
+        )
+        weights = np.fromiter(
+            (1 + math.log(count) for count in features.values()), dtype=np.float32, count=len(features)
+        )
+        # bigrams weigh half: word choice matters more than word order
+        weights *= np.fromiter((0.5 if " " in f else 1.0 for f in features), dtype=np.float32, count=len(features))
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, hashes % self.dim, signs * weights)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SentenceTransformerEmbedder:
+    """
+    Local sentence-transformers model (requires the optional package).
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "SEMANTIC_CACHE_EMBEDDER=sentence-transformers requires the `sentence-transformers` "
+                "package (pip install sentence-transformers)"
+            ) from e
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self._model.get_sentence_embedding_dimension()
+        self.name = f"st:{model_name}"
+
+    def embed(self, text: str) -> np.ndarray:
+        return self._model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+
+def make_embedder(spec: str):
+    kind, _, model_name = spec.partition(":")
+    if kind == "hashing":
+        return HashingEmbedder(int(model_name or 256))
+    if kind == "sentence-transformers":
+        return SentenceTransformerEmbedder(model_name or "all-MiniLM-L6-v2")
+    raise ValueError(f"Unknown semantic cache embedder: {spec!r}")
+
+
+# --- Vector index ---
+class VectorIndex:
+    """
+    Fixed-capacity matrix of L2-normalized vectors (in memory, or a .npy file
+    mapped with np.memmap) with per-row scope. Which rows are in use is decided
+    by the caller (SemanticCache keeps it in SQLite and reloads it here).
+    Not thread-safe: SemanticCache serializes access.
+    """
+
+    def __init__(self, dim: int, capacity: int, path: Optional[str] = None):
+        self.dim = dim
+        self.capacity = capacity
+        shape = (capacity, dim)
+        if path is None:
+            self.vectors = np.zeros(shape, dtype=np.float32)
+        else:
+            try:
+                self.vectors = np.lib.format.open_memmap(path, mode="r+")
+                if self.vectors.shape != shape or self.vectors.dtype != np.float32:
+                    raise ValueError("shape changed")
+            except (OSError, ValueError):
+                self.vectors = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=shape)
+        self.valid = np.zeros(capacity, dtype=bool)
+        self.scopes = np.full(capacity, -1, dtype=np.int32)
+        # rows past this one are not in use: searches skip them
+        self.high_water = 0
+
+    def set(self, row: int, vector: np.ndarray, scope: int) -> None:
+        self.vectors[row] = vector
+        self.valid[row] = True
+        self.scopes[row] = scope
+        self.high_water = max(self.high_water, row + 1)
+
+    def load(self, rows: List[Tuple[int, int]]) -> None:
+        """
+        Replaces the row metadata with (row, scope id) pairs of the rows in use.
+        """
+        self.valid[:] = False
+        self.scopes[:] = -1
+        if rows:
+            index, scopes = np.array(rows, dtype=np.int64).T
+            self.valid[index] = True
+            self.scopes[index] = scopes
+        self.high_water = int(index.max()) + 1 if rows else 0
+
+    def checksum(self, row: int) -> int:
+        return zlib.crc32(self.vectors[row].tobytes())
+
+    def remove(self, row: int) -> None:
+        self.valid[row] = False
+
+    def search(self, query: np.ndarray, scope: int, k: int = TOP_K) -> List[Tuple[int, float]]:
+        """
+        Top-k rows of `scope` by cosine similarity, best first.
+        """
+        n = self.high_water
+        if n == 0:
+            return []
+        scores = self.vectors[:n] @ query
+        scores[~self.valid[:n] | (self.scopes[:n] != scope)] = -np.inf
+        k = min(k, n)
+        top = np.argpartition(scores, n - k)[n - k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(int(row), float(scores[row])) for row in top if scores[row] > -np.inf]
+
+    def flush(self) -> None:
+        if isinstance(self.vectors, np.memmap):
+            self.vectors.flush()
+
+
+# --- Cache ---
+_SCHEMA = 2  # part of the layout: older entry tables are dropped
+
+
+class SemanticCache:
+    """
+    Near-duplicate lookup of JSON-serializable results, persisted under `directory`.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        embedder,
+        capacity: int = 10000,
+        threshold: float = 0.97,
+        ttl: Optional[float] = 7 * 24 * 3600,
+    ):
+        self.embedder = embedder
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "entries.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        layout = f"{_SCHEMA}/{embedder.name}/{embedder.dim}/{capacity}"
+        with self._write():
+            stored_layout = self._conn.execute("SELECT value FROM meta WHERE key = 'layout'").fetchone()
+            if stored_layout is None or stored_layout[0] != layout:
+                # vectors from another embedder / matrix size can't be reused
+                self._conn.execute("DROP TABLE IF EXISTS entries")
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('layout', ?)", (layout,))
+                self._bump_generation()
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " row INTEGER PRIMARY KEY, scope TEXT NOT NULL, value TEXT NOT NULL,"
+                " checksum INTEGER NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+
+        self.index = VectorIndex(embedder.dim, capacity, os.path.join(directory, "vectors.npy"))
+        self._scope_ids: Dict[str, int] = {}
+        self._generation: Optional[int] = None
+        self._refresh()
+
+    # --- Shared state (SQLite) ---
+    @contextlib.contextmanager
+    def _write(self):
+        """
+        A write transaction that holds the database lock from the start, so row
+        allocation is serialized across processes.
+        """
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.rollback()
+            raise
+        self._conn.commit()
+
+    def _bump_generation(self) -> None:
+        # changes whenever rows are added or removed; other processes reload on change
+        self._conn.execute(
+            "INSERT INTO meta VALUES ('generation', '1')"
+            " ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def _refresh(self) -> None:
+        """
+        Reloads the row -> scope mapping if any process changed the entries since
+        the last load.
+        """
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        generation = int(row[0]) if row else 0
+        if generation == self._generation:
+            return
+        rows = self._conn.execute("SELECT row, scope FROM entries").fetchall()
+        self.index.load([(row, self._scope_id(scope)) for row, scope in rows])
+        self._generation = generation
+
+    def _allocate(self) -> int:
+        """
+        Row for a new entry (inside a write transaction): the first free one,
+        else the least recently used.
+        """
+        free = self._conn.execute(
+            "SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM entries WHERE row = 0)"
+            " UNION ALL"
+            " SELECT row + 1 FROM entries e WHERE row + 1 < ?"
+            " AND NOT EXISTS (SELECT 1 FROM entries WHERE row = e.row + 1)"
+            " LIMIT 1",
+            (self.capacity,),
+        ).fetchone()
+        if free is not None:
+            return free[0]
+        return self._conn.execute("SELECT row FROM entries ORDER BY last_used LIMIT 1").fetchone()[0]
+
+    def _scope_id(self, scope: str) -> int:
+        return self._scope_ids.setdefault(scope, len(self._scope_ids))
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def lookup(self, text: str, scope: str) -> Optional[Tuple[dict, float]]:
+        """
+        (result, similarity) of the most similar entry of `scope` at or above the
+        threshold, or None.
+        """
+        query = self.embedder.embed(embedding_text(text))
+        now = time.time()
+        with self._lock:
+            self._refresh()
+            if scope not in self._scope_ids:
+                return None
+            for row, score in self.index.search(query, self._scope_ids[scope]):
+                if score < self.threshold:
+                    break
+                entry = self._conn.execute(
+                    "SELECT value, scope, checksum, created_at FROM entries WHERE row = ?", (row,)
+                ).fetchone()
+                # gone, or re-allocated by another process since the search
+                if entry is None or entry[1] != scope or entry[2] != self.index.checksum(row):
+                    continue
+                if self.ttl and entry[3] + self.ttl < now:
+                    self._remove(row)
+                    continue
+                self._conn.execute("UPDATE entries SET last_used = ? WHERE row = ?", (now, row))
+                self._conn.commit()
+                return json.loads(entry[0]), score
+        return None
+
+    def add(self, text: str, scope: str, result: dict) -> None:
+        vector = self.embedder.embed(embedding_text(text))
+        value = json.dumps(result)
+        now = time.time()
+        with self._lock, self._write():
+            row = self._allocate()
+            self.index.set(row, vector, self._scope_id(scope))
+            self.index.flush()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (row, scope, value, checksum, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (row, scope, value, self.index.checksum(row), now, now),
+            )
+            self._bump_generation()
+
+    def _remove(self, row: int) -> None:
+        with self._write():
+            self._conn.execute("DELETE FROM entries WHERE row = ?", (row,))
+            self._bump_generation()
+        self.index.remove(row)
+
+    def clear(self) -> None:
+        with self._lock, self._write():
+            self._conn.execute("DELETE FROM entries")
+            self._bump_generation()
+            self.index.valid[:] = False
+
+
+# --- Process-wide default cache ---
+_default_cache: Optional[SemanticCache] = None
+_default_lock = threading.Lock()
+
+
+_default_disabled = False
+DEFAULT_EMBEDDER = "sentence-transformers:all-MiniLM-L6-v2"
+_TRUE = ("1", "true", "yes")
+
+
+def _default_embedder():
+    """
+    The configured embedder, or None (with the reason printed) when it isn't
+    good enough to decide that two analyses are interchangeable.
+    """
+    spec = os.environ.get("SEMANTIC_CACHE_EMBEDDER", DEFAULT_EMBEDDER)
+    if spec.partition(":")[0] == "hashing" and os.environ.get(
+        "SEMANTIC_CACHE_ALLOW_HASHING", "0"
+    ).lower() not in _TRUE:
+        print(
+            "Semantic cache disabled: the hashing embedder only measures word overlap; "
+            "use SEMANTIC_CACHE_EMBEDDER=sentence-transformers:<model> "
+            "(or SEMANTIC_CACHE_ALLOW_HASHING=1 for tests)"
+        )
+        return None
+    try:
+        return make_embedder(spec)
+    except ImportError as e:
+        print(f"Semantic cache disabled: {e}")
+        return None
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    Returns the shared semantic cache, built from environment variables on first
+    use (see module docstring). Returns None unless SEMANTIC_CACHE=1, or when
+    no suitable embedder is available.
+    """
+    global _default_cache, _default_disabled
+    if os.environ.get("SEMANTIC_CACHE", "0").lower() not in _TRUE:
+        return None
+    with _default_lock:
+        if _default_cache is None and not _default_disabled:
+            embedder = _default_embedder()
+            if embedder is None:
+                _default_disabled = True
+                return None
+            _default_cache = SemanticCache(
+                os.environ.get("SEMANTIC_CACHE_PATH") or cache_path("semantic"),
+                embedder,
+                capacity=int(os.environ.get("SEMANTIC_CACHE_CAPACITY", 10000)),
+                threshold=float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", 0.97)),
+                ttl=float(os.environ.get("SEMANTIC_CACHE_TTL", 7 * 24 * 3600)) or None,
+            )
+        return _default_cache
+
+
+def set_semantic_cache(cache: Optional[SemanticCache]) -> None:
+    global _default_cache, _default_disabled
+    with _default_lock:
+        _default_cache, _default_disabled = cache, False
+
+
+# --- Lookup latency benchmark ---
+def _percentiles(durations: List[float]) -> str:
+    durations = sorted(durations)
+    pick = lambda pct: durations[min(len(durations) - 1, int(pct / 100 * len(durations)))] * 1000
+    return f"p50 {pick(50):7.2f} ms   p95 {pick(95):7.2f} ms   p99 {pick(99):7.2f} ms"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark semantic cache lookups.")
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--embedder", default="hashing")
+    parser.add_argument("--scopes", type=int, default=4, help="distinct topology/model scopes")
+    args = parser.parse_args(argv)
+
+    embedder = make_embedder(args.embedder)
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as directory:
+        index = VectorIndex(embedder.dim, args.entries, os.path.join(directory, "vectors.npy"))
+        # random unit vectors: search cost doesn't depend on the content
+        start = time.perf_counter()
+        for offset in range(0, args.entries, 10000):
+            block = rng.standard_normal((min(10000, args.entries - offset), embedder.dim)).astype(np.float32)
+            block /= np.linalg.norm(block, axis=1, keepdims=True)
+            index.vectors[offset : offset + len(block)] = block
+        index.valid[:] = True
+        index.scopes[:] = np.arange(args.entries) % args.scopes
+        index.high_water = args.entries
+        index.flush()
+        print(f"filled {args.entries} x {embedder.dim} ({embedder.name}) in {time.perf_counter() - start:.2f}s")
+
+        text = embedding_text(
+            "### Relationship background\nWe've been seeing each other for a few months. "
+            "They cancel plans last minute and reply late at night.\n### Conversation\n"
+            + "\n".join(f"Me: are we still on for friday? {i}\nSO: maybe, work is crazy" for i in range(20))
+        )
+        embed_times, search_times = [], []
+        for i in range(args.queries):
+            start = time.perf_counter()
+            query = embedder.embed(f"{text} {i}")
+            embed_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            index.search(query, i % args.scopes)
+            search_times.append(time.perf_counter() - start)
+        total = [e + s for e, s in zip(embed_times, search_times)]
+        print(f"{'embed':>8}  {_percentiles(embed_times)}")
+        print(f"{'search':>8}  {_percentiles(search_times)}")
+        print(f"{'lookup':>8}  {_percentiles(total)}")
+        del index
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+def _read_streamlit_secret(name: str) -> Optional[str]:
+    """
+    Reads a key from st.secrets when running under Streamlit; None otherwise.
+    Streamlit is only imported here, so `cores` works without it installed.
+    """
+    try:
+        import streamlit as st
+
+        return st.secrets.get(name)
+    except Exception:
+        return None
+
+
+# repository root: default on-disk state (.cache/...) lives here, whatever the
+# working directory of the UI, worker or CLI that opens it
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cache_path(*parts: str) -> str:
+    """
+    Path under the repository's .cache directory.
+    """
+    return os.path.join(REPO_ROOT, ".cache", *parts)
+
+
+# values of Settings.model_backend (also the rate limiter's provider names)
+MODEL_BACKENDS = ("openai", "offline")
+
+
+@dataclass
+class Settings:
+    """
+    Configuration for building agents.
+    """
+
+    openai_api_key: Optional[str] = None
+    model_name: str = "gpt-4o-mini"
+    # max tokens of background + conversation sent to each agent (None/0 = no limit)
+    token_budget: Optional[int] = 8000
+    # "openai" or "offline" (deterministic local backend, see cores.offline_model)
+    model_backend: str = "openai"
+    extra: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """
+        Builds settings from the environment (and a .env file if python-dotenv is
+        installed), falling back to Streamlit secrets for the API key.
+        """
+        try:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+        except ImportError:
+            pass
+
+        api_key = os.environ.get("OPENAI_API_KEY") or _read_streamlit_secret(
+            "openai_api_key"
+        )
+        return cls(
+            openai_api_key=api_key,
+            model_name=os.environ.get("OPENAI_MODEL_NAME", "gpt-4o-mini"),
+            token_budget=int(os.environ.get("TOKEN_BUDGET", 8000)) or None,
+            model_backend=os.environ.get("MODEL_BACKEND", "openai"),
+        )
+
+
+_settings: Optional[Settings] = None
+_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    """
+    Returns the active settings (read from the environment on first use).
+    """
+    global _settings
+    with _lock:
+        if _settings is None:
+            _settings = Settings.from_env()
+        return _settings
+
+
+def configure(settings: Settings) -> None:
+    """
+    Installs an explicit settings object. Agents already built are dropped,
+    so the next use picks up the new configuration.
+    """
+    global _settings
+    with _lock:
+        _settings = settings
+
+    from cores import agent_factory
+
+    agent_factory.reset_agents()
@@ -0,0 +1,130 @@
+"""
+Single-flight request coalescing.
+
+Concurrent calls with the same key share one execution: the first caller (the
+leader) runs the work, later callers (waiters) await the leader's outcome.
+Once the flight lands, the next call for the key starts a new execution.
+
+All graph runs execute on the runtime's single event loop (cores.runtime), so
+callers from different Streamlit sessions/threads meet on the same flights.
+
+Metrics (labelled by group):
+    singleflight_leaders_total            executions started
+    singleflight_waiters_total            calls served by another call's execution
+    singleflight_saved_seconds_total      execution time avoided (leader duration x waiters)
+    singleflight_waiters_per_flight       histogram of waiters per execution
+"""
+
+import asyncio
+import contextlib
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+from cores.metrics import REGISTRY
+
+T = TypeVar("T")
+
+
+class Flight(Generic[T]):
+    """
+    One in-progress execution for a key.
+    """
+
+    def __init__(self, group: "SingleFlight", key: str):
+        self.group = group
+        self.key = key
+        self.started = time.perf_counter()
+        self.waiters = 0
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def set_result(self, result: T) -> None:
+        self.group._land(self, result=result)
+
+    def set_error(self, error: BaseException) -> None:
+        self.group._land(self, error=error)
+
+
+class SingleFlight:
+    """
+    A group of flights keyed by string (one group per kind of work).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, Flight] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._flights
+
+    def _start(self, key: str) -> Flight:
+        if key in self._flights:
+            raise RuntimeError(f"{self.name}: a flight for {key[:12]} is already in progress")
+        flight = Flight(self, key)
+        self._flights[key] = flight
+        REGISTRY.inc("singleflight_leaders_total", 1, {"group": self.name}, help="Executions started")
+        return flight
+
+    def _land(self, flight: Flight, result: Any = None, error: Optional[BaseException] = None) -> None:
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+        if flight.future.done():
+            return
+        if isinstance(error, asyncio.CancelledError):
+            flight.future.cancel()
+        elif error is not None:
+            flight.future.set_exception(error)
+            flight.future.exception()  # mark retrieved: there may be no waiters
+        else:
+            flight.future.set_result(result)
+
+        labels = {"group": self.name}
+        REGISTRY.observe(
+            "singleflight_waiters_per_flight", flight.waiters, labels, help="Waiters sharing one execution"
+        )
+        if error is None and flight.waiters:
+            REGISTRY.inc(
+                "singleflight_saved_seconds_total",
+                (time.perf_counter() - flight.started) * flight.waiters,
+                labels,
+                help="Execution time avoided by coalescing",
+            )
+
+    async def wait(self, key: str) -> T:
+        """
+        Joins the flight in progress for `key` (KeyError if there is none).
+        """
+        flight = self._flights[key]
+        flight.waiters += 1
+        REGISTRY.inc(
+            "singleflight_waiters_total", 1, {"group": self.name}, help="Calls served by a shared execution"
+        )
+        # shielded: a cancelled waiter must not cancel the leader's execution
+        return await asyncio.shield(flight.future)
+
+    @contextlib.asynccontextmanager
+    async def leading(self, key: str) -> AsyncIterator[Flight]:
+        """
+        Registers the caller as the leader for `key`; the body must call
+        flight.set_result(). Leaving the block without a result (exception,
+        closed generator) fails the flight for its waiters.
+        """
+        flight = self._start(key)
+        try:
+            yield flight
+        except BaseException as e:
+            flight.set_error(e)
+            raise
+        finally:
+            flight.set_error(asyncio.CancelledError())
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Runs `fn` unless a flight for `key` is in progress; returns
+        (result, shared) where shared is True for waiters.
+        """
+        if self.in_flight(key):
+            return await self.wait(key), True
+        async with self.leading(key) as flight:
+            result = await fn()
+            flight.set_result(result)
+        return result, False
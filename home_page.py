@@ -1,8 +1,24 @@
 import streamlit as st
 import time  # Used for placeholder delay
 
-from cores.main_graph import create_graph, GraphMessage
-import asyncio
+from cores.analytics import conversation_stats, stats_summary
+from cores.balanced_agent import BalancedMediatorResponse
+from cores.conversation import Conversation
+from cores.jobs import ensure_workers, get_job, submit_job
+from cores.main_graph import deserialize_state
+from cores.lexicon import scan_conversation
+from cores.processing import (
+    STALE_NOTE,
+    balanced_markdown,
+    lexicon_markdown,
+    romantic_markdown,
+    stoic_markdown,
+)
+from utils.chat_import import import_chat, scan_participants
+from utils.conversation_view import page_bounds, page_count, render_page
+
+# seconds between job status checks while an analysis is running
+JOB_POLL_INTERVAL = 1.0
 
 # --- Placeholder Data Structures (Mimicking Pydantic models for display) ---
 # In your actual app, you'd import your Pydantic models.
@@ -19,8 +35,8 @@ def initialize_state():
     if "conversation_context" not in st.session_state:
         st.session_state.conversation_context = ""
     if "conversation" not in st.session_state:
-        # Stores list of {'sender': str, 'message': str}
-        st.session_state.conversation = []
+        # Messages as a compact Conversation (cores.conversation); reads as {'sender', 'message'} dicts
+        st.session_state.conversation = Conversation()
     if "analysis_results" not in st.session_state:
         # Stores the dict returned by the analysis function/graph
         st.session_state.analysis_results = None
@@ -28,6 +44,37 @@ def initialize_state():
         st.session_state.sender_choice = "Me"  # Default sender
     if "message_text" not in st.session_state:
         st.session_state.message_text = ""
+    if "combined_mode" not in st.session_state:
+        # Both personas from a single model call (graph topology "combined")
+        st.session_state.combined_mode = False
+    if "job_id" not in st.session_state:
+        # Id of the submitted analysis job (also kept in the URL as ?job=...)
+        st.session_state.job_id = None
+    if "analyzed_messages" not in st.session_state:
+        # Messages covered by that job; later ones can be added as an update
+        st.session_state.analyzed_messages = 0
+
+
+def restore_job_from_url():
+    """
+    After a page reload the session is new: pick the job back up from ?job=<id>,
+    restoring its input so the analysis stage can be shown.
+    """
+    job_id = st.query_params.get("job")
+    if not job_id or st.session_state.job_id == job_id:
+        return
+    job = get_job(job_id)
+    if job is None:
+        del st.query_params["job"]
+        return
+    st.session_state.job_id = job_id
+    st.session_state.background_info = job.request.get("background", "")
+    st.session_state.conversation_context = job.request.get("context", "")
+    st.session_state.conversation = Conversation.from_messages(job.request.get("conversation", []))
+    st.session_state.analyzed_messages = len(st.session_state.conversation)
+    st.session_state.combined_mode = job.request.get("topology") == "combined"
+    st.session_state.analysis_results = None
+    st.session_state.stage = "analysis"
 
 
 # --- Placeholder for Agent Invocation ---
@@ -100,50 +147,107 @@ def run_analysis_placeholder(background, conversation_list):
     }
 
 
-def run_graph_analysis(
-    background: str, conversation_ctx: str, conversation: list
-) -> dict:
+# --- Conversation Log ---
+# Messages shown per page; only the visible page is rendered (see utils.conversation_view)
+CONVERSATION_PAGE_SIZE = 50
+
+
+def render_conversation_log(conversation, key, style="bubble", height=None):
     """
-    Compiles the graph and runs it with the provided input.
-    Handles the async graph invocation.
+    Renders one page of the conversation (the newest page by default) as a
+    single HTML block, with a page selector when there is more than one page.
     """
-    try:
-        graph = create_graph()
-        intial_background = f"""
-        Relationship background: {background},
-
-        A snippet of conversation (for more info):
-            Context of convo: {conversation_ctx}
-            Conversation:
-            {
-                '\n'.join([f"{msg['sender']}: {msg['message']}" for msg in conversation])
-            }
-        """
-
-        # Prepare the initial state for the graph invocation
-        graph_input = GraphMessage(
-            background_info=background,
-            # conversation_data=conversation, # Include if state/nodes use it
-            positive_response=[],
-            negative_response=[],
-            balanced_response=[],
-            error=None,
+    total = len(conversation)
+    pages = page_count(total, CONVERSATION_PAGE_SIZE)
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > pages:
+        # the log got shorter (e.g. replaced by an import)
+        st.session_state[page_key] = pages
+    page = pages
+    if pages > 1:
+        page = st.number_input(
+            f"Page (of {pages}, newest last)", min_value=1, max_value=pages, value=pages, key=page_key
+        )
+        start, end = page_bounds(total, page, CONVERSATION_PAGE_SIZE)
+        st.caption(f"Messages {start + 1}–{end} of {total}")
+    # a fixed height makes the page scroll inside its own box
+    with st.container(height=height) if height else st.container():
+        st.markdown(
+            render_page(conversation, page, CONVERSATION_PAGE_SIZE, style), unsafe_allow_html=True
         )
 
-        print("Invoking graph...")
-        # Run the async graph.ainvoke() function using asyncio.run()
-        # This blocks until the async function completes.
-        final_state = asyncio.run(graph.ainvoke(graph_input))
-        print("Graph invocation complete.")
-        return final_state
 
-    except Exception as e:
-        print(f"Error during graph creation or invocation: {e}")
-        import traceback
+@st.cache_data(show_spinner=False, max_entries=32)
+def quick_scan(conversation):
+    """
+    Local lexicon scan of the conversation (cores.lexicon), cached per conversation.
+    """
+    return scan_conversation(conversation)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def quick_stats(conversation):
+    """
+    Per-sender conversation statistics (cores.analytics), cached per conversation.
+    """
+    return conversation_stats(conversation)
+
+
+# --- Result Renderers (shared by the job progress and the final results view) ---
+# The markdown itself comes from cores.processing, which job workers also use
+# to pre-format finished results off the event loop.
+def render_romantic(res):
+    st.markdown(romantic_markdown(res.model_dump()))
+
+
+def render_stoic(res):
+    st.markdown(stoic_markdown(res.model_dump()))
+
+
+def render_balanced(res):
+    st.markdown(balanced_markdown(res.model_dump()))
+
 
-        traceback.print_exc()
-        # Return an error structure consistent with GraphMessage
-        return {"error": f"Failed to run graph analysis: {e}"}
+RESULT_TABS = [
+    "💖 Hopeless Romantic View",
+    "🧐 Practical Stoic View",
+    "⚖️ Balanced Mediator View",
+]
+
+
+def render_job_progress(job):
+    """
+    Renders a running job: each persona tab as soon as its node has completed,
+    and the Balanced Mediator tab from its streamed partial output.
+    """
+    completed = job.progress.get("completed_nodes", [])
+    if job.status == "queued":
+        st.caption("🕒 Analysis queued, waiting for a worker...")
+    else:
+        st.caption(f"🧠 Running analysis... {len(completed)} step(s) finished.")
+
+    state = deserialize_state(job.progress.get("state", {}))
+    waiting = "⏳ Waiting for this perspective..."
+    tab1, tab2, tab3 = st.tabs(RESULT_TABS)
+    with tab1:
+        if state["positive_response"]:
+            render_romantic(state["positive_response"][-1])
+        else:
+            st.info(waiting)
+    with tab2:
+        if state["negative_response"]:
+            render_stoic(state["negative_response"][-1])
+        else:
+            st.info(waiting)
+    with tab3:
+        if state["balanced_response"]:
+            render_balanced(state["balanced_response"][-1])
+        elif job.progress.get("balanced_partial"):
+            render_balanced(
+                BalancedMediatorResponse.model_validate(job.progress["balanced_partial"])
+            )
+        else:
+            st.info(waiting)
 
 
 # --- Streamlit App UI ---
@@ -153,6 +257,9 @@ st.title("🫂🍷 Relationship Analyzer")
 
 # Initialize state variables
 initialize_state()
+# Analyses run on the job workers (started in this process unless JOB_INPROCESS_WORKERS=0)
+ensure_workers()
+restore_job_from_url()
 
 # --- Stage 1: Input Collection ---
 if st.session_state.stage == "input":
@@ -205,37 +312,74 @@ if st.session_state.stage == "input":
     if st.button("Add Message", key="add_msg_button"):
         if st.session_state.message_text:
             st.session_state.conversation.append(
-                {
-                    "sender": st.session_state.sender_choice,
-                    "message": st.session_state.message_text,
-                }
+                st.session_state.sender_choice, st.session_state.message_text
             )
             # Clear the message input field after adding
             st.session_state.message_text = ""
+            # Show the newest page, where the message landed
+            st.session_state.pop("input_log_page", None)
             # Reset sender to default or keep last? Let's reset for now.
             # st.session_state.sender_choice = "Person A"
             st.rerun()  # Rerun to update display and clear input visually
         else:
             st.warning("Please enter a message text.")
 
+    # --- Import From a Chat Export ---
+    with st.expander("📥 Import a chat export (WhatsApp .txt, CSV, JSON)", expanded=False):
+        uploaded = st.file_uploader(
+            "Chat export file",
+            type=["txt", "csv", "json", "jsonl", "ndjson"],
+            key="chat_export_upload",
+        )
+        if uploaded is not None:
+            # Participant scan is a full pass over the file: do it once per upload
+            scan_key = f"chat_participants_{uploaded.file_id}"
+            if scan_key not in st.session_state:
+                st.session_state[scan_key] = scan_participants(uploaded)
+            participants = [name for name, _ in st.session_state[scan_key].most_common()]
+
+            if not participants:
+                st.warning("No messages found in this file.")
+            else:
+                me = st.selectbox("Which participant are you?", participants, key="import_me")
+                others = [name for name in participants if name != me]
+                so = None
+                if len(others) > 1:
+                    so = st.selectbox("Who is 'SO'?", others, key="import_so")
+                window = st.number_input(
+                    "Keep at most this many messages", min_value=10, value=200, step=10, key="import_window"
+                )
+                strategy = st.radio(
+                    "Which part of the chat?",
+                    ["relevant", "recent"],
+                    format_func={"relevant": "Most relevant stretch", "recent": "Most recent messages"}.get,
+                    horizontal=True,
+                    key="import_strategy",
+                )
+                if st.button("Import Messages", key="import_button"):
+                    result = import_chat(
+                        uploaded,
+                        me=me,
+                        so=so,
+                        window=int(window),
+                        strategy=strategy,
+                        query=st.session_state.background_info,
+                    )
+                    st.session_state.conversation = Conversation.from_messages(result.messages)
+                    st.session_state.pop("input_log_page", None)
+                    st.toast(
+                        f"Imported {len(result.messages)} of {result.total_messages} messages "
+                        f"(starting at message #{result.window_start + 1})."
+                    )
+                    st.rerun()
+
     # --- Display Current Conversation ---
     st.subheader("Current Conversation Log")
     if not st.session_state.conversation:
         st.caption("No messages added yet.")
     else:
         # Display conversation in a scrollable box
-        with st.container(height=300):
-            for i, msg in enumerate(st.session_state.conversation):
-                if msg["sender"] == "Me":
-                    st.markdown(
-                        f"<div style='text-align: right; margin-bottom: 5px;'><span style='background-color: #3A59D1; color: #F1EFEC; padding: 5px 10px; border-radius: 10px;'>{msg['message']}</span></div>",
-                        unsafe_allow_html=True,
-                    )
-                else:  # SO
-                    st.markdown(
-                        f"<div style='text-align: left; margin-bottom: 5px;'><span style='background-color: #F1EFEC; color: #030303; padding: 5px 10px; border-radius: 10px;'>{msg['message']}</span></div>",
-                        unsafe_allow_html=True,
-                    )
+        render_conversation_log(st.session_state.conversation, key="input_log", height=300)
 
     st.divider()
 
@@ -275,122 +419,180 @@ elif st.session_state.stage == "analysis":
         if not st.session_state.conversation:
             st.caption("No messages were added.")
         else:
-            for msg in st.session_state.conversation:
-                st.markdown(f"**{msg['sender']}:** {msg['message']}")
+            render_conversation_log(st.session_state.conversation, key="review_log", style="line")
+
+    # --- Instant Pattern Scan (local, no model call) ---
+    hits = quick_scan(st.session_state.conversation)
+    with st.expander(
+        f"🔎 Instant pattern scan: {len(hits)} red-flag phrase(s) matched", expanded=bool(hits)
+    ):
+        st.caption("Phrase matches from a local lexicon: signals to look at, not conclusions.")
+        st.markdown(lexicon_markdown(hits))
+
+    # --- Conversation Statistics (local, no model call) ---
+    stats = quick_stats(st.session_state.conversation)
+    if stats:
+        with st.expander("📊 Conversation statistics"):
+            st.caption("Computed locally and given to the personas along with the conversation.")
+            st.markdown("\n".join(f"- {line}" for line in stats_summary(stats)))
 
     st.divider()
 
+    # --- Analysis Mode ---
+    st.toggle(
+        "⚡ Fast mode (both personas from a single model call)",
+        key="combined_mode",
+        help="Two model calls instead of three: lower latency and fewer prompt tokens.",
+    )
+
     # --- Run Analysis Button ---
     if st.button("🚀 Run Analysis", key="run_analysis_button"):
-        with st.spinner("🧠 Running analysis... Please wait."):
-            # calling the graph
-            st.session_state.analysis_results = run_graph_analysis(
-                st.session_state.background_info,
-                st.session_state.conversation_context,
-                st.session_state.conversation,
-            )
-        st.success("✅ Analysis Complete!")
-        st.rerun()  # Rerun to display results below the button
+        # queue the analysis; the job id survives reloads through the URL
+        job_id = submit_job(
+            st.session_state.background_info,
+            st.session_state.conversation_context,
+            st.session_state.conversation.to_list(),
+            "combined" if st.session_state.combined_mode else "parallel",
+        )
+        st.session_state.job_id = job_id
+        st.session_state.analyzed_messages = len(st.session_state.conversation)
+        st.session_state.analysis_results = None
+        st.query_params["job"] = job_id
+        st.rerun()
+
+    # --- Poll the running job ---
+    if st.session_state.job_id and not st.session_state.analysis_results:
+        job = get_job(st.session_state.job_id)
+        if job is None:
+            st.error("⚠️ The analysis job could not be found.")
+            st.session_state.job_id = None
+        elif job.status == "done":
+            st.session_state.analysis_results = deserialize_state(job.result)
+            st.success("✅ Analysis Complete!")
+        elif job.status == "failed":
+            st.session_state.analysis_results = {"error": job.error}
+        else:
+            render_job_progress(job)
+            time.sleep(JOB_POLL_INTERVAL)
+            st.rerun()
 
     # --- Display Analysis Results ---
     if st.session_state.analysis_results:
         st.subheader("Analysis Results")
 
         results = st.session_state.analysis_results
+        if results.get("result_source") == "store":
+            st.caption("♻️ Identical input was analyzed before: showing the stored result.")
+        elif results.get("result_source") == "semantic":
+            st.caption(
+                f"♻️ A near-identical situation was analyzed before "
+                f"(similarity {results.get('similarity', 0):.0%}): showing that result."
+            )
+        elif results.get("result_source") == "coalesced":
+            st.caption("♻️ An identical analysis was already running: showing its result.")
+        if results.get("update_of"):
+            st.caption("🔁 Updated from the previous analysis with the new messages only.")
+        # Note when the conversation had to be compacted to fit the token budget
+        token_report = results.get("token_report")
+        if token_report and token_report["saved_tokens"]:
+            st.caption(
+                f"✂️ Long conversation compacted to fit the token budget: "
+                f"{token_report['original_messages']} → {token_report['final_messages']} messages, "
+                f"~{token_report['saved_tokens_per_run']} tokens saved for this run."
+            )
         # Check for errors first
         if results.get("error"):
             st.error(f"⚠️ An error occurred during analysis: {results['error']}")
-        else:
+        # Partial results (e.g. one persona failed after retries) are still shown
+        if any(
+            results.get(key)
+            for key in ("positive_response", "negative_response", "balanced_response")
+        ):
             # Use tabs for displaying the different perspectives
-            tab1, tab2, tab3 = st.tabs(
-                [
-                    "💖 Hopeless Romantic View",
-                    "🧐 Practical Stoic View",
-                    "⚖️ Balanced Mediator View",
-                ]
-            )
+            tab1, tab2, tab3 = st.tabs(RESULT_TABS)
+
+            # pre-formatted by the job worker (see cores.processing), when available
+            rendered = results.get("rendered") or {}
+            # update run: channels whose agent failed still hold the previous findings
+            stale = results.get("stale_channels") or []
 
             # --- Romantic Tab ---
             with tab1:
-                if results.get("positive_response"):
-                    # Assuming the list contains one response object (dict in this placeholder)
-                    res = results["positive_response"][0]
-                    # st.json(res)
-                    # st.markdown(res.downplayed_negatives)
-                    st.markdown(f"**Overall Summary:** {res.overall_summary}")
-                    st.markdown("**Positive Interpretations Highlighted:**")
-                    if res.positive_interpretations:
-                        for item in res.positive_interpretations:
-                            st.markdown(f"- {item}")
-                    else:
-                        st.caption("_None noted._")
-                    st.markdown("**Key 'Breadcrumbs' Focused On:**")
-                    if res.key_breadcrumbs:
-                        for item in res.key_breadcrumbs:
-                            st.markdown(f"- {item}")
-                    else:
-                        st.caption("_None noted._")
-                    st.markdown("**Rationalized/Downplayed Negatives:**")
-                    if res.downplayed_negatives:
-                        for item in res.downplayed_negatives:
-                            st.markdown(f"- {item}")
-                    else:
-                        st.caption("_None noted._")
-
+                if rendered.get("positive_response"):
+                    st.markdown(rendered["positive_response"])
+                elif results.get("positive_response"):
+                    if "positive_response" in stale:
+                        st.markdown(STALE_NOTE)
+                    render_romantic(results["positive_response"][-1])
                 else:
                     st.warning("No data available for the Hopeless Romantic analysis.")
 
             # --- Stoic Tab ---
             with tab2:
-                if results.get("negative_response"):
-                    res = results["negative_response"][0]
-                    st.markdown(f"**Overall Summary:** {res.overall_summary}")
-                    st.markdown("**Potential Red Flags Identified:**")
-                    if res.red_flags:
-                        for item in res.red_flags:
-                            st.markdown(f"- {item}")
-                    else:
-                        st.caption("_None noted._")
-                    st.markdown("**Potential Manipulation Tactics Identified:**")
-                    if res.identified_tactics:
-                        for item in res.identified_tactics:
-                            st.markdown(f"- {item}")
-                    else:
-                        st.caption("_None noted._")
-                    st.markdown("**Unanswered Questions / Lack of Clarity:**")
-                    if res.unanswered_questions:
-                        for item in res.unanswered_questions:
-                            st.markdown(f"- {item}")
-                    else:
-                        st.caption("_None noted._")
+                if rendered.get("negative_response"):
+                    st.markdown(rendered["negative_response"])
+                elif results.get("negative_response"):
+                    if "negative_response" in stale:
+                        st.markdown(STALE_NOTE)
+                    render_stoic(results["negative_response"][-1])
                 else:
                     st.warning("No data available for the Practical Stoic analysis.")
 
             # --- Mediator Tab ---
             with tab3:
-                if results.get("balanced_response"):
-                    res = results["balanced_response"][0]
-                    st.markdown(
-                        f"**Summary of Romantic View:** {res.romantic_view_summary}"
-                    )
-                    st.markdown(f"**Summary of Stoic View:** {res.stoic_view_summary}")
-                    st.markdown("**Key Points of Contention / Disagreement:**")
-                    if res.points_of_contention:
-                        for item in res.points_of_contention:
-                            st.markdown(f"- {item}")
-                    else:
-                        st.caption("_None noted._")
-                    st.markdown(
-                        f"**Suggested Next Steps / Reflection Points:** {res.suggested_next_steps}"
-                    )
-                    # Display retrieved resources if implemented
-                    if res.retrieved_resources:
-                        st.markdown("**Related Resources Found:**")
-                        for resource in res.retrieved_resources:
-                            st.markdown(f"- {resource}")  # Adjust formatting as needed
+                if rendered.get("balanced_response"):
+                    st.markdown(rendered["balanced_response"])
+                elif results.get("balanced_response"):
+                    if "balanced_response" in stale:
+                        st.markdown(STALE_NOTE)
+                    render_balanced(results["balanced_response"][-1])
                 else:
                     st.warning("No data available for the Balanced Mediator analysis.")
 
+        # Per-node / per-agent timing of the last run
+        if results.get("trace"):
+            with st.expander("⏱️ Run timing details", expanded=False):
+                st.caption(f"Total: {results['trace']['total_seconds']:.2f}s")
+                st.dataframe(results["trace"]["spans"], use_container_width=True)
+
+        # --- Follow-up: add messages and update the analysis incrementally ---
+        if not results.get("error"):
+            st.subheader("Add Follow-up Messages")
+            col1, col2 = st.columns([1, 3])
+            with col1:
+                followup_sender = st.radio("Sender:", ["Me", "SO"], key="followup_sender")
+            with col2:
+                followup_text = st.text_input("Enter message:", key="followup_text")
+            if st.button("Add Message", key="add_followup_button"):
+                if followup_text:
+                    st.session_state.conversation.append(followup_sender, followup_text)
+                    del st.session_state["followup_text"]
+                    st.rerun()
+                else:
+                    st.warning("Please enter a message text.")
+
+            new_messages = st.session_state.conversation[st.session_state.analyzed_messages:]
+            if new_messages:
+                render_conversation_log(new_messages, key="followup_log", style="line")
+                # only the new messages and a digest of the findings are sent
+                if st.button(
+                    f"🔁 Update Analysis ({len(new_messages)} new message(s))",
+                    key="update_analysis_button",
+                ):
+                    job_id = submit_job(
+                        st.session_state.background_info,
+                        st.session_state.conversation_context,
+                        st.session_state.conversation.to_list(),
+                        "combined" if st.session_state.combined_mode else "parallel",
+                        previous_job=st.session_state.job_id,
+                        new_from=st.session_state.analyzed_messages,
+                    )
+                    st.session_state.job_id = job_id
+                    st.session_state.analyzed_messages = len(st.session_state.conversation)
+                    st.session_state.analysis_results = None
+                    st.query_params["job"] = job_id
+                    st.rerun()
+
     st.divider()
 
     # --- Button to Start Over ---
@@ -403,9 +605,12 @@ elif st.session_state.stage == "analysis":
             "analysis_results",
             "sender_choice",
             "message_text",
+            "job_id",
+            "analyzed_messages",
         ]
         for key in keys_to_clear:
             if key in st.session_state:
                 del st.session_state[key]
+        st.query_params.clear()
         # Rerun the script to go back to the initial state
         st.rerun()
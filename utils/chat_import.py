@@ -0,0 +1,460 @@
+"""
+Streaming importer for chat exports: WhatsApp .txt, generic CSV, JSON / JSON Lines.
+
+Exports are parsed one message at a time (files on disk are read through mmap),
+participants are mapped to "Me" / "SO", and an optional window keeps only the
+most relevant (or most recent) slice, so memory stays bounded by the window
+rather than by the size of the export.
+
+    result = import_chat("WhatsApp Chat with Sam.txt", me="Alex", window=200)
+    result.messages  # [{"sender": "Me", "message": "..."}, ...]
+
+CLI:
+    python -m utils.chat_import export.txt --participants
+    python -m utils.chat_import export.txt --me Alex --window 200 --out conversation.json
+"""
+
+import argparse
+import csv
+import io
+import json
+import mmap
+import os
+import re
+import sys
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import IO, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+Source = Union[str, bytes, IO[bytes]]
+Message = Dict[str, str]
+
+FORMATS = ("whatsapp", "csv", "json", "jsonl")
+
+SENDER_FIELDS = ("sender", "from", "author", "sender_name", "name", "participant", "user")
+MESSAGE_FIELDS = ("message", "text", "body", "content", "msg")
+TIMESTAMP_FIELDS = ("timestamp", "date", "time", "datetime", "timestamp_ms", "sent_at")
+
+
+@dataclass
+class RawMessage:
+    author: str
+    text: str
+    timestamp: Optional[str] = None
+
+
+# --- Reading ---
+def iter_lines(source: Source) -> Iterator[str]:
+    """
+    Yields decoded lines (with line endings) from a path, bytes or binary file object.
+    Paths are memory-mapped, so even very large exports are not read into memory.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                first = True
+                for line in iter(mm.readline, b""):
+                    text = line.decode("utf-8", "replace")
+                    if first:
+                        text, first = text.lstrip("\ufeff"), False
+                    yield text
+        return
+
+    stream = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    if hasattr(stream, "seek"):
+        stream.seek(0)
+    first = True
+    for line in stream:
+        text = line.decode("utf-8", "replace")
+        if first:
+            text, first = text.lstrip("\ufeff"), False
+        yield text
+
+
+def detect_format(name: str) -> str:
+    ext = os.path.splitext(name.lower())[1]
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if ext == ".json":
+        return "json"
+    return "whatsapp"
+
+
+# --- Parsers ---
+# Android: "12/31/23, 9:41 PM - Sam: text"; iOS: "[31/12/2023, 21:41:05] Sam: text"
+_WHATSAPP_LINE = re.compile(
+    r"^\u200e?\[?(?P<date>\d{1,4}[./-]\d{1,2}[./-]\d{1,4}),?\s+"
+    r"(?P<time>\d{1,2}[:.]\d{2}(?:[:.]\d{2})?(?:\s?[APap]\.?\s?[Mm]\.?)?)\]?\s*(?:-\s*)?"
+    r"(?P<rest>.*)$"
+)
+_WHATSAPP_SKIP = ("<Media omitted>", "image omitted", "video omitted", "sticker omitted", "audio omitted")
+
+
+def parse_whatsapp(lines: Iterable[str]) -> Iterator[RawMessage]:
+    """
+    WhatsApp "Export chat" text. Lines without a timestamp continue the previous
+    message; system lines (no "Name: " part) and media placeholders are skipped.
+    """
+    current: Optional[RawMessage] = None
+    for line in lines:
+        line = line.rstrip("\r\n").replace("\u202f", " ")
+        match = _WHATSAPP_LINE.match(line)
+        if match is None:
+            if current is not None and line:
+                current.text += "\n" + line
+            continue
+        if current is not None:
+            yield current
+            current = None
+        author, sep, text = match.group("rest").partition(": ")
+        if not sep:
+            continue  # system message, e.g. "Messages are end-to-end encrypted"
+        text = text.lstrip("\u200e")
+        if text.strip() in _WHATSAPP_SKIP:
+            continue
+        current = RawMessage(
+            author=author.strip().lstrip("\u200e~ ").strip(),
+            text=text,
+            timestamp=f"{match.group('date')} {match.group('time')}",
+        )
+    if current is not None:
+        yield current
+
+
+def _pick_field(keys: Iterable[str], candidates: Tuple[str, ...], override: Optional[str]) -> Optional[str]:
+    if override:
+        return override
+    lowered = {key.lower().strip(): key for key in keys}
+    for candidate in candidates:
+        if candidate in lowered:
+            return lowered[candidate]
+    return None
+
+
+def _record_to_message(
+    record: dict, sender_field: Optional[str], message_field: Optional[str]
+) -> Optional[RawMessage]:
+    sender_key = _pick_field(record, SENDER_FIELDS, sender_field)
+    message_key = _pick_field(record, MESSAGE_FIELDS, message_field)
+    if sender_key is None or message_key is None:
+        return None
+    text = record.get(message_key)
+    if isinstance(text, list):
+        # Telegram: text can be a list of plain strings and {"type", "text"} entities
+        text = "".join(part if isinstance(part, str) else part.get("text", "") for part in text)
+    if not isinstance(text, str) or not text.strip():
+        return None
+    timestamp_key = _pick_field(record, TIMESTAMP_FIELDS, None)
+    return RawMessage(
+        author=str(record.get(sender_key) or "").strip(),
+        text=text,
+        timestamp=str(record[timestamp_key]) if timestamp_key and record.get(timestamp_key) else None,
+    )
+
+
+def parse_csv(
+    lines: Iterable[str], sender_field: Optional[str] = None, message_field: Optional[str] = None
+) -> Iterator[RawMessage]:
+    """
+    CSV with a header row; sender / message / timestamp columns are detected by name.
+    """
+    for record in csv.DictReader(lines):
+        message = _record_to_message(record, sender_field, message_field)
+        if message is not None:
+            yield message
+
+
+def parse_jsonl(
+    lines: Iterable[str], sender_field: Optional[str] = None, message_field: Optional[str] = None
+) -> Iterator[RawMessage]:
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict):
+            message = _record_to_message(record, sender_field, message_field)
+            if message is not None:
+                yield message
+
+
+def parse_json(
+    source: Source, sender_field: Optional[str] = None, message_field: Optional[str] = None
+) -> Iterator[RawMessage]:
+    """
+    A JSON array of messages, or an object with a "messages" array (Telegram,
+    Messenger exports). Streamed with the optional `ijson` package; without it
+    the document is loaded whole.
+    """
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+
+    if ijson is not None:
+        def records():
+            for prefix in ("item", "messages.item"):
+                with _open_binary(source) as stream:
+                    found = False
+                    for record in ijson.items(stream, prefix):
+                        found = True
+                        yield record
+                    if found:
+                        return
+    else:
+        def records():
+            data = json.loads("".join(iter_lines(source)))
+            yield from data.get("messages", []) if isinstance(data, dict) else data
+
+    for record in records():
+        if isinstance(record, dict):
+            message = _record_to_message(record, sender_field, message_field)
+            if message is not None:
+                yield message
+
+
+class _open_binary:
+    """
+    Context manager giving a binary stream for any Source (mmap for paths).
+    """
+
+    def __init__(self, source: Source):
+        self.source = source
+        self._closers = []
+
+    def __enter__(self):
+        if isinstance(self.source, str):
+            f = open(self.source, "rb")
+            self._closers.append(f)
+            if os.fstat(f.fileno()).st_size == 0:
+                return io.BytesIO(b"")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._closers.insert(0, mm)
+            return mm
+        if isinstance(self.source, (bytes, bytearray)):
+            return io.BytesIO(self.source)
+        self.source.seek(0)
+        return self.source
+
+    def __exit__(self, *exc):
+        for closer in self._closers:
+            closer.close()
+
+
+def iter_messages(
+    source: Source,
+    fmt: Optional[str] = None,
+    sender_field: Optional[str] = None,
+    message_field: Optional[str] = None,
+) -> Iterator[RawMessage]:
+    """
+    Streams the messages of an export (format detected from the file name if not given).
+    """
+    fmt = fmt or detect_format(source if isinstance(source, str) else getattr(source, "name", ""))
+    if fmt == "whatsapp":
+        return parse_whatsapp(iter_lines(source))
+    if fmt == "csv":
+        return parse_csv(iter_lines(source), sender_field, message_field)
+    if fmt == "jsonl":
+        return parse_jsonl(iter_lines(source), sender_field, message_field)
+    if fmt == "json":
+        return parse_json(source, sender_field, message_field)
+    raise ValueError(f"Unknown chat export format: {fmt!r} (expected one of {FORMATS})")
+
+
+def scan_participants(source: Source, fmt: Optional[str] = None, **fields) -> Counter:
+    """
+    Message count per author (one streaming pass), e.g. to ask the user who "Me" is.
+    """
+    return Counter(message.author for message in iter_messages(source, fmt, **fields))
+
+
+# --- Windowing ---
+RELATIONSHIP_TERMS = frozenset(
+    """
+    love miss sorry busy later maybe date dinner tonight weekend together feel feelings
+    relationship exclusive commit commitment serious future trust space ex jealous cheat
+    promise plans meet call why really honest upset hurt care need want
+    """.split()
+)
+_WORD = re.compile(r"[a-z']+")
+
+
+def relevance(message: Message, terms: Set[str]) -> float:
+    """
+    Heuristic relevance of one message: relationship / query terms, questions and substance.
+    """
+    words = _WORD.findall(message["message"].lower())
+    hits = sum(1 for word in words if word in terms)
+    return hits + 0.5 * message["message"].count("?") + min(len(words), 40) / 40
+
+
+def query_terms(text: str) -> Set[str]:
+    """
+    Words of 4+ letters from a free-text query (e.g. the relationship background).
+    """
+    return {word for word in _WORD.findall(text.lower()) if len(word) >= 4}
+
+
+class RelevantWindow:
+    """
+    Streaming selection of the `size` consecutive messages with the highest total
+    relevance (both participants present gets a bonus); ties go to the most recent.
+    Memory is O(size).
+    """
+
+    def __init__(self, size: int, terms: Set[str]):
+        self.size = size
+        self.terms = terms
+        self._window: Deque[Tuple[Message, float]] = deque()
+        self._score = 0.0
+        self._senders: Counter = Counter()
+        self.best: List[Message] = []
+        self.best_score = float("-inf")
+        self.best_end = 0
+        self.seen = 0
+
+    def add(self, message: Message) -> None:
+        score = relevance(message, self.terms)
+        self._window.append((message, score))
+        self._score += score
+        self._senders[message["sender"]] += 1
+        self.seen += 1
+        if len(self._window) > self.size:
+            old, old_score = self._window.popleft()
+            self._score -= old_score
+            self._senders[old["sender"]] -= 1
+        total = self._score + (self.size * 0.1 if self._senders["Me"] and self._senders["SO"] else 0)
+        if len(self._window) == min(self.size, self.seen) and total >= self.best_score:
+            self.best_score = total
+            self.best = [m for m, _ in self._window]
+            self.best_end = self.seen
+
+
+# --- Import ---
+@dataclass
+class ImportResult:
+    messages: List[Message]
+    participants: Counter = field(default_factory=Counter)
+    total_messages: int = 0
+    window_start: int = 0  # index of the first kept message in the mapped stream
+
+
+def import_chat(
+    source: Source,
+    fmt: Optional[str] = None,
+    me: Optional[str] = None,
+    so: Optional[str] = None,
+    window: Optional[int] = None,
+    strategy: str = "relevant",
+    query: str = "",
+    sender_field: Optional[str] = None,
+    message_field: Optional[str] = None,
+) -> ImportResult:
+    """
+    Parses an export into [{"sender": "Me"|"SO", "message": ...}] (plus the exported
+    "timestamp" string when the format has one).
+
+    me / so:  participant names to map to "Me" / "SO". Without `so`, everyone who
+              isn't `me` becomes "SO"; with it, other participants are dropped.
+              Without `me`, the participant with the most messages is "Me".
+    window:   keep at most this many consecutive messages, chosen by `strategy`:
+              "relevant" (highest relevance, see RelevantWindow; `query` adds terms)
+              or "recent" (the last messages).
+    """
+    fields = {"sender_field": sender_field, "message_field": message_field}
+    if me is None:
+        participants = scan_participants(source, fmt, **fields)
+        me = participants.most_common(1)[0][0] if participants else ""
+
+    participants: Counter = Counter()
+    kept = 0
+    if window and strategy == "relevant":
+        selector = RelevantWindow(window, RELATIONSHIP_TERMS | query_terms(query))
+    elif window and strategy == "recent":
+        recent: Deque[Message] = deque(maxlen=window)
+    elif window:
+        raise ValueError(f"Unknown window strategy: {strategy!r}")
+    messages: List[Message] = []
+
+    for raw in iter_messages(source, fmt, **fields):
+        participants[raw.author] += 1
+        if raw.author == me:
+            sender = "Me"
+        elif so is None or raw.author == so:
+            sender = "SO"
+        else:
+            continue
+        message = {"sender": sender, "message": raw.text.strip()}
+        if raw.timestamp:
+            # kept as exported; cores.analytics parses the whole column at once
+            message["timestamp"] = raw.timestamp
+        kept += 1
+        if not window:
+            messages.append(message)
+        elif strategy == "relevant":
+            selector.add(message)
+        else:
+            recent.append(message)
+
+    if window and strategy == "relevant":
+        return ImportResult(selector.best, participants, kept, max(selector.best_end - len(selector.best), 0))
+    if window:
+        return ImportResult(list(recent), participants, kept, max(kept - len(recent), 0))
+    return ImportResult(messages, participants, kept, 0)
+
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a chat export into a conversation list.")
+    parser.add_argument("path", help="WhatsApp .txt, .csv, .json or .jsonl export")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="default: from the extension")
+    parser.add_argument("--participants", action="store_true", help="list participants and exit")
+    parser.add_argument("--me", default=None, help="participant mapped to 'Me'")
+    parser.add_argument("--so", default=None, help="participant mapped to 'SO' (default: everyone else)")
+    parser.add_argument("--window", type=int, default=None, help="max messages to keep")
+    parser.add_argument("--strategy", choices=["relevant", "recent"], default="relevant")
+    parser.add_argument("--query", default="", help="extra relevance terms (e.g. the background)")
+    parser.add_argument("--sender-field", default=None)
+    parser.add_argument("--message-field", default=None)
+    parser.add_argument("--out", default=None, help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    fields = {"sender_field": args.sender_field, "message_field": args.message_field}
+    if args.participants:
+        for name, count in scan_participants(args.path, args.format, **fields).most_common():
+            print(f"{count:>8}  {name}")
+        return
+
+    result = import_chat(
+        args.path,
+        args.format,
+        me=args.me,
+        so=args.so,
+        window=args.window,
+        strategy=args.strategy,
+        query=args.query,
+        **fields,
+    )
+    print(
+        f"Imported {len(result.messages)} of {result.total_messages} messages "
+        f"(window starts at #{result.window_start})",
+        file=sys.stderr,
+    )
+    output = json.dumps(result.messages, ensure_ascii=False, indent=1)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
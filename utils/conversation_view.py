@@ -0,0 +1,150 @@
+"""
+Paginated HTML rendering of the conversation log.
+
+Only the visible page is rendered, as a single HTML block, and the (escaped)
+HTML of each message is memoized, so a rerun over a long imported chat costs one
+page's worth of string joins instead of one Streamlit element per message.
+
+Rerun benchmark (Streamlit's AppTest, per-message elements vs one paginated block):
+    python -m utils.conversation_view --messages 5000 --reruns 10
+"""
+
+import argparse
+import functools
+import html
+import os
+import statistics
+import time
+from typing import List, Tuple
+
+# distinct messages whose HTML is kept between reruns (shared by all sessions)
+MESSAGE_HTML_CACHE_SIZE = int(os.environ.get("MESSAGE_HTML_CACHE_SIZE", "20000"))
+
+_BUBBLE = {
+    "Me": ("right", "#3A59D1", "#F1EFEC"),
+    "SO": ("left", "#F1EFEC", "#030303"),
+}
+
+
+def _escape(text: str) -> str:
+    # newlines as <br>: a blank line would end the HTML block in markdown
+    return html.escape(text).replace("\r\n", "\n").replace("\n", "<br>")
+
+
+@functools.lru_cache(maxsize=MESSAGE_HTML_CACHE_SIZE)
+def bubble_html(sender: str, message: str) -> str:
+    """
+    Chat bubble for one message ("Me" right-aligned, anyone else left).
+    """
+    align, background, color = _BUBBLE.get(sender, _BUBBLE["SO"])
+    return (
+        f"<div style='text-align: {align}; margin-bottom: 5px;'>"
+        f"<span style='background-color: {background}; color: {color}; padding: 5px 10px; "
+        f"border-radius: 10px; display: inline-block; max-width: 85%; text-align: left;'>"
+        f"{_escape(message)}</span></div>"
+    )
+
+
+@functools.lru_cache(maxsize=MESSAGE_HTML_CACHE_SIZE)
+def line_html(sender: str, message: str) -> str:
+    """
+    Plain "Sender: message" line (the read-only log on the analysis stage).
+    """
+    return f"<div style='margin-bottom: 5px;'><b>{_escape(sender)}:</b> {_escape(message)}</div>"
+
+
+STYLES = {"bubble": bubble_html, "line": line_html}
+
+
+def page_count(total: int, page_size: int) -> int:
+    return max(1, -(-total // page_size))
+
+
+def page_bounds(total: int, page: int, page_size: int) -> Tuple[int, int]:
+    """
+    [start, end) message indices of a 1-based page (clamped to the valid range).
+    """
+    page = min(max(page, 1), page_count(total, page_size))
+    start = (page - 1) * page_size
+    return start, min(start + page_size, total)
+
+
+def render_page(conversation: List[dict], page: int, page_size: int, style: str = "bubble") -> str:
+    """
+    HTML for one page of the conversation.
+    """
+    render = STYLES[style]
+    start, end = page_bounds(len(conversation), page, page_size)
+    return "".join(render(msg["sender"], msg["message"]) for msg in conversation[start:end])
+
+
+# --- Rerun benchmark ---
+_SCRIPT_SETUP = """
+import streamlit as st
+if "conversation" not in st.session_state:
+    words = "honestly idk what this means but ok lol we should talk about friday maybe".split()
+    st.session_state.conversation = [
+        {{"sender": "Me" if n % 3 else "SO", "message": " ".join(words[(n + k) % len(words)] for k in range(5 + n % 30))}}
+        for n in range({messages})
+    ]
+conversation = st.session_state.conversation
+"""
+
+# what the input stage did before: one markdown element per message
+_SCRIPT_BEFORE = """
+with st.container(height=300):
+    for msg in conversation:
+        if msg["sender"] == "Me":
+            st.markdown(
+                f"<div style='text-align: right; margin-bottom: 5px;'><span style='background-color: #3A59D1; color: #F1EFEC; padding: 5px 10px; border-radius: 10px;'>{msg['message']}</span></div>",
+                unsafe_allow_html=True,
+            )
+        else:
+            st.markdown(
+                f"<div style='text-align: left; margin-bottom: 5px;'><span style='background-color: #F1EFEC; color: #030303; padding: 5px 10px; border-radius: 10px;'>{msg['message']}</span></div>",
+                unsafe_allow_html=True,
+            )
+"""
+
+_SCRIPT_AFTER = """
+from utils.conversation_view import page_bounds, page_count, render_page
+pages = page_count(len(conversation), {page_size})
+page = st.number_input("Page", 1, pages, value=pages, key="page")
+start, end = page_bounds(len(conversation), page, {page_size})
+st.caption(f"Messages {{start + 1}}-{{end}} of {{len(conversation)}}")
+with st.container(height=300):
+    st.markdown(render_page(conversation, page, {page_size}), unsafe_allow_html=True)
+"""
+
+
+def _time_reruns(script: str, reruns: int) -> float:
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_string(script, default_timeout=120)
+    app.run()  # first run builds the conversation
+    durations = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark conversation log rerun time.")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    setup = _SCRIPT_SETUP.format(messages=args.messages)
+    before = _time_reruns(setup + _SCRIPT_BEFORE, args.reruns)
+    after = _time_reruns(setup + _SCRIPT_AFTER.format(page_size=args.page_size), args.reruns)
+    print(f"{args.messages} messages, median of {args.reruns} reruns")
+    print(f"{'per-message elements':>24}: {before * 1000:8.1f} ms")
+    print(f"{'paginated (' + str(args.page_size) + '/page)':>24}: {after * 1000:8.1f} ms")
+    print(f"{'speedup':>24}: {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()